@@ -1,7 +1,15 @@
 from django.contrib import admin
-from .models import Item, Document, ParsedResult, Schema
+from .models import Item, Document, ParsedResult, Schema, DocumentClassification, PageHash, UploadSession, SchemaVersion, BatchJob, WebhookEndpoint, WebhookDelivery, RequestProfile
 
 admin.site.register(Item)
 admin.site.register(Document)
 admin.site.register(ParsedResult)
 admin.site.register(Schema)
+admin.site.register(DocumentClassification)
+admin.site.register(PageHash)
+admin.site.register(UploadSession)
+admin.site.register(SchemaVersion)
+admin.site.register(BatchJob)
+admin.site.register(WebhookEndpoint)
+admin.site.register(WebhookDelivery)
+admin.site.register(RequestProfile)
@@ -0,0 +1,139 @@
+"""
+Authentication classes that avoid re-verifying credentials on every request.
+
+Basic auth makes Django run its PBKDF2 password hasher on each call, which
+costs tens of milliseconds of CPU. Verified credentials are remembered in an
+in-process cache for a short TTL so the hash is paid once per session.
+Cached Basic credentials still re-read the user, so deactivating it or
+changing its password takes effect at once.
+
+Token lookups are cheap but still cost a query per request. Verified
+tokens are cached together with a snapshot of their user for
+AUTH_TOKEN_CACHE_TTL seconds, so a cache hit runs no query at all.
+
+The caches are per worker process. Revoking a token takes effect at once
+in the process that handled the revocation, but other workers may keep
+accepting it for up to AUTH_TOKEN_CACHE_TTL seconds. The same goes for
+deactivating a user who authenticates with tokens. Lower the TTL if that
+window is too long.
+"""
+import copy
+import hashlib
+import hmac
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+
+
+class CredentialCache:
+    """
+    Thread-safe TTL cache mapping a credential digest to a verified user.
+
+    Entries also remember the user's password hash, so changing the password
+    invalidates cached Basic credentials before the TTL runs out.
+    """
+
+    def __init__(self, ttl=300, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(*parts):
+        """
+        Cache key for a credential: an HMAC keyed with SECRET_KEY, so keys
+        leaked from memory cannot be brute-forced back into passwords
+        without the secret.
+        """
+        message = '\x00'.join(parts).encode('utf-8')
+        return hmac.new(settings.SECRET_KEY.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[0] >= now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+credential_cache = CredentialCache(ttl=settings.AUTH_CREDENTIAL_CACHE_TTL)
+token_cache = CredentialCache(ttl=settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def _get_active_user(user_id):
+    """Fetch a cached user by primary key, or None if it is gone or inactive."""
+    user = get_user_model()._default_manager.filter(pk=user_id).first()
+    if user is None or not user.is_active:
+        return None
+    return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication with verified tokens and their users cached in
+    process, so a cache hit needs no query.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = CredentialCache.digest('token', key)
+        cached = token_cache.get(cache_key)
+        if cached is not None:
+            user, token = cached
+            # Requests must not share (and mutate) one user instance
+            return (copy.copy(user), token)
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(cache_key, (copy.copy(user), token))
+        return (user, token)
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    Basic authentication that only runs the password hasher on a cache miss.
+
+    Kept for API clients that still send Basic credentials; new clients
+    should exchange them once for a token.
+    """
+
+    def authenticate_credentials(self, userid, password, request=None):
+        cache_key = CredentialCache.digest('basic', userid, password)
+        cached = credential_cache.get(cache_key)
+        if cached is not None:
+            user_id, password_hash = cached
+            user = _get_active_user(user_id)
+            if user is not None and user.password == password_hash:
+                return (user, None)
+            credential_cache.discard(cache_key)
+
+        user, auth = super().authenticate_credentials(userid, password, request)
+        credential_cache.set(cache_key, (user.pk, user.password))
+        return (user, auth)
+
+
+def forget_token(key):
+    """Drop a revoked token from the token cache."""
+    token_cache.discard(CredentialCache.digest('token', key))
@@ -0,0 +1,185 @@
+"""
+Provider batch submission for non-urgent parsing.
+
+Backfills pack many page requests into one provider batch job instead of
+calling the model once per page. Batch calls are billed at a lower rate
+and do not count against the interactive rate limit, which stays free for
+user requests. Results are ingested into ParsedResult once a job completes.
+"""
+import itertools
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+
+from packages.vision_parser.batch import TERMINAL_STATUSES, BatchClient
+from packages.vision_parser.utils import DEFAULT_DPI, is_pdf
+from .models import BatchJob, Document, ParsedResult
+from .parsing import build_parser_service, current_schema_version, get_google_api_key
+from .storage import document_path
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Results written per bulk insert while ingesting a job
+INGEST_BATCH_SIZE = 200
+# Per-request errors kept on the job for inspection
+MAX_RECORDED_ERRORS = 100
+
+
+def get_batch_client():
+    """Batch client for the configured provider (or local stand-in) endpoint."""
+    return BatchClient(
+        api_key=get_google_api_key(),
+        base_url=settings.VISION_PARSER_BATCH_BASE_URL or None
+    )
+
+
+def custom_id(document_id, page_number):
+    return f"{document_id}:{page_number}"
+
+
+def _split_custom_id(value):
+    document_id, page_number = value.split(':')
+    return int(document_id), int(page_number)
+
+
+def open_jobs():
+    """Jobs whose results have not been ingested and may still arrive."""
+    return BatchJob.objects.filter(ingested_at__isnull=True).exclude(
+        status__in=TERMINAL_STATUSES - {'completed'}
+    )
+
+
+def pending_pages():
+    """(document_id, page_number) pairs already submitted in an open job."""
+    return {
+        (document_id, page_number)
+        for pages in open_jobs().values_list('pages', flat=True)
+        for document_id, page_number in pages
+    }
+
+
+def submit_pages(pages, overwrite=False, client=None):
+    """
+    Submit (document, page_number) pairs as one provider batch job.
+
+    Pages that fail to render are logged and left out of the job. Nothing
+    is submitted when no page renders.
+
+    Returns:
+        The created BatchJob, or None if no page could be included
+    """
+    client = client or get_batch_client()
+    services = {}
+    included = []
+
+    def requests():
+        for document, page_number in pages:
+            schema_type = document.schema_type
+            try:
+                if schema_type not in services:
+                    services[schema_type] = build_parser_service(schema_type)
+                line = services[schema_type].batch_request(
+                    document_path(document),
+                    custom_id(document.pk, page_number),
+                    schema_type=schema_type,
+                    page_number=page_number
+                )
+            except Exception as e:
+                logger.error(f"Skipping document {document.pk} page {page_number} in batch: {str(e)}")
+                continue
+            included.append([document.pk, page_number])
+            yield line
+
+    # Pull the first line before submitting so an all-failed chunk does not
+    # upload an empty batch file
+    lines = requests()
+    first = next(lines, None)
+    if first is None:
+        logger.warning(f"No pages of {len(pages)} could be rendered; nothing submitted")
+        return None
+
+    batch_id = client.submit(itertools.chain([first], lines), metadata={'source': 'llm-parser-app'})
+    job = BatchJob.objects.create(
+        provider_batch_id=batch_id,
+        pages=included,
+        overwrite=overwrite,
+        request_count=len(included)
+    )
+    logger.info(f"Submitted batch {batch_id} with {len(included)} pages")
+    return job
+
+
+def sync_job(job, client=None):
+    """
+    Refresh a job's status from the provider and ingest its results once
+    it has completed.
+
+    Returns:
+        The updated BatchJob
+    """
+    client = client or get_batch_client()
+    status = client.status(job.provider_batch_id)
+    job.status = status['status']
+    job.succeeded_count = status['completed']
+    job.failed_count = status['failed']
+    if job.status == 'completed' and job.ingested_at is None:
+        _ingest(job, client, status)
+    job.save()
+    return job
+
+
+def _ingest(job, client, status):
+    """Store the results of a completed job as ParsedResult rows."""
+    documents = Document.objects.in_bulk({document_id for document_id, _ in job.pages})
+    schema_versions = {}
+    buffer = []
+    errors = []
+    stored = 0
+
+    for line_id, result, error in client.results(status):
+        if error is not None:
+            errors.append(f"{line_id}: {error}")
+            continue
+        document_id, page_number = _split_custom_id(line_id)
+        document = documents.get(document_id)
+        if document is None:
+            # Deleted while the job was running
+            continue
+        if document.schema_type not in schema_versions:
+            schema_versions[document.schema_type] = current_schema_version(document.schema_type)
+        buffer.append(ParsedResult(
+            document=document,
+            page_number=page_number,
+            result_data=result,
+            schema_version=schema_versions[document.schema_type],
+            # Batch requests are rendered once, at the default resolution
+            render_dpi=DEFAULT_DPI if is_pdf(document.file.name or document.archived_file.name) else None
+        ))
+        if len(buffer) >= INGEST_BATCH_SIZE:
+            _store(buffer, job.overwrite)
+            stored += len(buffer)
+            buffer = []
+
+    if buffer:
+        _store(buffer, job.overwrite)
+        stored += len(buffer)
+
+    job.error = '\n'.join(errors[:MAX_RECORDED_ERRORS])
+    job.ingested_at = timezone.now()
+    logger.info(f"Ingested {stored} results from batch {job.provider_batch_id} ({len(errors)} errors)")
+
+
+def _store(results, overwrite):
+    if overwrite:
+        ParsedResult.objects.bulk_create(
+            results,
+            update_conflicts=True,
+            unique_fields=['document', 'page_number'],
+            # Replaced archives are left to the retention GC
+            update_fields=['result_data', 'schema_version', 'render_dpi', 'result_archive', 'archived_at', 'updated_at'],
+        )
+    else:
+        # Interactive parses may have stored some of these pages meanwhile
+        ParsedResult.objects.bulk_create(results, ignore_conflicts=True)
@@ -0,0 +1,110 @@
+"""
+Schema classification for uploaded documents.
+"""
+import logging
+from typing import Optional
+
+from packages.vision_parser import ParserService
+from packages.vision_parser.classify import SchemaClassifier
+from packages.vision_parser.scheduler import AdmissionError
+from packages.vision_parser.utils import file_sha256
+from .models import Document, DocumentClassification, Schema
+from .parsing import SCHEMAS_DIR, get_google_api_key, model_slot
+from .storage import document_path
+from .tasks import submit_later
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Schema type requested at upload to have the schema detected. It is also
+# stored as the document's schema type while classification is pending.
+AUTO_SCHEMA = 'auto'
+
+# Schema type given to documents whose schema could not be detected
+FALLBACK_SCHEMA = 'resume'
+
+# Classifier calls refused by the scheduler are retried this many times,
+# this many seconds apart, before the fallback schema is used
+CLASSIFY_MAX_ATTEMPTS = 3
+CLASSIFY_RETRY_DELAY = 30
+
+
+def available_schemas():
+    """Built-in schemas from the schema directory plus all custom schemas."""
+    schemas = dict(ParserService(schema_dir=SCHEMAS_DIR).schemas)
+    for schema in Schema.objects.all():
+        schemas[schema.name] = schema.schema_json
+    return schemas
+
+
+def classify_document(document: Document, tenant=None) -> Optional[str]:
+    """
+    Detect and store the schema type of a document.
+
+    Results are cached per content hash, so re-uploads of the same file
+    skip classification entirely. Classifier calls take an interactive
+    model slot (see api.parsing.model_slot) for the tenant (usually a user id) and
+    raise AdmissionError when none is available. Returns the detected
+    schema type, or None if it could not be determined.
+    """
+    if not document.content_hash:
+        document.content_hash = file_sha256(document_path(document))
+        document.save(update_fields=['content_hash'])
+
+    schemas = available_schemas()
+    cached = DocumentClassification.objects.filter(content_hash=document.content_hash).first()
+    if cached and cached.schema_type in schemas:
+        schema_type = cached.schema_type
+    else:
+        classifier = SchemaClassifier(schemas, api_key=get_google_api_key())
+        with model_slot('interactive', tenant):
+            result = classifier.classify_document(document_path(document))
+        if result is None:
+            logger.info(f"Could not classify document {document.pk}")
+            return None
+
+        DocumentClassification.objects.update_or_create(
+            content_hash=document.content_hash,
+            defaults={
+                'schema_type': result.schema_type,
+                'confidence': result.confidence,
+                'method': result.method,
+            }
+        )
+        schema_type = result.schema_type
+        logger.info(
+            f"Classified document {document.pk} as {schema_type} "
+            f"({result.method}, confidence {result.confidence:.2f})"
+        )
+
+    document.schema_type = schema_type
+    document.save(update_fields=['schema_type'])
+    return schema_type
+
+
+def classify_uploaded_document(document_id: int, user_id: Optional[int] = None, attempt: int = 1) -> None:
+    """
+    Background task classifying a document uploaded with schema type "auto".
+
+    The document's schema type stays "auto" until this finishes, so parses
+    can tell classification is still pending. Calls refused by the
+    scheduler are retried later; if the schema cannot be detected the
+    document gets FALLBACK_SCHEMA rather than staying pending for good.
+    """
+    document = Document.objects.filter(pk=document_id, schema_type=AUTO_SCHEMA).first()
+    if document is None:
+        return
+    try:
+        if classify_document(document, tenant=user_id) is not None:
+            return
+    except AdmissionError as e:
+        if attempt < CLASSIFY_MAX_ATTEMPTS:
+            logger.info(f"Retrying classification of document {document_id} in {CLASSIFY_RETRY_DELAY}s: {str(e)}")
+            submit_later(CLASSIFY_RETRY_DELAY, classify_uploaded_document, document_id, user_id, attempt + 1)
+            return
+        logger.warning(f"Gave up classifying document {document_id}: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error classifying document {document_id}: {str(e)}")
+
+    document.schema_type = FALLBACK_SCHEMA
+    document.save(update_fields=['schema_type'])
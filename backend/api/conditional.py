@@ -0,0 +1,90 @@
+"""
+Conditional GET support for API viewsets.
+
+List and detail responses carry an ETag built from row versions and
+timestamps, plus a Last-Modified header. A request whose If-None-Match or
+If-Modified-Since still matches gets a 304 before anything is serialized.
+"""
+import hashlib
+
+from django.db.models import Count, Max, Sum
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _etag_matches(header, etag):
+    """Weak comparison of an If-None-Match header against our ETag."""
+    if header.strip() == '*':
+        return True
+    candidates = {tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(header)}
+    return etag in candidates
+
+
+class ConditionalGetMixin:
+    """
+    Add ETag/Last-Modified validation to ``list`` and ``retrieve``.
+
+    Models must have a ``version`` counter and the timestamp named by
+    ``etag_timestamp_field``.
+    """
+    etag_timestamp_field = 'updated_at'
+
+    def _not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, etag)
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if if_modified_since is not None and last_modified is not None:
+            return int(last_modified.timestamp()) <= if_modified_since
+        return False
+
+    def _conditional_response(self, request, fingerprint, last_modified, render):
+        etag = quote_etag(hashlib.sha1(fingerprint.encode('utf-8')).hexdigest())
+        if self._not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = render()
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Let clients cache, but make them revalidate every time
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        state = queryset.aggregate(
+            count=Count('pk'),
+            max_pk=Max('pk'),
+            versions=Sum('version'),
+            last_modified=Max(self.etag_timestamp_field),
+        )
+        fingerprint = ':'.join(str(part) for part in (
+            queryset.model._meta.label,
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            state['count'],
+            state['max_pk'],
+            state['versions'],
+            state['last_modified'].isoformat() if state['last_modified'] else '',
+        ))
+        return self._conditional_response(
+            request, fingerprint, state['last_modified'],
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = getattr(instance, self.etag_timestamp_field)
+        fingerprint = ':'.join(str(part) for part in (
+            instance._meta.label,
+            instance.pk,
+            instance.version,
+            request.accepted_renderer.format,
+            last_modified.isoformat(),
+        ))
+        return self._conditional_response(
+            request, fingerprint, last_modified,
+            lambda: Response(self.get_serializer(instance).data)
+        )
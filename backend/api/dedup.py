@@ -0,0 +1,147 @@
+"""
+Near-duplicate page detection with perceptual hashes.
+
+Each parsed page's dHash is stored in PageHash. Every worker keeps a BK-tree
+over those hashes and tops it up from the database before each lookup, so
+finding rescans of a page is sublinear in the number of stored pages.
+
+A 64-bit dHash only captures a page's layout: different documents filled in
+from the same template hash alike. Similar pages are therefore only offered
+(``/documents/{id}/similar/``); automatic reuse is off by default and, when
+enabled, also requires the same file and page or an identical text layer.
+"""
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+from packages.vision_parser.phash import BKTree, dhash
+from packages.vision_parser.utils import extract_text, file_sha256
+from .models import Document, PageHash, ParsedResult
+from .storage import document_path
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+_index = BKTree()
+# Current hash of every indexed page; tree entries for older hashes of a
+# page are skipped at search time (the tree does not support removal)
+_index_hashes = {}
+_index_since = None
+_index_lock = threading.Lock()
+
+
+def _refresh_index():
+    """Load page hashes stored or changed since the last refresh into the index."""
+    global _index_since
+    with _index_lock:
+        rows = PageHash.objects.order_by('updated_at')
+        if _index_since is not None:
+            # Inclusive, so rows saved in the same instant are not missed
+            rows = rows.filter(updated_at__gte=_index_since)
+        rows = rows.values_list('document_id', 'page_number', 'dhash', 'updated_at')
+        for document_id, page_number, hash_hex, updated_at in rows.iterator(chunk_size=2000):
+            key = (document_id, page_number)
+            hash_value = int(hash_hex, 16)
+            if _index_hashes.get(key) != hash_value:
+                _index.add(hash_value, (key, hash_value))
+                _index_hashes[key] = hash_value
+            _index_since = updated_at
+
+
+def record_page_hash(document: Document, page_number: int, image: bytes) -> int:
+    """Compute and store the perceptual hash of a rendered page."""
+    hash_value = dhash(image)
+    PageHash.objects.update_or_create(
+        document=document,
+        page_number=page_number,
+        defaults={'dhash': f"{hash_value:016x}"}
+    )
+    return hash_value
+
+
+def find_similar_results(
+    document: Document,
+    page_number: int,
+    hash_value: int,
+    schema_type: str,
+    max_distance: Optional[int] = None
+) -> List[Tuple[int, ParsedResult]]:
+    """
+    Find stored results for pages that look like the given page.
+
+    Only results of documents with the same schema type are returned, so a
+    reused result always has the expected shape.
+
+    Returns:
+        (distance, result) pairs, closest first
+    """
+    if max_distance is None:
+        max_distance = settings.PHASH_MAX_DISTANCE
+    _refresh_index()
+
+    candidates = [
+        (distance, key) for distance, (key, indexed_hash) in _index.search(hash_value, max_distance)
+        if key != (document.pk, page_number) and _index_hashes.get(key) == indexed_hash
+    ]
+    if not candidates:
+        return []
+
+    results = {
+        (result.document_id, result.page_number): result
+        for result in ParsedResult.objects.filter(
+            document_id__in={key[0] for _, key in candidates},
+            document__schema_type=schema_type,
+        ).select_related('document')
+    }
+    return [(distance, results[key]) for distance, key in candidates if key in results]
+
+
+def find_reusable_result(
+    document: Document,
+    page_number: int,
+    image: bytes,
+    schema_type: str
+) -> Optional[ParsedResult]:
+    """
+    Record the page's hash and return the closest near-duplicate result
+    that holds the same content, if reuse is enabled.
+
+    A perceptual match alone is not enough (see the module docstring): the
+    match must be the same page of an identical file, or a page with the
+    same non-empty text layer.
+    """
+    hash_value = record_page_hash(document, page_number, image)
+    if not settings.PHASH_REUSE_RESULTS:
+        return None
+
+    for distance, result in find_similar_results(document, page_number, hash_value, schema_type):
+        if _same_content(document, page_number, result):
+            logger.info(
+                f"Document {document.pk} page {page_number} matches result {result.pk} "
+                f"at distance {distance}; reusing it"
+            )
+            return result
+    return None
+
+
+def _page_text(document: Document, page_number: int) -> str:
+    """Whitespace-normalized text layer of a page, or '' if it has none."""
+    try:
+        return ' '.join(extract_text(document_path(document), page_number).split())
+    except Exception as e:
+        logger.warning(f"Could not read text of document {document.pk} page {page_number}: {e}")
+        return ''
+
+
+def _same_content(document: Document, page_number: int, result: ParsedResult) -> bool:
+    """Whether a perceptually similar result's page holds the same content."""
+    if not document.content_hash:
+        document.content_hash = file_sha256(document_path(document))
+        document.save(update_fields=['content_hash'])
+    if document.content_hash == result.document.content_hash and page_number == result.page_number:
+        return True
+
+    text = _page_text(document, page_number)
+    return bool(text) and text == _page_text(result.document, result.page_number)
@@ -0,0 +1,282 @@
+"""
+Streaming export of parsed results as NDJSON, CSV or Parquet.
+
+Rows are read with a server-side cursor in fixed-size chunks and written
+out as they arrive, so memory use stays constant however many results are
+exported. CSV and Parquet columns are derived from the schema: nested
+objects become dotted columns and arrays are written as JSON strings.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from django.utils import timezone
+
+from .classification import available_schemas
+from .models import ParsedResult, read_archived_result
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+EXPORT_FORMATS = ('ndjson', 'csv', 'parquet')
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Rows fetched per database round trip
+CHUNK_SIZE = 2000
+# Bytes buffered before a text chunk is handed to the writer
+FLUSH_SIZE = 64 * 1024
+# Rows per Parquet row group
+ROW_GROUP_SIZE = 10000
+
+# Columns written before the schema's own fields
+META_COLUMNS = ['id', 'document_id', 'page_number', 'parsed_at']
+
+
+class ExportError(Exception):
+    """Invalid export parameters."""
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD filter value into an aware datetime."""
+    try:
+        return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+    except ValueError:
+        raise ExportError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+def export_rows(schema=None, since=None, until=None, document_id=None):
+    """
+    Iterate (id, document_id, page_number, parsed_at, result_data) tuples
+    in id order through a chunked server-side cursor. Archived results are
+    read back from archive storage.
+    """
+    queryset = ParsedResult.objects.order_by('id')
+    if schema:
+        queryset = queryset.filter(document__schema_type=schema)
+    if since:
+        queryset = queryset.filter(parsed_at__gte=since)
+    if until:
+        queryset = queryset.filter(parsed_at__lt=until)
+    if document_id:
+        queryset = queryset.filter(document_id=document_id)
+    rows = queryset.values_list(*META_COLUMNS, 'result_data', 'result_archive', 'archived_at')
+    for *meta, result_data, result_archive, archived_at in rows.iterator(chunk_size=CHUNK_SIZE):
+        if archived_at is not None:
+            result_data = read_archived_result(result_archive)
+        yield (*meta, result_data)
+
+
+def schema_columns(schema_json, prefix=''):
+    """
+    List (column, JSON type) pairs for a schema's leaf fields.
+
+    Objects with properties are flattened into dotted names; anything else
+    (arrays, untyped values) is a single column.
+    """
+    columns = []
+    for name, subschema in schema_json.get('properties', {}).items():
+        column = f"{prefix}{name}"
+        if subschema.get('type') == 'object' and subschema.get('properties'):
+            columns.extend(schema_columns(subschema, f"{column}."))
+        else:
+            kind = subschema.get('type')
+            columns.append((column, kind if isinstance(kind, str) else None))
+    return columns
+
+
+def get_columns(schema_name):
+    """Flattened columns of the named schema."""
+    schema_json = available_schemas().get(schema_name)
+    if schema_json is None:
+        raise ExportError(f"Unknown schema '{schema_name}'")
+    return schema_columns(schema_json)
+
+
+def _lookup(data, column):
+    for part in column.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _cell(value):
+    """Text form of a leaf value for CSV."""
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return _dumps(value)
+    return value
+
+
+def iter_ndjson(rows):
+    """Yield NDJSON bytes, one object per result, in ~FLUSH_SIZE chunks."""
+    buffer = bytearray()
+    for result_id, document_id, page_number, parsed_at, result_data in rows:
+        record = {
+            'id': result_id,
+            'document_id': document_id,
+            'page_number': page_number,
+            'parsed_at': parsed_at.isoformat(),
+            'result': result_data,
+        }
+        if orjson is not None:
+            buffer += orjson.dumps(record)
+        else:
+            buffer += json.dumps(record, ensure_ascii=False).encode('utf-8')
+        buffer += b'\n'
+        if len(buffer) >= FLUSH_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def iter_csv(rows, columns):
+    """Yield CSV bytes with one column per flattened schema field."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(META_COLUMNS + [column for column, _ in columns])
+    for result_id, document_id, page_number, parsed_at, result_data in rows:
+        writer.writerow(
+            [result_id, document_id, page_number, parsed_at.isoformat()]
+            + [_cell(_lookup(result_data, column)) for column, _ in columns]
+        )
+        if output.tell() >= FLUSH_SIZE:
+            yield output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue().encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only file object collecting bytes for the caller to drain."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError("Parquet export requires the pyarrow package")
+    return pyarrow
+
+
+def _coerce(value, kind):
+    """Convert a leaf value to the Parquet column type, or None if it doesn't fit."""
+    if value is None:
+        return None
+    try:
+        if kind == 'integer':
+            return int(value)
+        if kind == 'number':
+            return float(value)
+        if kind == 'boolean':
+            return value if isinstance(value, bool) else None
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, (dict, list)):
+        return _dumps(value)
+    return str(value)
+
+
+def iter_parquet(rows, columns):
+    """Yield Parquet bytes, one row group per ROW_GROUP_SIZE results."""
+    pa = _import_pyarrow()
+    arrow_types = {'integer': pa.int64(), 'number': pa.float64(), 'boolean': pa.bool_()}
+    arrow_schema = pa.schema(
+        [
+            ('id', pa.int64()),
+            ('document_id', pa.int64()),
+            ('page_number', pa.int64()),
+            ('parsed_at', pa.timestamp('us', tz='UTC')),
+        ]
+        + [(column, arrow_types.get(kind, pa.string())) for column, kind in columns]
+    )
+
+    sink = _ChunkSink()
+    writer = pa.parquet.ParquetWriter(sink, arrow_schema, compression='zstd')
+    batch = {name: [] for name in arrow_schema.names}
+
+    def write_batch():
+        writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=arrow_schema))
+        for values in batch.values():
+            values.clear()
+
+    count = 0
+    for result_id, document_id, page_number, parsed_at, result_data in rows:
+        batch['id'].append(result_id)
+        batch['document_id'].append(document_id)
+        batch['page_number'].append(page_number)
+        batch['parsed_at'].append(parsed_at)
+        for column, kind in columns:
+            batch[column].append(_coerce(_lookup(result_data, column), kind))
+        count += 1
+        if count % ROW_GROUP_SIZE == 0:
+            write_batch()
+            yield sink.drain()
+
+    if count % ROW_GROUP_SIZE:
+        write_batch()
+    writer.close()
+    yield sink.drain()
+
+
+def export(export_format, schema=None, since=None, until=None, document_id=None):
+    """
+    Stream an export as an iterator of byte chunks.
+
+    CSV and Parquet need a schema to derive their columns. Parameter errors
+    raise ExportError before any row is read.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown export format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+    if export_format == 'ndjson':
+        return iter_ndjson(export_rows(schema, since, until, document_id))
+
+    if not schema:
+        raise ExportError(f"{export_format.upper()} export requires a schema")
+    columns = get_columns(schema)
+    rows = export_rows(schema, since, until, document_id)
+    if export_format == 'csv':
+        return iter_csv(rows, columns)
+    _import_pyarrow()
+    return iter_parquet(rows, columns)
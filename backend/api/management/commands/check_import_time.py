@@ -0,0 +1,68 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.warmup import HEAVY_MODULES
+
+# "import time: self [us] | cumulative | imported package"
+_importtime_re = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+class Command(BaseCommand):
+    help = 'Measure the cold import time of the WSGI application and URLconf against a budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=settings.IMPORT_TIME_BUDGET_MS,
+            help='Maximum allowed import time in milliseconds',
+        )
+        parser.add_argument('--top', type=int, default=10, help='Number of slowest modules to list')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')}
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import config.wsgi, config.urls'],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f"Importing the application failed:\n{completed.stderr[-2000:]}")
+
+        total_us = 0
+        modules = []
+        for line in completed.stderr.splitlines():
+            match = _importtime_re.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            # Top-level imports (no indent) add up to the total
+            if len(indent) == 1:
+                total_us += int(cumulative_us)
+            modules.append((int(cumulative_us), name))
+
+        modules.sort(reverse=True)
+        self.stdout.write("Slowest imports (cumulative):")
+        for cumulative_us, name in modules[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+        loaded = {name for _, name in modules}
+        eager = [module for module in HEAVY_MODULES if module in loaded]
+        if eager:
+            self.stdout.write(self.style.WARNING(
+                f"Heavy modules imported at startup: {', '.join(eager)}"
+            ))
+
+        total_ms = total_us / 1000
+        if total_ms > options['budget_ms']:
+            raise CommandError(f"Import time {total_ms:.0f} ms exceeds the budget of {options['budget_ms']:.0f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Import time {total_ms:.0f} ms is within the budget of {options['budget_ms']:.0f} ms"
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.webhooks import deliver_due
+
+
+class Command(BaseCommand):
+    help = 'Retry pending webhook deliveries whose backoff has expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running and sweep every --interval seconds')
+        parser.add_argument('--interval', type=int, default=30, help='Seconds between sweeps with --loop')
+        parser.add_argument('--limit', type=int, default=100, help='Deliveries attempted per sweep')
+
+    def handle(self, *args, **options):
+        while True:
+            attempted = deliver_due(limit=options['limit'])
+            if attempted:
+                self.stdout.write(f"Attempted {attempted} deliveries")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.retention import PHASES, RateLimiter
+
+
+class Command(BaseCommand):
+    help = (
+        'Apply retention policies: expire old originals, archive cold results and '
+        'garbage-collect orphaned files, render caches, uploads and old records'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', choices=list(PHASES), help='Run only these phases')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without changing it')
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=settings.RETENTION_RATE,
+            help='Maximum deletes or moves per second (0 for unlimited)',
+        )
+        parser.add_argument('--limit', type=int, help='Maximum operations per phase and pass')
+        parser.add_argument('--loop', action='store_true', help='Keep running and start a pass every --interval seconds')
+        parser.add_argument('--interval', type=int, default=3600, help='Seconds between passes with --loop')
+
+    def handle(self, *args, **options):
+        phases = options['only'] or list(PHASES)
+        while True:
+            limiter = RateLimiter(options['rate'])
+            for name in phases:
+                started = time.monotonic()
+                count = PHASES[name](limiter, dry_run=options['dry_run'], limit=options['limit'])
+                verb = 'Would process' if options['dry_run'] else 'Processed'
+                self.stdout.write(f"{name}: {verb} {count} items in {time.monotonic() - started:.1f}s")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
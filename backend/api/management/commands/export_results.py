@@ -0,0 +1,56 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import EXPORT_FORMATS, ExportError, export, parse_date
+
+
+class Command(BaseCommand):
+    help = 'Stream parsed results to a file as NDJSON, schema-flattened CSV or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Output file path, or '-' for stdout (NDJSON and CSV only)")
+        parser.add_argument('--format', choices=EXPORT_FORMATS, help='Export format (default: from the file extension)')
+        parser.add_argument('--schema', help='Only export results of documents with this schema type')
+        parser.add_argument('--since', help='Only results parsed on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Only results parsed before this date (YYYY-MM-DD)')
+        parser.add_argument('--document', type=int, help='Only results of this document')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        export_format = options['format'] or os.path.splitext(output)[1].lstrip('.').lower() or 'ndjson'
+        if export_format == 'jsonl':
+            export_format = 'ndjson'
+
+        try:
+            chunks = export(
+                export_format,
+                schema=options['schema'],
+                since=parse_date(options['since']) if options['since'] else None,
+                until=parse_date(options['until']) if options['until'] else None,
+                document_id=options['document']
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        if output == '-':
+            if export_format == 'parquet':
+                raise CommandError('Parquet cannot be written to stdout')
+            for chunk in chunks:
+                self.stdout.write(chunk.decode('utf-8'), ending='')
+            return
+
+        started = time.monotonic()
+        written = 0
+        tmp_path = f"{output}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        os.replace(tmp_path, output)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written / 1024 ** 2:.1f} MB to {output} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,133 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.batching import get_batch_client, open_jobs, pending_pages, submit_pages, sync_job
+from api.classification import AUTO_SCHEMA
+from api.models import BatchJob, Document, ParsedResult
+from .parse_bulk import Command as BulkCommand, _parse_date
+
+
+class Command(BaseCommand):
+    help = (
+        'Parse documents through provider batch jobs: cheaper than parse_bulk and '
+        'leaves the interactive rate limit free, but results arrive within hours'
+    )
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        submit = subparsers.add_parser('submit', help='Submit unparsed pages as batch jobs')
+        submit.add_argument('--schema', help='Only parse documents with this schema type')
+        submit.add_argument('--since', help='Only parse documents uploaded on or after this date (YYYY-MM-DD)')
+        submit.add_argument('--until', help='Only parse documents uploaded before this date (YYYY-MM-DD)')
+        submit.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Re-parse pages that already have a result instead of only missing pages',
+        )
+        submit.add_argument(
+            '--max-requests',
+            type=int,
+            default=settings.VISION_PARSER_BATCH_MAX_REQUESTS,
+            help='Pages per batch job',
+        )
+
+        sync = subparsers.add_parser('sync', help='Refresh open jobs and ingest completed ones')
+        sync.add_argument('--wait', action='store_true', help='Keep polling until no job is open')
+        sync.add_argument('--interval', type=int, default=60, help='Seconds between polls with --wait')
+
+        cancel = subparsers.add_parser('cancel', help='Cancel batch jobs')
+        cancel.add_argument('batch_ids', nargs='+', help='Provider batch IDs')
+
+    def handle(self, *args, **options):
+        getattr(self, f"_{options['action']}")(options)
+
+    def _submit(self, options):
+        if options['max_requests'] < 1:
+            raise CommandError('--max-requests must be at least 1')
+
+        pages = self._select_pages(options)
+        if not pages:
+            self.stdout.write(self.style.SUCCESS('Nothing to submit'))
+            return
+
+        client = get_batch_client()
+        size = options['max_requests']
+        submitted = 0
+        for start in range(0, len(pages), size):
+            chunk = pages[start:start + size]
+            job = submit_pages(chunk, overwrite=options['overwrite'], client=client)
+            if job is None:
+                self.stderr.write(f"Skipped {len(chunk)} pages: none could be rendered")
+                continue
+            submitted += job.request_count
+            self.stdout.write(f"Submitted {job.provider_batch_id} with {job.request_count} pages")
+        self.stdout.write(self.style.SUCCESS(
+            f"Submitted {submitted} pages; run 'parse_batch sync' to ingest results"
+        ))
+
+    def _sync(self, options):
+        client = get_batch_client()
+        while True:
+            jobs = list(open_jobs())
+            for job in jobs:
+                try:
+                    sync_job(job, client=client)
+                except Exception as e:
+                    self.stderr.write(f"Failed to sync {job.provider_batch_id}: {e}")
+                    continue
+                self.stdout.write(
+                    f"{job.provider_batch_id}: {job.status}, "
+                    f"{job.succeeded_count + job.failed_count}/{job.request_count} done"
+                    + (' (ingested)' if job.ingested_at else '')
+                )
+
+            remaining = open_jobs().count()
+            if not options['wait'] or not remaining:
+                break
+            time.sleep(options['interval'])
+
+        if remaining:
+            self.stdout.write(f"{remaining} jobs still open")
+        else:
+            self.stdout.write(self.style.SUCCESS('All batch jobs synced'))
+
+    def _cancel(self, options):
+        client = get_batch_client()
+        for batch_id in options['batch_ids']:
+            if not BatchJob.objects.filter(provider_batch_id=batch_id).exists():
+                raise CommandError(f"Unknown batch job '{batch_id}'")
+            client.cancel(batch_id)
+            BatchJob.objects.filter(provider_batch_id=batch_id).update(status='cancelling')
+            self.stdout.write(f"Cancelling {batch_id}")
+
+    def _select_pages(self, options):
+        """Expand the selected documents into (document, page) pairs not already in an open job."""
+        # Documents still waiting for schema detection are parsed once it is done
+        documents = Document.objects.exclude(schema_type=AUTO_SCHEMA).order_by('id')
+        if options['schema']:
+            documents = documents.filter(schema_type=options['schema'])
+        if options['since']:
+            documents = documents.filter(uploaded_at__gte=_parse_date(options['since']))
+        if options['until']:
+            documents = documents.filter(uploaded_at__lt=_parse_date(options['until']))
+
+        skip = pending_pages()
+        if not options['overwrite']:
+            skip |= set(ParsedResult.objects.filter(
+                document__in=documents
+            ).values_list('document_id', 'page_number'))
+
+        pages = []
+        for document in documents.iterator(chunk_size=500):
+            try:
+                page_count = document.page_count or BulkCommand._page_count(document)
+            except Exception as e:
+                self.stderr.write(f"Skipping document {document.pk}: {e}")
+                continue
+            for page_number in range(1, page_count + 1):
+                if (document.pk, page_number) not in skip:
+                    pages.append((document, page_number))
+        return pages
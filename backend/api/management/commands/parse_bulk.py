@@ -0,0 +1,254 @@
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from packages.vision_parser.utils import IMAGE_MIME_TYPES, pdf_page_count
+from api.classification import AUTO_SCHEMA
+from api.models import Document, ParsedResult
+from api.parsing import build_parser_service, current_schema_version, model_slot
+from api.storage import document_path
+
+
+class Checkpoint:
+    """
+    Set of completed (document, page) pairs persisted to a JSON file.
+
+    The file is rewritten atomically after each committed batch, so a crash
+    loses at most the pages of the batch that was in flight.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = set()
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.completed = set(json.load(f).get('completed', []))
+
+    @staticmethod
+    def key(document_id, page_number):
+        return f"{document_id}:{page_number}"
+
+    def __contains__(self, item):
+        return self.key(*item) in self.completed
+
+    def add(self, document_id, page_number):
+        self.completed.add(self.key(document_id, page_number))
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'completed': sorted(self.completed)}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.completed = set()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _parse_page(service, **kwargs):
+    """
+    Parse one page in a backfill model slot.
+
+    The shared backfill limit also counts slots held by other processes,
+    so --workers above it only queues.
+    """
+    try:
+        with model_slot('backfill'):
+            return service.parse_page(**kwargs)
+    finally:
+        # The shared slot opens a connection in this worker thread; close it
+        # rather than leave one idle connection per worker behind
+        connection.close()
+
+
+def _parse_date(value):
+    try:
+        return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Parse documents in bulk with a bounded worker pool, committing results in checkpointed batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', help='Only parse documents with this schema type')
+        parser.add_argument('--since', help='Only parse documents uploaded on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Only parse documents uploaded before this date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Re-parse pages that already have a result instead of only missing pages',
+        )
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent model calls')
+        parser.add_argument('--batch-size', type=int, default=50, help='Results committed per batch')
+        parser.add_argument(
+            '--checkpoint',
+            default='parse_bulk.checkpoint.json',
+            help='Checkpoint file used to resume an interrupted run',
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignore and remove an existing checkpoint')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be at least 1')
+
+        checkpoint = Checkpoint(options['checkpoint'])
+        if options['restart']:
+            checkpoint.clear()
+        elif checkpoint.completed:
+            self.stdout.write(f"Resuming from checkpoint with {len(checkpoint.completed)} completed pages")
+
+        pages = self._select_pages(options, checkpoint)
+        total = len(pages)
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Nothing to parse'))
+            return
+        self.stdout.write(f"Parsing {total} pages with {options['workers']} workers")
+
+        services = {}
+        # Version each schema type's service was built from, recorded on its results
+        schema_versions = {}
+        buffer = []
+        done = failed = 0
+        started = last_report = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            pending = {}
+            queue = iter(pages)
+            max_in_flight = options['workers'] * 2
+
+            while True:
+                # Keep a bounded number of pages in flight
+                for document, page_number in queue:
+                    schema_type = document.schema_type
+                    if schema_type not in services:
+                        schema_versions[schema_type] = current_schema_version(schema_type)
+                        services[schema_type] = build_parser_service(schema_type)
+                    future = executor.submit(
+                        _parse_page,
+                        services[schema_type],
+                        document_path=document_path(document),
+                        schema_type=schema_type,
+                        page_number=page_number,
+                    )
+                    pending[future] = (document, page_number)
+                    if len(pending) >= max_in_flight:
+                        break
+
+                if not pending:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    document, page_number = pending.pop(future)
+                    try:
+                        result, render_dpi = future.result()
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f"Failed document {document.pk} page {page_number}: {e}")
+                        continue
+                    buffer.append(ParsedResult(
+                        document=document,
+                        page_number=page_number,
+                        result_data=result,
+                        schema_version=schema_versions[document.schema_type],
+                        render_dpi=render_dpi
+                    ))
+                    done += 1
+
+                if len(buffer) >= options['batch_size']:
+                    self._commit(buffer, checkpoint, options['overwrite'])
+                    buffer = []
+
+                now = time.monotonic()
+                if now - last_report >= 5:
+                    last_report = now
+                    self._report(done, failed, total, now - started)
+
+        if buffer:
+            self._commit(buffer, checkpoint, options['overwrite'])
+
+        self._report(done, failed, total, time.monotonic() - started)
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f"{failed} pages failed; run the command again to retry them"
+            ))
+        else:
+            checkpoint.clear()
+            self.stdout.write(self.style.SUCCESS('Bulk parse complete'))
+
+    def _select_pages(self, options, checkpoint):
+        """Expand the selected documents into the (document, page) pairs to parse."""
+        # Documents still waiting for schema detection are parsed once it is done
+        documents = Document.objects.exclude(schema_type=AUTO_SCHEMA).order_by('id')
+        if options['schema']:
+            documents = documents.filter(schema_type=options['schema'])
+        if options['since']:
+            documents = documents.filter(uploaded_at__gte=_parse_date(options['since']))
+        if options['until']:
+            documents = documents.filter(uploaded_at__lt=_parse_date(options['until']))
+
+        parsed = set()
+        if not options['overwrite']:
+            parsed = set(ParsedResult.objects.filter(
+                document__in=documents
+            ).values_list('document_id', 'page_number'))
+
+        pages = []
+        for document in documents.iterator(chunk_size=500):
+            try:
+                page_count = self._page_count(document)
+            except Exception as e:
+                self.stderr.write(f"Skipping document {document.pk}: {e}")
+                continue
+            for page_number in range(1, page_count + 1):
+                key = (document.pk, page_number)
+                if key not in parsed and key not in checkpoint:
+                    pages.append((document, page_number))
+        return pages
+
+    @staticmethod
+    def _page_count(document):
+        _, ext = os.path.splitext(document.file.name.lower())
+        if ext == '.pdf':
+            return pdf_page_count(document_path(document))
+        if ext in IMAGE_MIME_TYPES:
+            return 1
+        raise ValueError(f"Unsupported file format: {ext}")
+
+    @staticmethod
+    def _commit(results, checkpoint, overwrite):
+        """Write a batch of results and record them in the checkpoint."""
+        if overwrite:
+            ParsedResult.objects.bulk_create(
+                results,
+                update_conflicts=True,
+                unique_fields=['document', 'page_number'],
+                # Replaced archives are left to the retention GC
+                update_fields=['result_data', 'schema_version', 'render_dpi', 'result_archive', 'archived_at', 'updated_at'],
+            )
+        else:
+            # Interactive parses may have stored some of these pages meanwhile
+            ParsedResult.objects.bulk_create(results, ignore_conflicts=True)
+        for result in results:
+            checkpoint.add(result.document_id, result.page_number)
+        checkpoint.save()
+
+    def _report(self, done, failed, total, elapsed):
+        rate = done / elapsed if elapsed else 0.0
+        remaining = total - done - failed
+        eta = f"{remaining / rate:.0f}s" if rate else 'unknown'
+        self.stdout.write(
+            f"{done + failed}/{total} pages ({failed} failed), "
+            f"{rate:.2f} pages/s, ETA {eta}"
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from api.classification import AUTO_SCHEMA, classify_uploaded_document
+from api.models import Document
+from api.tasks import compute_document_metadata
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute page count, page size, text layer, content hash and thumbnail for documents, '
+        'and detect the schema of uploads whose classification never finished'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute metadata for every document, not only those missing it',
+        )
+
+    def handle(self, *args, **options):
+        documents = Document.objects.order_by('id')
+        if not options['all']:
+            documents = documents.filter(metadata_computed_at__isnull=True)
+
+        done = failed = 0
+        for document_id in documents.values_list('id', flat=True).iterator():
+            try:
+                compute_document_metadata(document_id)
+                done += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed document {document_id}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Computed metadata for {done} documents ({failed} failed)"))
+
+        # Uploads whose background classification was lost, e.g. to a restart
+        pending = Document.objects.filter(schema_type=AUTO_SCHEMA).order_by('id')
+        classified = 0
+        for document_id in pending.values_list('id', flat=True).iterator():
+            classify_uploaded_document(document_id)
+            classified += 1
+        if classified:
+            self.stdout.write(self.style.SUCCESS(f"Classified {classified} pending documents"))
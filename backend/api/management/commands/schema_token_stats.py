@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from packages.vision_parser import ParserService
+from packages.vision_parser.compaction import compaction_stats
+from packages.vision_parser.parser import DEFAULT_PROMPT
+from api.models import Schema
+from api.parsing import SCHEMAS_DIR
+
+
+class Command(BaseCommand):
+    help = 'Measure the input tokens saved by schema and prompt compaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-descriptions',
+            action='store_true',
+            help='Keep nested field descriptions when minifying',
+        )
+
+    def handle(self, *args, **options):
+        parser_service = ParserService(schema_dir=SCHEMAS_DIR, compact=True)
+        for schema in Schema.objects.all():
+            parser_service.add_schema(schema.name, schema.schema_json)
+
+        total_before = total_after = 0
+        for name, schema in sorted(parser_service.schemas.items()):
+            stats = compaction_stats(
+                schema,
+                prompt=DEFAULT_PROMPT,
+                compact_prompt=parser_service.get_prompt(name),
+                keep_descriptions=options['keep_descriptions'],
+            )
+            total_before += stats['tokens_before']
+            total_after += stats['tokens_after']
+            self.stdout.write(
+                f"{name}: {stats['tokens_before']} -> {stats['tokens_after']} tokens "
+                f"({stats['saved_ratio']:.0%} saved)"
+            )
+
+        saved = (total_before - total_after) / total_before if total_before else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Total: {total_before} -> {total_after} tokens per page ({saved:.0%} saved)"
+        ))
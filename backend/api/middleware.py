@@ -0,0 +1,127 @@
+"""
+API middleware.
+"""
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+_encoding_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def _accepted_encodings(header):
+    """Parse Accept-Encoding into the set of codings with a non-zero q-value."""
+    accepted = set()
+    for coding, quality in _encoding_re.findall(header or ''):
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Compress responses above COMPRESSION_MIN_SIZE bytes.
+
+    Negotiates brotli (when the brotli package is installed) ahead of gzip.
+    Streaming responses are left alone, so exports keep constant memory.
+
+    Compressing authenticated responses that carry secrets, such as auth
+    tokens and webhook signing secrets, exposes them to BREACH-style
+    attacks when an attacker can also reflect chosen text into the same
+    response and watch its size over HTTPS. Views returning secrets should
+    not echo request input in the same body, or should set
+    Content-Encoding: identity so the response is skipped here.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if brotli is not None and 'br' in accepted:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = gzip.compress(response.content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+        else:
+            return response
+
+        # Return the compressed content only if it's actually shorter
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The body differs from the identity encoding, so the ETag can only be weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profile staff requests sent with ``X-Profile: 1`` and a sampled share
+    of all requests; see api.profiling. Must come after
+    AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from .profiling import profile_request, should_profile
+
+        profile, user = should_profile(request)
+        if not profile:
+            return self.get_response(request)
+        return profile_request(self.get_response, request, user)
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the queries and database time of each request and report views
+    that go over their declared budget; see api.querybudget.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from .querybudget import count_queries, report
+
+        if settings.QUERY_BUDGET_ACTION == 'off':
+            return self.get_response(request)
+        with count_queries() as counter:
+            response = self.get_response(request)
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None:
+            report(f"{request.method} {request.path}", budget, counter, settings.QUERY_BUDGET_ACTION)
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(counter.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        from .querybudget import view_budget
+
+        request._query_budget = view_budget(view_func, request.method)
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_document_content_hash_documentclassification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parsedresult',
+            name='reused_from',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reused_by', to='api.parsedresult'),
+        ),
+        migrations.CreateModel(
+            name='PageHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField(default=1)),
+                ('dhash', models.CharField(max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_hashes', to='api.document')),
+            ],
+            options={
+                'unique_together': {('document', 'page_number')},
+            },
+        ),
+    ]
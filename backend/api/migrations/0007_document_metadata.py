@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_parsedresult_reused_from_pagehash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='page_width',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='page_height',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='has_text_layer',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='thumbnail',
+            field=models.FileField(blank=True, upload_to='thumbnails/'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='metadata_computed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
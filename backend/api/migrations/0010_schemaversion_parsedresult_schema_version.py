@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def snapshot_existing_schemas(apps, schema_editor):
+    Schema = apps.get_model('api', 'Schema')
+    SchemaVersion = apps.get_model('api', 'SchemaVersion')
+    for schema in Schema.objects.all():
+        SchemaVersion.objects.get_or_create(
+            schema=schema,
+            version=schema.version,
+            defaults={'schema_json': schema.schema_json}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_versions_and_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchemaVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('schema_json', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('schema', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='api.schema')),
+            ],
+            options={
+                'ordering': ['schema', 'version'],
+                'unique_together': {('schema', 'version')},
+            },
+        ),
+        migrations.AddField(
+            model_name='parsedresult',
+            name='schema_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='results', to='api.schemaversion'),
+        ),
+        migrations.RunPython(snapshot_existing_schemas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_requestprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='archived_file',
+            field=models.FileField(blank=True, storage=api.storage.archive_storage, upload_to='archive/documents/'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='original_expired_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='parsedresult',
+            name='result_archive',
+            field=models.FileField(blank=True, storage=api.storage.archive_storage, upload_to='archive/results/'),
+        ),
+        migrations.AddField(
+            model_name='parsedresult',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
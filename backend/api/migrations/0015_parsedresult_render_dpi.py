@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parsedresult',
+            name='render_dpi',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_parsedresult_render_dpi'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pagehash',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_pagehash_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(max_length=255, upload_to='documents/'),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='thumbnail',
+            field=models.FileField(blank=True, max_length=255, upload_to='thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='requestprofile',
+            name='artifact',
+            field=models.FileField(blank=True, max_length=255, upload_to='profiles/'),
+        ),
+    ]
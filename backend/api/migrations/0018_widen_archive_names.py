@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_sharded_file_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='archived_file',
+            field=models.FileField(blank=True, max_length=255, storage=api.storage.archive_storage, upload_to='archive/documents/'),
+        ),
+        migrations.AlterField(
+            model_name='parsedresult',
+            name='result_archive',
+            field=models.FileField(blank=True, max_length=255, storage=api.storage.archive_storage, upload_to='archive/results/'),
+        ),
+    ]
@@ -1,4 +1,14 @@
-from django.db import models
+import gzip
+import json
+import secrets
+import uuid
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .storage import archive_storage
 
 
 class Item(models.Model):
@@ -11,7 +21,47 @@ class Item(models.Model):
         return self.name
 
 
-class Document(models.Model):
+def read_archived_result(name):
+    """Load a result archived as gzipped JSON by the retention policy."""
+    with archive_storage().open(name, 'rb') as f:
+        return json.loads(gzip.decompress(f.read()))
+
+
+class VersionedModel(models.Model):
+    """
+    Abstract model with a version counter bumped on every save.
+
+    Together with the row's timestamp, the version feeds the ETags used
+    for conditional GETs.
+
+    The counter is incremented in the database, so concurrent saves of the
+    same row each get their own version. The update locks the row until
+    the surrounding transaction ends.
+    """
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version', 'updated_at'}
+        previous = self.version
+        try:
+            with transaction.atomic():
+                self.version = F('version') + 1
+                super().save(*args, **kwargs)
+                self.refresh_from_db(fields=['version'])
+        except Exception:
+            self.version = previous
+            raise
+
+
+class Document(VersionedModel):
     SCHEMA_CHOICES = [
         ('resume', 'Resume'),
         ('invoice', 'Invoice'),
@@ -19,32 +69,60 @@ class Document(models.Model):
         ('id_card', 'ID Card')
     ]
     
-    file = models.FileField(upload_to='documents/')
+    file = models.FileField(upload_to='documents/', max_length=255)
     name = models.CharField(max_length=255)
     schema_type = models.CharField(max_length=100, default='resume')
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Metadata computed once in the background after upload
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    page_width = models.FloatField(null=True, blank=True)
+    page_height = models.FloatField(null=True, blank=True)
+    has_text_layer = models.BooleanField(null=True, blank=True)
+    thumbnail = models.FileField(upload_to='thumbnails/', max_length=255, blank=True)
+    metadata_computed_at = models.DateTimeField(null=True, blank=True)
+    # Set by the retention policy once the original leaves default storage
+    archived_file = models.FileField(upload_to='archive/documents/', storage=archive_storage, max_length=255, blank=True)
+    original_expired_at = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_schema_type = instance.__dict__.get('schema_type')
+        return instance
+
     def save(self, *args, **kwargs):
-        # Check if schema_type is one of the built-in choices
-        built_in_schemas = dict(self.SCHEMA_CHOICES).keys()
-        if self.schema_type not in built_in_schemas:
-            # Validate that it's a valid custom schema
-            try:
-                Schema.objects.get(name=self.schema_type)
-            except Schema.DoesNotExist:
+        # Only a new or changed schema_type needs checking, so the many
+        # update_fields saves of background work run no extra query
+        update_fields = kwargs.get('update_fields')
+        schema_changed = update_fields is None or 'schema_type' in update_fields
+        if schema_changed and self.schema_type != getattr(self, '_saved_schema_type', None):
+            built_in_schemas = dict(self.SCHEMA_CHOICES).keys()
+            if self.schema_type not in built_in_schemas:
                 # Fall back to default schema if the specified one doesn't exist
-                self.schema_type = 'resume'
+                if not Schema.objects.filter(name=self.schema_type).exists():
+                    self.schema_type = 'resume'
         super().save(*args, **kwargs)
+        self._saved_schema_type = self.schema_type
 
 
-class ParsedResult(models.Model):
+class ParsedResult(VersionedModel):
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='parsed_results')
     page_number = models.PositiveIntegerField(default=1)
     result_data = models.JSONField()
+    reused_from = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='reused_by')
+    schema_version = models.ForeignKey('SchemaVersion', on_delete=models.SET_NULL, null=True, blank=True, related_name='results')
+    # Resolution of the render the result came from (null for image files)
+    render_dpi = models.PositiveIntegerField(null=True, blank=True)
     parsed_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Cold results move to gzipped JSON in archive storage, leaving result_data empty
+    result_archive = models.FileField(upload_to='archive/results/', storage=archive_storage, max_length=255, blank=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         unique_together = ('document', 'page_number')
@@ -52,8 +130,14 @@ class ParsedResult(models.Model):
     def __str__(self):
         return f"{self.document.name} - Page {self.page_number}"
 
+    def load_result_data(self):
+        """The result, read back from archive storage if it was archived."""
+        if self.archived_at is None:
+            return self.result_data
+        return read_archived_result(self.result_archive.name)
+
 
-class Schema(models.Model):
+class Schema(VersionedModel):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     schema_json = models.JSONField()
@@ -62,3 +146,188 @@ class Schema(models.Model):
     
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # Snapshot every version so results can point at the exact schema
+        # that produced them. The row stays locked until the snapshot is
+        # stored, so a concurrent edit cannot take this version's place.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            SchemaVersion.objects.get_or_create(
+                schema=self,
+                version=self.version,
+                defaults={'schema_json': self.schema_json}
+            )
+
+    @property
+    def current_version(self):
+        return self.versions.filter(version=self.version).first()
+
+
+class SchemaVersion(models.Model):
+    """Immutable snapshot of a schema's JSON at one version."""
+    schema = models.ForeignKey(Schema, on_delete=models.CASCADE, related_name='versions')
+    version = models.PositiveIntegerField()
+    schema_json = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('schema', 'version')
+        ordering = ['schema', 'version']
+
+    def __str__(self):
+        return f"{self.schema.name} v{self.version}"
+
+
+class DocumentClassification(models.Model):
+    """Schema detected for a file, cached by the SHA-256 of its content."""
+    content_hash = models.CharField(max_length=64, unique=True)
+    schema_type = models.CharField(max_length=100)
+    confidence = models.FloatField()
+    method = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} - {self.schema_type}"
+
+
+class PageHash(models.Model):
+    """Perceptual hash of a rendered document page, used to find rescans."""
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='page_hashes')
+    page_number = models.PositiveIntegerField(default=1)
+    dhash = models.CharField(max_length=16)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped when a re-render changes the hash, so worker indexes pick it up
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = ('document', 'page_number')
+
+    def __str__(self):
+        return f"{self.document.name} - Page {self.page_number} - {self.dhash}"
+
+
+class UploadSession(models.Model):
+    """A resumable upload: chunks are appended until the session is finalized."""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('completed', 'Completed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    name = models.CharField(max_length=255)
+    schema_type = models.CharField(max_length=100, default='auto')
+    total_size = models.BigIntegerField()
+    received_bytes = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    document = models.ForeignKey(Document, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.received_bytes}/{self.total_size})"
+
+
+class BatchJob(models.Model):
+    """A provider batch job parsing many document pages asynchronously."""
+    STATUS_CHOICES = [
+        ('validating', 'Validating'),
+        ('in_progress', 'In progress'),
+        ('finalizing', 'Finalizing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),
+        ('cancelling', 'Cancelling'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    provider_batch_id = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='validating')
+    # [document_id, page_number] pairs included in the job
+    pages = models.JSONField(default=list)
+    overwrite = models.BooleanField(default=False)
+    request_count = models.PositiveIntegerField(default=0)
+    succeeded_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    ingested_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.provider_batch_id} ({self.status})"
+
+
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """A URL notified with signed callbacks when parses complete or fail."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='webhook_endpoints')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_webhook_secret, editable=False)
+    # Event names to send; empty sends every event
+    events = models.JSONField(default=list, blank=True)
+    active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.url
+
+    def wants(self, event):
+        return not self.events or event in self.events
+
+
+class WebhookDelivery(models.Model):
+    """One event sent (or still to be sent) to one webhook endpoint."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    ]
+
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name='deliveries')
+    event = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='webhook_delivery_due_idx')]
+
+    def __str__(self):
+        return f"{self.event} -> {self.endpoint.url} ({self.status})"
+
+
+class RequestProfile(models.Model):
+    """CPU profile, memory trace and stage timings captured for one request."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    duration_ms = models.FloatField()
+    # {stage: {"calls": n, "seconds": s}} for render, encode, model and db
+    stages = models.JSONField(default=dict)
+    peak_memory = models.BigIntegerField(help_text='Peak traced memory above the start of the request, in bytes')
+    top_allocations = models.JSONField(default=list)
+    profiler = models.CharField(max_length=20)
+    artifact = models.FileField(upload_to='profiles/', max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,325 @@
+"""
+Document parsing shared by the API views and management commands.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from packages.vision_parser import ModelRouter, ParserService, ResolutionLadder
+from packages.vision_parser.scheduler import AdmissionError, FairScheduler
+from packages.vision_parser.utils import DEFAULT_DPI, get_document_bytes
+from . import webhooks
+from .dedup import find_reusable_result
+from .models import Document, ParsedResult, Schema, SchemaVersion
+from .storage import document_path
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Built-in schemas shipped with the backend
+SCHEMAS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'schemas')
+
+# Process-wide model router, so tier hit rates accumulate across requests
+model_router = ModelRouter(
+    tiers=settings.VISION_PARSER_ROUTING,
+    threshold=settings.VISION_PARSER_ESCALATION_THRESHOLD,
+    confidence_field=settings.VISION_PARSER_CONFIDENCE_FIELD
+) if settings.VISION_PARSER_ROUTING else None
+
+# Process-wide resolution ladder: pages start at the lowest DPI and are only
+# re-rendered higher when the output fails validation
+resolution_ladder = ResolutionLadder(
+    dpis=settings.VISION_PARSER_RENDER_DPIS,
+    min_coverage=settings.VISION_PARSER_RENDER_MIN_COVERAGE
+) if settings.VISION_PARSER_RENDER_DPIS else None
+
+# Process-wide scheduler for model calls: interactive parses keep most of the
+# capacity while bulk work queues behind them, shared fairly between users.
+# It only orders calls made in this process; model_slot() adds the
+# cross-process limits on bulk and backfill work.
+parse_scheduler = FairScheduler(
+    capacity=settings.PARSE_SCHEDULER_CAPACITY,
+    weights=settings.PARSE_SCHEDULER_WEIGHTS or None,
+    queue_limits=settings.PARSE_SCHEDULER_QUEUE_LIMITS,
+    timeouts=settings.PARSE_SCHEDULER_TIMEOUTS
+)
+
+# Parser services cached per process, keyed by schema name and version
+MAX_CACHED_SERVICES = 64
+_services = {}
+_services_lock = threading.Lock()
+
+# Seconds between attempts to take a shared model-call slot
+SHARED_SLOT_POLL_INTERVAL = 0.5
+
+# Process-local locks standing in for advisory locks on databases without them
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def _lock_key(*parts) -> int:
+    """Map the parts of a lock name onto a signed 64-bit advisory lock key."""
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+
+@contextmanager
+def _local_lock(key: int):
+    """Hold a process-local lock for the given key."""
+    with _local_locks_guard:
+        entry = _local_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _local_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _local_locks[key]
+
+
+@contextmanager
+def single_flight(*parts):
+    """
+    Serialize work on the same key across threads and worker processes.
+
+    Callers in this process queue on a local lock; on PostgreSQL a session
+    advisory lock extends that to every worker sharing the database.
+    """
+    key = _lock_key(*parts)
+    with _local_lock(key):
+        if connection.vendor != 'postgresql':
+            yield
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [key])
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+
+
+@contextmanager
+def _shared_slot(priority: str):
+    """
+    Hold one of the PARSE_SCHEDULER_SHARED_LIMITS slots of a priority class.
+
+    The slots are session advisory locks, so the limit holds across every
+    process sharing the database: the web workers, parse_bulk and any other
+    command. Waits past the class timeout raise AdmissionError. Classes
+    without a shared limit, and databases other than PostgreSQL, are not
+    limited.
+    """
+    limit = settings.PARSE_SCHEDULER_SHARED_LIMITS.get(priority)
+    if limit is None or connection.vendor != 'postgresql':
+        yield
+        return
+
+    timeout = settings.PARSE_SCHEDULER_TIMEOUTS.get(priority)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    keys = [_lock_key('model-slot', priority, index) for index in range(limit)]
+    held = None
+    while held is None:
+        with connection.cursor() as cursor:
+            for key in keys:
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [key])
+                if cursor.fetchone()[0]:
+                    held = key
+                    break
+        if held is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise AdmissionError(f"All {limit} shared {priority} slots are busy", retry_after=int(timeout) or 1)
+            time.sleep(SHARED_SLOT_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [held])
+
+
+@contextmanager
+def model_slot(priority: str, tenant=None):
+    """
+    Wait for a model-call slot of the given priority class and hold it.
+
+    The shared slot is taken first, so a call waiting on other processes'
+    bulk work does not hold capacity in this process's scheduler meanwhile.
+
+    Raises:
+        AdmissionError: A queue is full or a wait timed out
+    """
+    with _shared_slot(priority):
+        with parse_scheduler.slot(priority, tenant):
+            yield
+
+
+def get_google_api_key():
+    """Get the configured Google API key, or None if it is unset or a placeholder."""
+    google_api_key = os.environ.get('GOOGLE_API_KEY')
+    if not google_api_key or google_api_key in ['your-google-api-key', 'your-google-api-key-here']:
+        return None
+    return google_api_key
+
+
+def build_parser_service(schema_type: str) -> ParserService:
+    """
+    Get a parser service with the built-in schemas and, if one exists,
+    the custom schema stored under the given name.
+
+    Services are cached per process and keyed by the custom schema's
+    version, so schema files are read and model clients created once per
+    worker rather than once per request.
+    """
+    custom_schema = Schema.objects.filter(name=schema_type).only('pk', 'version').first()
+    key = (schema_type, custom_schema.pk, custom_schema.version) if custom_schema else (schema_type, None, None)
+
+    with _services_lock:
+        parser_service = _services.get(key)
+    if parser_service is not None:
+        return parser_service
+
+    parser_service = ParserService(
+        schema_dir=SCHEMAS_DIR,
+        default_schema='resume',
+        compact=settings.VISION_PARSER_COMPACT_SCHEMAS,
+        router=model_router,
+        resolution=resolution_ladder
+    )
+
+    # Add the custom schema with this name, if it exists
+    if custom_schema:
+        custom_schema.refresh_from_db(fields=['schema_json'])
+        parser_service.add_schema(schema_type, custom_schema.schema_json)
+
+    with _services_lock:
+        if len(_services) >= MAX_CACHED_SERVICES:
+            _services.clear()
+        _services[key] = parser_service
+    return parser_service
+
+
+def current_schema_version(schema_type: str):
+    """The current SchemaVersion of a custom schema, or None for built-ins."""
+    return SchemaVersion.objects.filter(
+        schema__name=schema_type,
+        version=F('schema__version')
+    ).first()
+
+
+def parse_page(
+    document: Document,
+    page_number: int,
+    schema_type: str,
+    priority: str = 'interactive',
+    tenant=None
+) -> Tuple[ParsedResult, bool]:
+    """
+    Parse one page of a document, reusing any stored result.
+
+    Concurrent calls for the same (document, page) coalesce onto a single
+    model call: later callers wait for the first one and then read its
+    result instead of calling the model again. A page holds one result, so
+    this applies whatever schema each caller asked for, just as a result
+    stored earlier is returned as is.
+
+    Pages that are near-duplicates of an already parsed page (see
+    api.dedup) reuse that page's result instead of calling the model.
+
+    With VISION_PARSER_RENDER_DPIS set, PDF pages are first rendered at
+    the lowest resolution and re-rendered higher only when the output fails
+    schema validation; the resolution used is stored as render_dpi.
+
+    Model calls wait for a slot of the given priority class (see
+    model_slot), shared fairly between tenants (usually user ids).
+    Parse webhooks go to the endpoints of the user whose id is the tenant.
+    Raises AdmissionError when the class queue is full or the wait times out.
+
+    Returns:
+        The parsed result and whether a new result was stored
+    """
+    existing_result = ParsedResult.objects.filter(
+        document=document,
+        page_number=page_number
+    ).first()
+    if existing_result:
+        return existing_result, False
+
+    with single_flight('parse', document.pk, page_number):
+        # Another request may have finished the same parse while we waited
+        existing_result = ParsedResult.objects.filter(
+            document=document,
+            page_number=page_number
+        ).first()
+        if existing_result:
+            logger.info(f"Reusing result for document {document.pk} page {page_number} from a concurrent parse")
+            return existing_result, False
+
+        try:
+            path = document_path(document)
+            first_dpi = resolution_ladder.dpis[0] if resolution_ladder is not None else DEFAULT_DPI
+            image, mime_type = get_document_bytes(path, page_number, first_dpi)
+
+            # A rescan of an already parsed page can reuse that page's result
+            reused_from = find_reusable_result(document, page_number, image, schema_type)
+            if reused_from is not None:
+                result = reused_from.load_result_data()
+                render_dpi = reused_from.render_dpi
+            else:
+                parser_service = build_parser_service(schema_type)
+                with model_slot(priority, tenant):
+                    result, render_dpi = parser_service.parse_page(
+                        path,
+                        schema_type=schema_type,
+                        page_number=page_number,
+                        first=(image, mime_type)
+                    )
+        except AdmissionError:
+            # Not a parse failure: the caller is told to retry later
+            raise
+        except Exception as e:
+            webhooks.emit('parse.failed', {
+                'document_id': document.pk,
+                'page_number': page_number,
+                'schema_type': schema_type,
+                'error': str(e),
+            }, user_id=tenant)
+            raise
+
+        try:
+            with transaction.atomic():
+                parsed_result = ParsedResult.objects.create(
+                    document=document,
+                    page_number=page_number,
+                    result_data=result,
+                    reused_from=reused_from,
+                    schema_version=current_schema_version(schema_type),
+                    render_dpi=render_dpi
+                )
+        except IntegrityError:
+            # A bulk or batch ingest, which does not take the lock, stored this page first
+            parsed_result = ParsedResult.objects.get(
+                document=document,
+                page_number=page_number
+            )
+            return parsed_result, False
+
+        webhooks.emit('parse.completed', {
+            'document_id': document.pk,
+            'page_number': page_number,
+            'schema_type': schema_type,
+            'result_id': parsed_result.pk,
+            'reused_from': reused_from.pk if reused_from else None,
+            'result': result,
+        }, user_id=tenant)
+        return parsed_result, True
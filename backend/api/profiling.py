@@ -0,0 +1,190 @@
+"""
+On-demand request profiling.
+
+A request is profiled when a staff user sends it with ``X-Profile: 1``, or
+when it falls into the PROFILING_SAMPLE_RATE share of all traffic. It then
+runs under a CPU profiler and tracemalloc, with the time spent in the
+render, encode, model and db stages recorded alongside. Everything is
+stored as a RequestProfile whose artifact staff can download from
+/profiles/{id}/artifact/, and the response names the profile in an
+X-Profile-Id header.
+
+The CPU profiler is pyinstrument (sampling, HTML artifact) when it is
+installed, otherwise cProfile (text artifact). Profilers and tracemalloc
+are process-wide, so at most one request per process is profiled at a time.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from packages.vision_parser.stages import record_stages, stage
+from .models import RequestProfile
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pragma: no cover - pyinstrument is optional
+    Profiler = None
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Allocation sites kept per profile
+TOP_ALLOCATIONS = 20
+
+_profiling_lock = threading.Lock()
+
+
+def _staff_user(request):
+    """The staff user making the request, or None."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_staff else None
+
+    # Token and basic credentials are only checked by DRF views, after
+    # middleware has run, so check them here
+    drf_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            authenticated = authentication_class().authenticate(drf_request)
+        except APIException:
+            return None
+        if authenticated:
+            user = authenticated[0]
+            return user if user.is_staff else None
+    return None
+
+
+def should_profile(request):
+    """
+    Decide whether to profile a request.
+
+    Returns:
+        Tuple of (profile, user); user is the staff user who asked for the
+        profile, if any
+    """
+    if settings.PROFILING_ENABLED and request.META.get('HTTP_X_PROFILE') == '1':
+        user = _staff_user(request)
+        if user is not None:
+            return True, user
+    if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return True, None
+    return False, None
+
+
+def _time_query(execute, sql, params, many, context):
+    with stage('db'):
+        return execute(sql, params, many, context)
+
+
+class _CpuProfiler:
+    """pyinstrument when available, cProfile otherwise."""
+
+    def __init__(self):
+        if Profiler is not None:
+            self.name = 'pyinstrument'
+            self.profiler = Profiler(interval=settings.PROFILING_INTERVAL)
+        else:
+            self.name = 'cprofile'
+            self.profiler = cProfile.Profile()
+
+    def start(self):
+        if Profiler is not None:
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self):
+        if Profiler is not None:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+
+    def artifact(self):
+        """Tuple of (file extension, content bytes) for the stored artifact."""
+        if Profiler is not None:
+            return 'html', self.profiler.output_html().encode('utf-8')
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats('cumulative').print_stats(100)
+        return 'txt', output.getvalue().encode('utf-8')
+
+
+def _top_allocations(snapshot):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    return [
+        {
+            'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size': stat.size,
+            'count': stat.count,
+        }
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+    ]
+
+
+def profile_request(get_response, request, user=None):
+    """
+    Run the request under the profilers and store a RequestProfile.
+
+    Falls back to an unprofiled request if another request in this process
+    is already being profiled.
+    """
+    if not _profiling_lock.acquire(blocking=False):
+        return get_response(request)
+    try:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        profiler = _CpuProfiler()
+        start = time.perf_counter()
+        with record_stages() as stages, connection.execute_wrapper(_time_query):
+            profiler.start()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.stop()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        _, peak = tracemalloc.get_traced_memory()
+        top_allocations = _top_allocations(tracemalloc.take_snapshot())
+        if started_tracing:
+            tracemalloc.stop()
+    finally:
+        _profiling_lock.release()
+
+    try:
+        extension, content = profiler.artifact()
+        profile = RequestProfile(
+            user=user,
+            method=request.method,
+            path=request.path[:500],
+            status_code=response.status_code,
+            duration_ms=duration_ms,
+            stages=stages,
+            peak_memory=peak - baseline,
+            top_allocations=top_allocations,
+            profiler=profiler.name
+        )
+        profile.artifact.save(f"{profile.pk}.{extension}", ContentFile(content), save=False)
+        profile.save()
+        response['X-Profile-Id'] = str(profile.pk)
+    except Exception:
+        # Profiling must never break the request it observed
+        logger.exception(f"Failed to store profile for {request.method} {request.path}")
+    return response
@@ -0,0 +1,158 @@
+"""
+Per-request query budgets.
+
+Views declare how many database queries (and optionally how many
+milliseconds of database time) a request may cost, either with the
+``query_budget`` decorator on a view function or viewset action, or with a
+``default_query_budget`` attribute on a view class covering all of its
+actions.
+QueryBudgetMiddleware counts the queries each request runs and logs a
+warning, or raises QueryBudgetExceeded when QUERY_BUDGET_ACTION is
+'raise', when a view goes over budget. Views without a budget fall back
+to QUERY_BUDGET_DEFAULT.
+
+Tests can hold any block of code to a budget with ``assert_query_budget``.
+
+Only queries run on the request's own thread while the view executes are
+counted; background tasks and the body of streaming responses are not.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    """Most queries and database milliseconds a request may use (None is unlimited)."""
+    queries: Optional[int] = None
+    time_ms: Optional[float] = None
+
+    def violations(self, counter):
+        """Descriptions of every limit the counter went over."""
+        violations = []
+        if self.queries is not None and counter.count > self.queries:
+            violations.append(f"{counter.count} queries (budget {self.queries})")
+        if self.time_ms is not None and counter.time_ms > self.time_ms:
+            violations.append(f"{counter.time_ms:.1f} ms in the database (budget {self.time_ms:g} ms)")
+        return violations
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    A request or block ran more queries or database time than its budget.
+
+    An AssertionError so test runners report it as a failure.
+    """
+
+
+class QueryCounter:
+    """Execute wrapper counting queries and their time on a connection."""
+
+    def __init__(self):
+        self.count = 0
+        self.time_ms = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.time_ms += elapsed
+            self.queries.append((sql, elapsed))
+
+
+@contextmanager
+def count_queries(using=None):
+    """
+    Count the queries run inside the block.
+
+    Args:
+        using: Database alias to watch; every configured database if None
+
+    Yields:
+        QueryCounter with the running totals
+    """
+    counter = QueryCounter()
+    aliases = [using] if using else list(connections)
+    with _wrap(aliases, counter):
+        yield counter
+
+
+@contextmanager
+def _wrap(aliases, counter):
+    if not aliases:
+        yield
+        return
+    with connections[aliases[0]].execute_wrapper(counter):
+        with _wrap(aliases[1:], counter):
+            yield
+
+
+def query_budget(queries=None, time_ms=None):
+    """Declare the query budget of a view function or viewset action."""
+    budget = QueryBudget(queries, time_ms)
+
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+def _default_budget():
+    default = settings.QUERY_BUDGET_DEFAULT
+    if not default:
+        return None
+    return QueryBudget(default.get('queries'), default.get('time_ms'))
+
+
+def view_budget(view_func, method):
+    """
+    Budget declared for a resolved view, or the default budget.
+
+    Looks at the viewset action handling ``method`` first, then the viewset
+    or view class, then the view function itself.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is not None:
+        actions = getattr(view_func, 'actions', None) or {}
+        handler = getattr(view_class, actions.get(method.lower(), method.lower()), None)
+        budget = getattr(handler, 'query_budget', None) or getattr(view_class, 'default_query_budget', None)
+        if budget is not None:
+            return budget
+    return getattr(view_func, 'query_budget', None) or _default_budget()
+
+
+def report(label, budget, counter, action='log'):
+    """Log or raise for a counter that went over its budget."""
+    violations = budget.violations(counter)
+    if not violations:
+        return
+    message = f"{label} exceeded its query budget: {', '.join(violations)}"
+    if action == 'raise':
+        slowest = sorted(counter.queries, key=lambda query: query[1], reverse=True)[:5]
+        details = '\n'.join(f"  {elapsed:.1f} ms: {sql}" for sql, elapsed in slowest)
+        raise QueryBudgetExceeded(f"{message}\nSlowest queries:\n{details}")
+    logger.warning(message)
+
+
+@contextmanager
+def assert_query_budget(queries=None, time_ms=None, using=None):
+    """
+    Fail with QueryBudgetExceeded if the block goes over budget.
+
+    For tests, e.g. ``with assert_query_budget(queries=4): client.get(url)``.
+    """
+    with count_queries(using) as counter:
+        yield counter
+    report('Block', QueryBudget(queries, time_ms), counter, action='raise')
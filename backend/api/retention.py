@@ -0,0 +1,307 @@
+"""
+Retention policies and storage garbage collection.
+
+Per-schema policies (RETENTION_POLICIES) expire old originals, either
+moving them to archive storage or deleting them, and move cold results
+out of the hot table into gzipped JSON in archive storage. Garbage
+collection removes stored files no row references, stale render-cache
+copies, abandoned upload parts and old profiling and webhook records.
+
+Every phase is driven by ``manage.py enforce_retention``, which spaces
+deletes and moves with a rate limiter so a pass never floods storage or
+the database.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import Document, ParsedResult, RequestProfile, UploadSession, WebhookDelivery
+from .storage import archive_storage
+from .uploads import discard_upload
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Used for any setting a schema's policy and the "default" policy leave out
+DEFAULT_POLICY = {
+    # Days after upload before the original file expires (None keeps it forever)
+    'originals_days': None,
+    # 'archive' moves expired originals to archive storage, 'delete' removes them
+    'originals_action': 'archive',
+    # Days after parsing before a result moves to archive storage (None keeps it inline)
+    'results_archive_days': None,
+}
+
+# Stored file prefixes that only ever hold files referenced by a row
+DEFAULT_STORAGE_PREFIXES = ('documents', 'thumbnails', 'profiles')
+ARCHIVE_STORAGE_PREFIXES = ('archive',)
+
+# Rows deleted per statement when pruning records
+DELETE_CHUNK_SIZE = 100
+
+
+class RateLimiter:
+    """Spaces operations to at most ``rate`` per second; 0 means unlimited."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+def get_policy(schema_type):
+    """Effective retention policy of a schema type."""
+    policy = dict(DEFAULT_POLICY)
+    policy.update(settings.RETENTION_POLICIES.get('default', {}))
+    policy.update(settings.RETENTION_POLICIES.get(schema_type, {}))
+    return policy
+
+
+def _schema_types():
+    return Document.objects.order_by().values_list('schema_type', flat=True).distinct()
+
+
+def expire_original(document, action):
+    """Archive or delete a document's original file, keeping its results."""
+    if action not in ('archive', 'delete'):
+        raise ValueError(f"Unknown originals_action '{action}'")
+
+    name, storage = document.file.name, document.file.storage
+    if action == 'archive':
+        with document.file.open('rb') as f:
+            document.archived_file.save(os.path.basename(name), f, save=False)
+    document.file = ''
+    document.original_expired_at = timezone.now()
+    document.save(update_fields=['file', 'archived_file', 'original_expired_at'])
+
+    # Identical uploads can share one stored object on S3
+    if not Document.objects.filter(file=name).exists():
+        storage.delete(name)
+
+
+def expire_originals(limiter, dry_run=False, limit=None):
+    """Apply the originals part of every schema's policy."""
+    done = 0
+    for schema_type in list(_schema_types()):
+        policy = get_policy(schema_type)
+        if policy['originals_days'] is None:
+            continue
+        cutoff = timezone.now() - timedelta(days=policy['originals_days'])
+        documents = Document.objects.filter(
+            schema_type=schema_type,
+            uploaded_at__lt=cutoff,
+            original_expired_at__isnull=True
+        ).exclude(file='').order_by('id')
+        for document in documents.iterator(chunk_size=500):
+            if limit is not None and done >= limit:
+                return done
+            limiter.wait()
+            if not dry_run:
+                try:
+                    expire_original(document, policy['originals_action'])
+                except Exception as e:
+                    logger.error(f"Could not expire original of document {document.pk}: {e}")
+                    continue
+            done += 1
+    return done
+
+
+def archive_result(result):
+    """Move a result's data to gzipped JSON in archive storage."""
+    content = gzip.compress(json.dumps(result.result_data).encode('utf-8'))
+    result.result_archive.save(f"{result.pk}.json.gz", ContentFile(content), save=False)
+    result.result_data = {}
+    result.archived_at = timezone.now()
+    result.save(update_fields=['result_archive', 'result_data', 'archived_at'])
+
+
+def archive_results(limiter, dry_run=False, limit=None):
+    """Apply the results part of every schema's policy."""
+    done = 0
+    for schema_type in list(_schema_types()):
+        policy = get_policy(schema_type)
+        if policy['results_archive_days'] is None:
+            continue
+        cutoff = timezone.now() - timedelta(days=policy['results_archive_days'])
+        results = ParsedResult.objects.filter(
+            document__schema_type=schema_type,
+            parsed_at__lt=cutoff,
+            archived_at__isnull=True
+        ).order_by('id')
+        for result in results.iterator(chunk_size=500):
+            if limit is not None and done >= limit:
+                return done
+            limiter.wait()
+            if not dry_run:
+                archive_result(result)
+            done += 1
+    return done
+
+
+def _walk(storage, path):
+    """Yield the names of all files below a storage directory."""
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        yield f"{path}/{filename}"
+    for directory in directories:
+        yield from _walk(storage, f"{path}/{directory}")
+
+
+def _referenced_names(querysets):
+    names = set()
+    for queryset, field in querysets:
+        names.update(queryset.exclude(**{field: ''}).values_list(field, flat=True).iterator(chunk_size=5000))
+    return names
+
+
+def collect_orphans(limiter, dry_run=False, limit=None):
+    """
+    Delete stored files that no row references.
+
+    Files younger than ORPHAN_GRACE_HOURS are kept, since an upload or
+    archive move may not have committed its row yet.
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.ORPHAN_GRACE_HOURS)
+    targets = [
+        (default_storage, DEFAULT_STORAGE_PREFIXES, _referenced_names([
+            (Document.objects.all(), 'file'),
+            (Document.objects.all(), 'thumbnail'),
+            (RequestProfile.objects.all(), 'artifact'),
+        ])),
+        (archive_storage(), ARCHIVE_STORAGE_PREFIXES, _referenced_names([
+            (Document.objects.all(), 'archived_file'),
+            (ParsedResult.objects.all(), 'result_archive'),
+        ])),
+    ]
+
+    done = 0
+    for storage, prefixes, referenced in targets:
+        for prefix in prefixes:
+            for name in _walk(storage, prefix):
+                if name in referenced:
+                    continue
+                if limit is not None and done >= limit:
+                    return done
+                if storage.get_modified_time(name) > cutoff:
+                    continue
+                limiter.wait()
+                if dry_run:
+                    logger.info(f"Would delete orphaned file {name}")
+                else:
+                    storage.delete(name)
+                    logger.info(f"Deleted orphaned file {name}")
+                done += 1
+    return done
+
+
+def prune_render_cache(limiter, dry_run=False, limit=None):
+    """
+    Delete local render-cache copies unused for RENDER_CACHE_MAX_AGE_DAYS,
+    then the least recently used ones until the cache fits in
+    RENDER_CACHE_MAX_SIZE bytes.
+    """
+    entries = []
+    for root, _, files in os.walk(settings.RENDER_CACHE_DIR):
+        for filename in files:
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    entries.sort()
+    cutoff = time.time() - settings.RENDER_CACHE_MAX_AGE_DAYS * 86400
+    total = sum(size for _, size, _ in entries)
+    done = 0
+    for last_used, size, path in entries:
+        if last_used >= cutoff and total <= settings.RENDER_CACHE_MAX_SIZE:
+            break
+        if limit is not None and done >= limit:
+            break
+        limiter.wait()
+        if not dry_run:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
+        done += 1
+    return done
+
+
+def prune_uploads(limiter, dry_run=False, limit=None):
+    """Discard upload sessions left open for UPLOAD_SESSION_MAX_AGE_DAYS."""
+    cutoff = timezone.now() - timedelta(days=settings.UPLOAD_SESSION_MAX_AGE_DAYS)
+    done = 0
+    sessions = UploadSession.objects.filter(status='open', updated_at__lt=cutoff).order_by('created_at')
+    for session in sessions.iterator(chunk_size=500):
+        if limit is not None and done >= limit:
+            break
+        limiter.wait()
+        if not dry_run:
+            discard_upload(session)
+            session.delete()
+        done += 1
+    return done
+
+
+def prune_records(limiter, dry_run=False, limit=None):
+    """Delete profiles and finished webhook deliveries older than RECORD_RETENTION_DAYS."""
+    cutoff = timezone.now() - timedelta(days=settings.RECORD_RETENTION_DAYS)
+    done = 0
+
+    # Profiles are deleted one by one so their artifacts go with them
+    profiles = RequestProfile.objects.filter(created_at__lt=cutoff).order_by('created_at')
+    for profile in profiles.iterator(chunk_size=500):
+        if limit is not None and done >= limit:
+            return done
+        limiter.wait()
+        if not dry_run:
+            profile.delete()
+        done += 1
+
+    deliveries = WebhookDelivery.objects.filter(created_at__lt=cutoff).exclude(status='pending')
+    if dry_run:
+        remaining = deliveries.count()
+        return done + (remaining if limit is None else min(remaining, limit - done))
+
+    # Deliveries have no files, so they go in small chunks
+    while limit is None or done < limit:
+        chunk = DELETE_CHUNK_SIZE if limit is None else min(DELETE_CHUNK_SIZE, limit - done)
+        ids = list(deliveries.values_list('pk', flat=True)[:chunk])
+        if not ids:
+            break
+        limiter.wait()
+        WebhookDelivery.objects.filter(pk__in=ids).delete()
+        done += len(ids)
+    return done
+
+
+# Phases in the order a full pass runs them
+PHASES = {
+    'originals': expire_originals,
+    'results': archive_results,
+    'orphans': collect_orphans,
+    'render-cache': prune_render_cache,
+    'uploads': prune_uploads,
+    'records': prune_records,
+}
@@ -1,5 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Item, Document, ParsedResult, Schema
+from drf_spectacular.utils import extend_schema_field
+from packages.vision_parser.scheduler import DEFAULT_WEIGHTS
+from .models import Item, Document, ParsedResult, Schema, SchemaVersion, UploadSession, BatchJob, WebhookEndpoint, WebhookDelivery, RequestProfile
 
 
 class ItemSerializer(serializers.ModelSerializer):
@@ -11,68 +14,93 @@ class ItemSerializer(serializers.ModelSerializer):
 class DocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Document
-        fields = ['id', 'file', 'name', 'schema_type', 'uploaded_at']
+        fields = [
+            'id', 'file', 'name', 'schema_type', 'content_hash', 'uploaded_at', 'updated_at', 'version',
+            'page_count', 'page_width', 'page_height', 'has_text_layer',
+            'thumbnail', 'metadata_computed_at', 'original_expired_at'
+        ]
+        read_only_fields = [
+            'updated_at', 'version', 'content_hash', 'page_count', 'page_width', 'page_height',
+            'has_text_layer', 'thumbnail', 'metadata_computed_at', 'original_expired_at'
+        ]
 
 
 class ParsedResultSerializer(serializers.ModelSerializer):
+    # Archived results are read back from archive storage, one read per
+    # result, unless the context sets load_archived to False; result_data
+    # is then null and archived tells the client to fetch the detail view
+    result_data = serializers.SerializerMethodField()
+    archived = serializers.SerializerMethodField()
+
     class Meta:
         model = ParsedResult
-        fields = ['id', 'document', 'page_number', 'result_data', 'parsed_at']
+        fields = ['id', 'document', 'page_number', 'result_data', 'archived', 'reused_from', 'schema_version', 'render_dpi', 'parsed_at', 'updated_at', 'archived_at', 'version']
+
+    @extend_schema_field(serializers.JSONField(allow_null=True))
+    def get_result_data(self, obj):
+        if obj.archived_at is not None and not self.context.get('load_archived', True):
+            return None
+        return obj.load_result_data()
+
+    @extend_schema_field(serializers.BooleanField())
+    def get_archived(self, obj):
+        return obj.archived_at is not None
         
 
+class SchemaVersionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SchemaVersion
+        fields = ['id', 'schema', 'version', 'schema_json', 'created_at']
+
+
+def is_known_schema_type(value):
+    """Built-in schema types are checked without a query; custom ones with one."""
+    return value in dict(Document.SCHEMA_CHOICES) or Schema.objects.filter(name=value).exists()
+
+
+class SchemaTypeField(serializers.CharField):
+    """
+    Schema type name, checked against built-in and custom schemas only when
+    a value is submitted, so building the serializer runs no queries.
+    """
+
+    def __init__(self, allow_auto=False, **kwargs):
+        self.allow_auto = allow_auto
+        kwargs.setdefault('max_length', 100)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if self.allow_auto and value == 'auto':
+            return value
+        if not is_known_schema_type(value):
+            raise serializers.ValidationError(f"Unknown schema type '{value}'")
+        return value
+
+
 class DocumentUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
     name = serializers.CharField(max_length=255, required=False)
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Get built-in schema choices
-        choices = dict(Document.SCHEMA_CHOICES)
-        
-        # Add custom schemas from database
-        try:
-            custom_schemas = Schema.objects.all()
-            for schema in custom_schemas:
-                choices[schema.name] = schema.name
-        except:
-            # Handle case when database is not yet set up (migrations running)
-            pass
-            
-        self.fields['schema_type'] = serializers.ChoiceField(
-            choices=[(k, v) for k, v in choices.items()],
-            default='resume'
-        )
+    # "auto" detects the schema from the document content
+    schema_type = SchemaTypeField(allow_auto=True, default='auto')
 
 
 class DocumentParseSerializer(serializers.Serializer):
     document_id = serializers.IntegerField()
     page_number = serializers.IntegerField(default=1)
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Get built-in schema choices
-        choices = dict(Document.SCHEMA_CHOICES)
-        
-        # Add custom schemas from database
-        try:
-            custom_schemas = Schema.objects.all()
-            for schema in custom_schemas:
-                choices[schema.name] = schema.name
-        except:
-            # Handle case when database is not yet set up (migrations running)
-            pass
-            
-        self.fields['schema_type'] = serializers.ChoiceField(
-            choices=[(k, v) for k, v in choices.items()],
-            required=False
-        )
+    # Only the classes the scheduler is configured with
+    priority = serializers.ChoiceField(
+        choices=list(settings.PARSE_SCHEDULER_WEIGHTS or DEFAULT_WEIGHTS),
+        default='interactive'
+    )
+    schema_type = SchemaTypeField(required=False)
 
 
 class SchemaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Schema
-        fields = ['id', 'name', 'description', 'schema_json', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'schema_json', 'created_at', 'updated_at', 'version']
+        read_only_fields = ['created_at', 'updated_at', 'version']
 
     def validate_schema_json(self, value):
         """
@@ -94,3 +122,79 @@ class SchemaSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("'properties' must be an object")
             
         return value
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'name', 'schema_type', 'total_size', 'received_bytes', 'status', 'document', 'created_at']
+        read_only_fields = ['received_bytes', 'status', 'document', 'created_at']
+
+    def validate_schema_type(self, value):
+        """
+        Accept built-in schemas, custom schemas and "auto".
+        """
+        if value != 'auto' and not is_known_schema_type(value):
+            raise serializers.ValidationError(f"Unknown schema type '{value}'")
+        return value
+
+    def validate_total_size(self, value):
+        """
+        Ensure the declared size is positive and within the upload limit.
+        """
+        if value <= 0:
+            raise serializers.ValidationError("total_size must be positive")
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Uploads are limited to {settings.UPLOAD_MAX_SIZE} bytes")
+        return value
+
+
+class BatchJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BatchJob
+        fields = ['id', 'provider_batch_id', 'status', 'overwrite', 'request_count', 'succeeded_count',
+                  'failed_count', 'error', 'ingested_at', 'created_at', 'updated_at']
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookEndpoint
+        fields = ['id', 'url', 'events', 'active', 'secret', 'created_at']
+        read_only_fields = ['secret', 'created_at']
+
+    def validate_url(self, value):
+        """
+        Only accept https URLs whose host resolves to public addresses.
+        """
+        from .webhooks import UnsafeURLError, check_url
+        try:
+            check_url(value)
+        except UnsafeURLError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate_events(self, value):
+        """
+        Only accept known event names; an empty list subscribes to every event.
+        """
+        from .webhooks import EVENTS
+        if not isinstance(value, list) or not all(isinstance(event, str) for event in value):
+            raise serializers.ValidationError("Must be a list of event names")
+        unknown = [event for event in value if event not in EVENTS]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown events: {', '.join(unknown)}")
+        return value
+
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDelivery
+        fields = ['id', 'event', 'payload', 'status', 'attempts', 'next_attempt_at', 'response_status',
+                  'last_error', 'created_at', 'delivered_at']
+
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RequestProfile
+        fields = ['id', 'user', 'method', 'path', 'status_code', 'duration_ms', 'stages', 'peak_memory',
+                  'top_allocations', 'profiler', 'created_at']
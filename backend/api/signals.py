@@ -0,0 +1,49 @@
+"""
+Signal handlers that keep storage in step with the database.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Document, ParsedResult, RequestProfile
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+def _delete_file(field_file):
+    """Delete a stored file after the surrounding transaction commits."""
+    if not field_file:
+        return
+    storage, name = field_file.storage, field_file.name
+
+    def delete():
+        try:
+            storage.delete(name)
+        except Exception as e:
+            # Anything left behind is picked up by the retention GC
+            logger.warning(f"Could not delete {name}: {e}")
+
+    transaction.on_commit(delete)
+
+
+@receiver(post_delete, sender=Document)
+def delete_document_files(sender, instance, **kwargs):
+    # Identical uploads can share one stored object on S3
+    if instance.file and not Document.objects.filter(file=instance.file.name).exists():
+        _delete_file(instance.file)
+    _delete_file(instance.thumbnail)
+    if instance.archived_file and not Document.objects.filter(archived_file=instance.archived_file.name).exists():
+        _delete_file(instance.archived_file)
+
+
+@receiver(post_delete, sender=ParsedResult)
+def delete_result_archive(sender, instance, **kwargs):
+    _delete_file(instance.result_archive)
+
+
+@receiver(post_delete, sender=RequestProfile)
+def delete_profile_artifact(sender, instance, **kwargs):
+    _delete_file(instance.artifact)
@@ -0,0 +1,280 @@
+"""
+Storage backends for uploaded documents and rendered artifacts.
+
+ShardedFileSystemStorage spreads files over content-hash directories, so
+no single directory grows without bound. S3Storage stores them in any
+S3-compatible object store (AWS S3, MinIO, ...). Renderers that need a
+local file call local_path(), which copies remote objects whole into the
+local render cache once and reuses the copy.
+"""
+import hashlib
+import io
+import os
+import posixpath
+import shutil
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage, Storage, default_storage, storages
+from django.utils.deconstruct import deconstructible
+
+# Bytes fetched per ranged read when copying or hashing objects
+RANGE_BLOCK_SIZE = 4 * 1024 * 1024
+
+# max_length of the FileFields stored through these backends
+MAX_NAME_LENGTH = 255
+# Room left for the suffix get_available_name appends on a name collision
+COLLISION_SUFFIX_LENGTH = 8
+
+
+def content_sha256(content):
+    """SHA-256 hex digest of a Django File, leaving it rewound."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def sharded_name(name, content_hash):
+    """
+    Place a file under two levels of content-hash directories.
+
+    ``documents/scan.pdf`` becomes ``documents/ab/cd/abcdef.../scan.pdf``,
+    which keeps directories small and makes identical uploads land in the
+    same place. Long filenames are shortened, keeping their extension, so
+    the name fits in MAX_NAME_LENGTH.
+    """
+    directory, filename = posixpath.split(name.replace('\\', '/'))
+    directory = posixpath.join(directory, content_hash[:2], content_hash[2:4], content_hash)
+    available = MAX_NAME_LENGTH - len(directory) - 1 - COLLISION_SUFFIX_LENGTH
+    if len(filename) > available:
+        root, ext = posixpath.splitext(filename)
+        filename = root[:max(available - len(ext), 1)] + ext
+    return posixpath.join(directory, filename)
+
+
+@deconstructible
+class ShardedFileSystemStorage(FileSystemStorage):
+    """
+    Local filesystem storage with a content-hash sharded directory layout.
+    """
+
+    def _save(self, name, content):
+        return super()._save(sharded_name(name, content_sha256(content)), content)
+
+    def read_range(self, name, start, length):
+        with self.open(name, 'rb') as f:
+            f.seek(start)
+            return f.read(length)
+
+
+@deconstructible
+class S3Storage(Storage):
+    """
+    Storage in an S3-compatible bucket, using the same sharded layout.
+
+    Configured with the S3_* settings; S3_ENDPOINT_URL points it at a
+    local stand-in such as MinIO.
+    """
+
+    def __init__(self, bucket=None, endpoint_url=None, access_key=None, secret_key=None, region=None):
+        try:
+            import boto3
+        except ImportError:
+            raise ImproperlyConfigured(
+                "boto3 package is not installed. "
+                "Please install it using: pip install boto3"
+            )
+        self.bucket = bucket or settings.S3_BUCKET
+        if not self.bucket:
+            raise ImproperlyConfigured("S3_BUCKET must be set to use S3Storage")
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or settings.S3_ENDPOINT_URL or None,
+            aws_access_key_id=access_key or settings.S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=secret_key or settings.S3_SECRET_ACCESS_KEY or None,
+            region_name=region or settings.S3_REGION or None,
+        )
+
+    def _open(self, name, mode='rb'):
+        if 'w' in mode or 'a' in mode:
+            raise ValueError("S3Storage files are read-only once saved")
+        return File(io.BufferedReader(RangedReader(self, name), RANGE_BLOCK_SIZE), name=name)
+
+    def _save(self, name, content):
+        name = sharded_name(name, content_sha256(content))
+        self.client.upload_fileobj(content, self.bucket, name)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Sharding by content hash already makes names collision-free
+        return name
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=name)
+
+    def exists(self, name):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=name)
+        except self.client.exceptions.ClientError:
+            return False
+        return True
+
+    def size(self, name):
+        return self.client.head_object(Bucket=self.bucket, Key=name)['ContentLength']
+
+    def get_modified_time(self, name):
+        return self.client.head_object(Bucket=self.bucket, Key=name)['LastModified']
+
+    def listdir(self, path):
+        prefix = path.rstrip('/') + '/' if path else ''
+        directories, files = [], []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, Delimiter='/'):
+            directories.extend(p['Prefix'][len(prefix):].rstrip('/') for p in page.get('CommonPrefixes', []))
+            files.extend(o['Key'][len(prefix):] for o in page.get('Contents', []))
+        return directories, files
+
+    def url(self, name):
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': name},
+            ExpiresIn=3600,
+        )
+
+    def read_range(self, name, start, length):
+        response = self.client.get_object(
+            Bucket=self.bucket,
+            Key=name,
+            Range=f"bytes={start}-{start + length - 1}",
+        )
+        return response['Body'].read()
+
+
+class RangedReader(io.RawIOBase):
+    """
+    Seekable read-only file over a stored object, fetched with ranged reads.
+
+    Backs storage.open() for remote objects. Readers of the open file that
+    only need part of it, such as image headers, fetch only those bytes;
+    a full read is fetched block by block without holding the object in
+    memory.
+    """
+
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+        self._size = storage.size(name)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def readinto(self, buffer):
+        if self._position >= self._size:
+            return 0
+        length = min(len(buffer), self._size - self._position)
+        data = self.storage.read_range(self.name, self._position, length)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+_local_copy_lock = threading.Lock()
+
+
+def local_path(field_file):
+    """
+    Get a local filesystem path for a stored file.
+
+    Files on local storage are used in place. Remote objects are copied
+    whole into RENDER_CACHE_DIR once, streamed in RANGE_BLOCK_SIZE blocks,
+    and reused from there.
+
+    Pages are not read from remote objects with ranged reads. PyMuPDF
+    reads a stream it is given into memory in full, and the render worker
+    processes open documents by path, so a PDF has to be a local file
+    before any of its pages can be rendered.
+    """
+    storage = field_file.storage
+    try:
+        return storage.path(field_file.name)
+    except NotImplementedError:
+        pass
+
+    # Sharded names embed the content hash, so a cached copy never goes stale
+    digest = hashlib.sha256(field_file.name.encode('utf-8')).hexdigest()
+    _, ext = os.path.splitext(field_file.name)
+    cached = os.path.join(settings.RENDER_CACHE_DIR, digest[:2], digest + ext)
+    try:
+        # Mark the copy as recently used for the retention pass
+        os.utime(cached)
+        return cached
+    except FileNotFoundError:
+        pass
+
+    with _local_copy_lock:
+        if not os.path.exists(cached):
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            tmp_path = f"{cached}.{os.getpid()}.tmp"
+            with storage.open(field_file.name, 'rb') as source, open(tmp_path, 'wb') as target:
+                shutil.copyfileobj(source, target, RANGE_BLOCK_SIZE)
+            os.replace(tmp_path, cached)
+    return cached
+
+
+def archive_storage():
+    """Storage for archived originals and results (the 'archive' alias in STORAGES)."""
+    return storages['archive']
+
+
+def document_path(document):
+    """Local path of a document's file, for renderers and parsers."""
+    if document.file:
+        return local_path(document.file)
+    if document.archived_file:
+        return local_path(document.archived_file)
+    raise FileNotFoundError(f"The original of document {document.pk} was removed by its retention policy")
+
+
+def store_local_file(path, name, content_hash, storage=None):
+    """
+    Move a finished local file into storage under a sharded name.
+
+    On local storage the file is renamed into place; otherwise it is
+    streamed to the backend and removed.
+
+    Returns:
+        The stored file name
+    """
+    storage = storage or default_storage
+    target_name = storage.get_available_name(sharded_name(name, content_hash))
+    try:
+        target = storage.path(target_name)
+    except NotImplementedError:
+        with open(path, 'rb') as f:
+            stored_name = storage.save(name, File(f, name=name))
+        os.remove(path)
+        return stored_name
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(path, target)
+    return target_name
@@ -0,0 +1,87 @@
+"""
+Background work run off the request path.
+
+Tasks run on a small in-process thread pool. They are scheduled with
+transaction.on_commit so they only see rows that are already committed.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from packages.vision_parser.utils import document_metadata, file_sha256, render_thumbnail
+from .models import Document
+from .storage import document_path
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_TASK_WORKERS,
+                thread_name_prefix='api-task'
+            )
+        return _executor
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception(f"Background task {func.__name__} failed")
+    finally:
+        # Background threads do not go through the request cycle
+        close_old_connections()
+
+
+def submit(func, *args):
+    """Run ``func(*args)`` in the background once the current transaction commits."""
+    transaction.on_commit(lambda: _get_executor().submit(_run, func, *args))
+
+
+def submit_later(delay, func, *args):
+    """Run ``func(*args)`` in the background after ``delay`` seconds."""
+    timer = threading.Timer(delay, lambda: _get_executor().submit(_run, func, *args))
+    timer.daemon = True
+    timer.start()
+
+
+def compute_document_metadata(document_id):
+    """
+    Compute and store page count, page size, text-layer presence, content
+    hash and thumbnail for a document.
+    """
+    document = Document.objects.filter(pk=document_id).first()
+    if document is None:
+        return
+
+    path = document_path(document)
+    metadata = document_metadata(path)
+    for field, value in metadata.items():
+        setattr(document, field, value)
+    if not document.content_hash:
+        document.content_hash = file_sha256(path)
+
+    if document.thumbnail:
+        document.thumbnail.delete(save=False)
+    document.thumbnail.save(
+        f"{document.pk}.png",
+        ContentFile(render_thumbnail(path, 1, settings.THUMBNAIL_SIZE)),
+        save=False
+    )
+    document.metadata_computed_at = timezone.now()
+    document.save(update_fields=[
+        *metadata.keys(), 'content_hash', 'thumbnail', 'metadata_computed_at'
+    ])
+    logger.info(f"Computed metadata for document {document.pk}: {metadata}")
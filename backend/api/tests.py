@@ -0,0 +1,242 @@
+"""
+API tests.
+
+QueryBudgetTests runs a request to each budgeted view under the budget it
+declares, so a change that adds queries to a view (an N+1 in a serializer,
+a lookup moved into a loop) fails here instead of only showing up as
+warnings in the logs. Fixtures hold several rows so per-row queries push
+a view over budget.
+"""
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Document, ParsedResult, Schema
+from .querybudget import assert_query_budget, view_budget
+from .versioning import stale_results
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# Rows created per model, enough to make per-row queries exceed a budget
+ROWS = 5
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='budget', password='budget')
+        cls.documents = [
+            Document.objects.create(
+                file=SimpleUploadedFile(f'page-{index}.png', b'not really a png'),
+                name=f'page-{index}.png',
+                schema_type='resume'
+            )
+            for index in range(ROWS)
+        ]
+        cls.results = [
+            ParsedResult.objects.create(document=document, page_number=1, result_data={'name': document.name})
+            for document in cls.documents
+        ]
+        cls.schemas = [
+            Schema.objects.create(
+                name=f'schema-{index}',
+                schema_json={'title': 'Test', 'description': 'Test', 'type': 'object', 'properties': {}}
+            )
+            for index in range(ROWS)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def request_within_budget(self, method, url, data=None, **kwargs):
+        """Make a request, failing if it goes over its view's declared budget."""
+        budget = view_budget(resolve(url.split('?')[0]).func, method)
+        self.assertIsNotNone(budget, f"{method} {url} declares no query budget")
+        with assert_query_budget(queries=budget.queries, time_ms=budget.time_ms):
+            response = getattr(self.client, method.lower())(url, data, **kwargs)
+        return response
+
+    def test_document_list(self):
+        response = self.request_within_budget('GET', '/api/documents/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_document_detail(self):
+        response = self.request_within_budget('GET', f'/api/documents/{self.documents[0].pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_document_upload(self):
+        upload = SimpleUploadedFile('upload.png', b'not really a png', content_type='image/png')
+        response = self.request_within_budget(
+            'POST',
+            '/api/documents/',
+            {'file': upload, 'schema_type': 'resume'},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    @mock.patch.dict(os.environ, {'GOOGLE_API_KEY': 'test-key'})
+    def test_parse_reuses_stored_result(self):
+        response = self.request_within_budget(
+            'POST',
+            '/api/documents/parse/',
+            {'document_id': self.documents[0].pk, 'page_number': 1},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.results[0].pk)
+
+    def test_parsed_result_list(self):
+        response = self.request_within_budget('GET', '/api/parsed-results/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_parsed_result_list_by_document(self):
+        response = self.request_within_budget('GET', f'/api/parsed-results/?document_id={self.documents[0].pk}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_parsed_result_detail(self):
+        response = self.request_within_budget('GET', f'/api/parsed-results/{self.results[0].pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_parsed_result_changes(self):
+        response = self.request_within_budget('GET', '/api/parsed-results/changes/?cursor=0&limit=100')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), ROWS)
+
+    def test_schema_list(self):
+        response = self.request_within_budget('GET', '/api/schemas/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_schema_detail(self):
+        response = self.request_within_budget('GET', f'/api/schemas/{self.schemas[0].pk}/')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ParseBulkSchemaVersionTests(TestCase):
+    """Results stored by parse_bulk record the schema version they came from."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.schema = Schema.objects.create(
+            name='bulk',
+            schema_json={'title': 'Bulk', 'description': 'Bulk', 'type': 'object',
+                         'properties': {'name': {'type': 'string'}}}
+        )
+        cls.document = Document.objects.create(
+            file=SimpleUploadedFile('bulk.png', b'not really a png'),
+            name='bulk.png',
+            schema_type='bulk'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def parse_bulk(self, *args):
+        service = mock.Mock()
+        service.parse_page.return_value = ({'name': 'parsed'}, None)
+        checkpoint = os.path.join(MEDIA_ROOT, 'parse_bulk.checkpoint.json')
+        with mock.patch('api.management.commands.parse_bulk.build_parser_service', return_value=service):
+            call_command('parse_bulk', '--schema', 'bulk', '--checkpoint', checkpoint, '--workers', '1', *args,
+                         stdout=io.StringIO())
+
+    def test_bulk_results_are_not_stale(self):
+        self.parse_bulk()
+        result = ParsedResult.objects.get(document=self.document)
+        self.assertEqual(result.schema_version, self.schema.current_version)
+        self.assertFalse(stale_results(self.schema).exists())
+
+    def test_overwrite_updates_schema_version(self):
+        self.parse_bulk()
+        self.schema.schema_json['properties']['email'] = {'type': 'string'}
+        self.schema.save()
+        self.assertTrue(stale_results(self.schema).exists())
+
+        self.parse_bulk('--overwrite')
+        result = ParsedResult.objects.get(document=self.document)
+        self.assertEqual(result.schema_version, self.schema.current_version)
+        self.assertFalse(stale_results(self.schema).exists())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ArchivedResultListTests(TestCase):
+    """Listing results does not read archived ones back from archive storage."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='archive', password='archive')
+        document = Document.objects.create(
+            file=SimpleUploadedFile('archived.png', b'not really a png'),
+            name='archived.png',
+            schema_type='resume'
+        )
+        cls.result = ParsedResult.objects.create(document=document, page_number=1, result_data={})
+        cls.result.result_archive.name = 'archive/results/archived.json.gz'
+        cls.result.archived_at = timezone.now()
+        cls.result.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_leaves_archived_results_unread(self):
+        with mock.patch('api.models.read_archived_result') as read:
+            response = self.client.get('/api/parsed-results/')
+        self.assertEqual(response.status_code, 200)
+        read.assert_not_called()
+        entry = response.data[0]
+        self.assertTrue(entry['archived'])
+        self.assertIsNone(entry['result_data'])
+
+    def test_detail_reads_archived_result(self):
+        with mock.patch('api.models.read_archived_result', return_value={'name': 'archived'}) as read:
+            response = self.client.get(f'/api/parsed-results/{self.result.pk}/')
+        self.assertEqual(response.status_code, 200)
+        read.assert_called_once()
+        self.assertEqual(response.data['result_data'], {'name': 'archived'})
+
+
+class SchemaVersionTests(TestCase):
+    """Saves of the same schema from stale copies each get their own version."""
+
+    def test_stale_copies_keep_both_edits(self):
+        schema = Schema.objects.create(
+            name='versioned',
+            schema_json={'title': 'V', 'description': 'V', 'type': 'object', 'properties': {}}
+        )
+        first = Schema.objects.get(pk=schema.pk)
+        second = Schema.objects.get(pk=schema.pk)
+
+        first.schema_json = {**first.schema_json, 'properties': {'a': {'type': 'string'}}}
+        first.save()
+        second.schema_json = {**second.schema_json, 'properties': {'b': {'type': 'string'}}}
+        second.save()
+
+        self.assertEqual((first.version, second.version), (2, 3))
+        snapshots = dict(schema.versions.values_list('version', 'schema_json'))
+        self.assertEqual(snapshots[2]['properties'], {'a': {'type': 'string'}})
+        self.assertEqual(snapshots[3]['properties'], {'b': {'type': 'string'}})
@@ -0,0 +1,148 @@
+"""
+Resumable chunked uploads.
+
+Chunks are appended straight to a partial file in storage while a SHA-256
+of the received bytes is updated incrementally. The Document row is only
+created when the session is finalized.
+"""
+import hashlib
+import os
+import posixpath
+import threading
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import Document
+from .storage import store_local_file
+
+# Bytes read from the request stream per write
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Running hashes of open sessions, keyed by session id: (offset, hasher).
+# A worker that did not see the earlier chunks rebuilds it from the file.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class ChunkError(Exception):
+    """A chunk could not be applied to an upload session."""
+
+
+def partial_path(session):
+    """Local path of the partial file for an upload session."""
+    return os.path.join(settings.UPLOAD_TEMP_DIR, f"{session.pk}.part")
+
+
+def _get_hasher(session, path):
+    """
+    Hasher over the bytes received so far.
+
+    Returns a copy of the cached hasher, so a chunk that fails part-way
+    cannot leave its bytes in the cache; append_chunk stores the updated
+    hasher only once the chunk is committed.
+    """
+    with _hashers_lock:
+        cached = _hashers.get(session.pk)
+    if cached and cached[0] == session.received_bytes:
+        return cached[1].copy()
+
+    hasher = hashlib.sha256()
+    if session.received_bytes:
+        with open(path, 'rb') as f:
+            remaining = session.received_bytes
+            while remaining:
+                block = f.read(min(STREAM_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def append_chunk(session, offset, stream):
+    """
+    Append a chunk read from ``stream`` at ``offset``.
+
+    The caller must hold a row lock on the session. Offsets must match the
+    bytes already received, so a retried chunk is rejected rather than
+    written twice; the client resumes from ``received_bytes``.
+    """
+    if session.status != 'open':
+        raise ChunkError('Upload session is already finalized')
+    if offset != session.received_bytes:
+        raise ChunkError(f"Expected offset {session.received_bytes}, got {offset}")
+
+    path = partial_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    hasher = _get_hasher(session, path)
+
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        # Drop any tail left by a chunk that failed part-way
+        f.truncate(offset)
+        f.seek(offset)
+        while True:
+            block = stream.read(STREAM_BLOCK_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if written > settings.UPLOAD_CHUNK_MAX_SIZE or offset + written > session.total_size:
+                f.truncate(offset)
+                raise ChunkError('Chunk exceeds the maximum chunk size or the declared upload size')
+            f.write(block)
+            hasher.update(block)
+
+    session.received_bytes = offset + written
+    session.save(update_fields=['received_bytes', 'updated_at'])
+    with _hashers_lock:
+        _hashers[session.pk] = (session.received_bytes, hasher)
+    return written
+
+
+def finalize_upload(session, expected_sha256=None):
+    """
+    Turn a fully received upload into a Document.
+
+    On local storage the partial file is moved into place rather than
+    copied; remote backends receive it as a stream.
+    """
+    if session.status != 'open':
+        raise ChunkError('Upload session is already finalized')
+    if session.received_bytes != session.total_size:
+        raise ChunkError(f"Upload incomplete: {session.received_bytes} of {session.total_size} bytes received")
+
+    path = partial_path(session)
+    content_hash = _get_hasher(session, path).hexdigest()
+    if expected_sha256 and expected_sha256.lower() != content_hash:
+        raise ChunkError('Checksum mismatch')
+
+    name = store_local_file(
+        path,
+        posixpath.join('documents', default_storage.get_valid_name(session.name)),
+        content_hash
+    )
+
+    document = Document(
+        name=session.name,
+        schema_type=session.schema_type,
+        content_hash=content_hash,
+    )
+    document.file.name = name
+    document.save()
+
+    session.status = 'completed'
+    session.document = document
+    session.save(update_fields=['status', 'document', 'updated_at'])
+    with _hashers_lock:
+        _hashers.pop(session.pk, None)
+    return document
+
+
+def discard_upload(session):
+    """Delete the partial file of an abandoned upload session."""
+    path = partial_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+    with _hashers_lock:
+        _hashers.pop(session.pk, None)
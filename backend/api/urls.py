@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ItemViewSet, DocumentViewSet, ParsedResultViewSet, SchemaViewSet, api_root, csrf_token
+from .views import ItemViewSet, DocumentViewSet, ParsedResultViewSet, SchemaViewSet, UploadSessionViewSet, BatchJobViewSet, WebhookEndpointViewSet, RequestProfileViewSet, api_root, csrf_token, AuthTokenView
 
 # Create a router and register our viewsets with it
 router = DefaultRouter()
@@ -8,11 +8,16 @@ router.register(r'items', ItemViewSet)
 router.register(r'documents', DocumentViewSet)
 router.register(r'parsed-results', ParsedResultViewSet)
 router.register(r'schemas', SchemaViewSet)
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
+router.register(r'batch-jobs', BatchJobViewSet)
+router.register(r'webhooks', WebhookEndpointViewSet, basename='webhook')
+router.register(r'profiles', RequestProfileViewSet)
 
 urlpatterns = [
     path('', api_root, name='api-root'),
     path('', include(router.urls)),
     path('csrf/', csrf_token, name='csrf'),
+    path('auth/token/', AuthTokenView.as_view(), name='auth-token'),
     # Add explicit path for document parsing to avoid routing issues
     path('documents/parse/', DocumentViewSet.as_view({'post': 'parse_document'}), name='document-parse'),
 ]
@@ -0,0 +1,66 @@
+"""
+Incremental re-extraction after schema changes.
+
+Results record the SchemaVersion that produced them. When a schema gains
+or changes fields, only those fields are extracted again and merged into
+the existing result, instead of re-parsing every field of every page.
+"""
+import logging
+
+from packages.vision_parser.schema_diff import changed_fields, merge_fields, removed_fields
+from .models import ParsedResult, Schema
+from .parsing import build_parser_service, model_slot
+from .storage import document_path
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+def stale_results(schema: Schema):
+    """Results of documents using this schema that an older version produced."""
+    return ParsedResult.objects.filter(
+        document__schema_type=schema.name
+    ).exclude(
+        schema_version__schema=schema,
+        schema_version__version=schema.version
+    ).select_related('document', 'schema_version')
+
+
+def reextract_result(result: ParsedResult, schema: Schema, tenant=None):
+    """
+    Bring one result up to the schema's current version.
+
+    Returns:
+        The list of fields that were re-extracted (empty if the change did
+        not touch any extracted field)
+    """
+    current = schema.current_version
+    old_json = result.schema_version.schema_json if result.schema_version else None
+    fields = changed_fields(old_json, current.schema_json)
+    dropped = removed_fields(old_json, current.schema_json)
+
+    partial = {}
+    if fields:
+        parser_service = build_parser_service(schema.name)
+        with model_slot('bulk', tenant):
+            partial = parser_service.extract_fields(
+                document_path(result.document),
+                fields,
+                schema_type=schema.name,
+                page_number=result.page_number
+            )
+
+    result.result_data = merge_fields(result.load_result_data(), partial, fields, dropped)
+    result.schema_version = current
+    update_fields = ['result_data', 'schema_version']
+    if result.archived_at is not None:
+        # The merged result is stored inline again
+        result.result_archive.delete(save=False)
+        result.archived_at = None
+        update_fields += ['result_archive', 'archived_at']
+    result.save(update_fields=update_fields)
+    logger.info(
+        f"Re-extracted {len(fields)} fields of result {result.pk} "
+        f"for {schema.name} v{current.version}"
+    )
+    return fields
@@ -1,10 +1,13 @@
-from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework import mixins, viewsets, status
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from rest_framework.authentication import BasicAuthentication
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 import os
 import base64
@@ -12,14 +15,34 @@ import traceback
 import logging
 import json  # Add this missing import
 from packages.vision_parser import ParserService
-from .models import Item, Document, ParsedResult, Schema
+from packages.vision_parser.scheduler import AdmissionError
+from packages.vision_parser.utils import get_document_bytes
+from .models import Item, Document, ParsedResult, Schema, UploadSession, BatchJob, WebhookEndpoint, RequestProfile
+from .authentication import forget_token
+from .conditional import ConditionalGetMixin
+from .classification import AUTO_SCHEMA, classify_uploaded_document
+from .dedup import find_similar_results, record_page_hash
+from .exports import CONTENT_TYPES, EXPORT_FORMATS, ExportError, export, parse_date
+from .parsing import parse_page, parse_scheduler, model_slot, model_router, resolution_ladder, get_google_api_key
+from .querybudget import QueryBudget, query_budget
+from .renderers import ORJSONParser
+from .storage import document_path
+from .tasks import compute_document_metadata, submit as submit_task
+from .uploads import ChunkError, append_chunk, discard_upload, finalize_upload
+from .versioning import reextract_result, stale_results
 from .serializers import (
     ItemSerializer, 
     DocumentSerializer, 
     ParsedResultSerializer,
     DocumentUploadSerializer,
     DocumentParseSerializer,
-    SchemaSerializer
+    SchemaSerializer,
+    SchemaVersionSerializer,
+    UploadSessionSerializer,
+    BatchJobSerializer,
+    WebhookEndpointSerializer,
+    WebhookDeliverySerializer,
+    RequestProfileSerializer
 )
 
 # Set up logger
@@ -50,6 +73,15 @@ def api_root(request):
     })
 
 
+def _too_many_requests(error):
+    """429 response for a parse refused by the scheduler."""
+    return Response(
+        {"error": str(error)},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(error.retry_after)}
+    )
+
+
 # Add a CSRF token endpoint
 @api_view(['GET'])
 @permission_classes([])  # Allow any - no authentication required
@@ -62,6 +94,32 @@ def csrf_token(request):
     return Response({"detail": "CSRF cookie set"})
 
 
+@extend_schema(tags=["Authentication"])
+class AuthTokenView(ObtainAuthToken):
+    """
+    Exchange a username and password for an API token.
+
+    The password is verified once here; later requests send
+    ``Authorization: Token <key>`` instead of Basic credentials.
+    DELETE revokes the current user's token. A user has a single token
+    shared by all of their clients, so revoking it signs every client out,
+    and other worker processes may accept it for up to
+    AUTH_CREDENTIAL_CACHE_TTL seconds (see api.authentication).
+    """
+
+    def get_permissions(self):
+        if self.request.method == 'DELETE':
+            return [IsAuthenticated()]
+        return []
+
+    def delete(self, request, *args, **kwargs):
+        token = Token.objects.filter(user=request.user).first()
+        if token:
+            forget_token(token.key)
+            token.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 @extend_schema(tags=["Items"])
 class ItemViewSet(viewsets.ModelViewSet):
     """
@@ -76,21 +134,34 @@ class ItemViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
+def _prepare_uploaded_document(document, schema_type, user_id=None):
+    """Schedule schema detection and the metadata pipeline of a new upload."""
+    # Classification calls the model, so it runs in the background rather
+    # than holding up the upload response
+    if schema_type == AUTO_SCHEMA:
+        submit_task(classify_uploaded_document, document.pk, user_id)
+    
+    # Page count, size, text layer, hash and thumbnail are
+    # computed once in the background instead of per request
+    submit_task(compute_document_metadata, document.pk)
+
+
 @extend_schema(tags=["Documents"])
-class DocumentViewSet(viewsets.ModelViewSet):
+class DocumentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for document management.
     """
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
-    authentication_classes = [BasicAuthentication]  # Explicitly set authentication class
+    default_query_budget = QueryBudget(queries=8)
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
     
     @extend_schema(
         request=DocumentUploadSerializer,
         responses={201: DocumentSerializer}
     )
+    @query_budget(queries=15)
     def create(self, request, *args, **kwargs):
         """Upload a new document."""
         # Add explicit authentication check
@@ -105,7 +176,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
             if serializer.is_valid():
                 file = serializer.validated_data['file']
                 name = serializer.validated_data.get('name', file.name)
-                schema_type = serializer.validated_data.get('schema_type', 'resume')
+                schema_type = serializer.validated_data.get('schema_type', AUTO_SCHEMA)
                 
                 # Log useful information
                 logger.info(f"Uploading document: {name}, type: {schema_type}, size: {file.size} bytes")
@@ -120,6 +191,8 @@ class DocumentViewSet(viewsets.ModelViewSet):
                     schema_type=schema_type
                 )
                 
+                _prepare_uploaded_document(document, schema_type, request.user.pk)
+                
                 return Response(
                     DocumentSerializer(document).data,
                     status=status.HTTP_201_CREATED
@@ -139,6 +212,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
         request=DocumentParseSerializer,
         responses={200: ParsedResultSerializer}
     )
+    @query_budget(queries=30)
     @action(detail=False, methods=['post'], url_path='parse')
     def parse_document(self, request):
         """Parse a document using the vision parser."""
@@ -169,6 +243,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
             document_id = serializer.validated_data['document_id']
             page_number = serializer.validated_data.get('page_number', 1)
             schema_type = serializer.validated_data.get('schema_type', None)
+            priority = serializer.validated_data.get('priority', 'interactive')
             
             try:
                 # Check for Google API key
@@ -188,43 +263,28 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 document = Document.objects.get(id=document_id)
                 if not schema_type:
                     schema_type = document.schema_type
-                
-                # Check if result already exists
-                existing_result = ParsedResult.objects.filter(
-                    document=document,
-                    page_number=page_number
-                ).first()
-                
-                if existing_result:
+                if schema_type == AUTO_SCHEMA:
+                    # Parsing now would run the placeholder schema and be paid
+                    # for again once the real one is known
                     return Response(
-                        ParsedResultSerializer(existing_result).data,
-                        status=status.HTTP_200_OK
+                        {"error": "The document's schema is still being detected; retry shortly or pass schema_type"},
+                        status=status.HTTP_409_CONFLICT,
+                        headers={'Retry-After': '5'}
                     )
                 
-                # Initialize parser service with built-in schemas from schema directory
-                parser_service = ParserService(
-                    schema_dir=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'schemas'),
-                    default_schema=schema_type
-                )
-                
-                # Check if a custom schema with this name exists
-                custom_schema = Schema.objects.filter(name=schema_type).first()
-                if custom_schema:
-                    # Add the custom schema to the parser service
-                    parser_service.add_schema(schema_type, custom_schema.schema_json)
-                
-                # Parse the document
-                result = parser_service.parse_document(
-                    document_path=document.file.path,
-                    schema_type=schema_type,
-                    page_number=page_number
-                )
+                if document.page_count is not None and not 1 <= page_number <= document.page_count:
+                    return Response(
+                        {"error": f"Page {page_number} is out of range (document has {document.page_count} pages)"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
                 
-                # Save the result
-                parsed_result = ParsedResult.objects.create(
-                    document=document,
-                    page_number=page_number,
-                    result_data=result
+                # Parse the page, coalescing with any identical in-flight parse
+                parsed_result, _ = parse_page(
+                    document,
+                    page_number,
+                    schema_type,
+                    priority=priority,
+                    tenant=request.user.pk
                 )
                 
                 return Response(
@@ -237,6 +297,8 @@ class DocumentViewSet(viewsets.ModelViewSet):
                     {"error": "Document not found"},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            except AdmissionError as e:
+                return _too_many_requests(e)
             except Exception as e:
                 # Handle Google API key errors specifically
                 error_str = str(e)
@@ -256,6 +318,83 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @extend_schema(
+        responses={200: {'type': 'object', 'properties': {
+            'enabled': {'type': 'boolean'},
+            'tiers': {'type': 'object'},
+            'stats': {'type': 'object'}
+        }}}
+    )
+    @action(detail=False, methods=['get'], url_path='routing-stats', permission_classes=[IsAdminUser])
+    def routing_stats(self, request):
+        """Model tier hit rates for this worker process (staff only)."""
+        if model_router is None:
+            return Response({'enabled': False, 'tiers': {}, 'stats': {}})
+        return Response({
+            'enabled': True,
+            'tiers': model_router.tiers,
+            'stats': model_router.stats()
+        })
+    
+    @extend_schema(
+        responses={200: {'type': 'object', 'properties': {
+            'enabled': {'type': 'boolean'},
+            'dpis': {'type': 'array', 'items': {'type': 'integer'}},
+            'stats': {'type': 'object'}
+        }}}
+    )
+    @action(detail=False, methods=['get'], url_path='resolution-stats', permission_classes=[IsAdminUser])
+    def resolution_stats(self, request):
+        """Acceptance rate and mean payload per render DPI for this worker process (staff only)."""
+        if resolution_ladder is None:
+            return Response({'enabled': False, 'dpis': [], 'stats': {}})
+        return Response({
+            'enabled': True,
+            'dpis': resolution_ladder.dpis,
+            'stats': resolution_ladder.stats()
+        })
+    
+    @extend_schema(
+        responses={200: {'type': 'object', 'properties': {
+            'capacity': {'type': 'integer'},
+            'in_flight': {'type': 'integer'},
+            'classes': {'type': 'object'}
+        }}}
+    )
+    @action(detail=False, methods=['get'], url_path='scheduler-stats', permission_classes=[IsAdminUser])
+    def scheduler_stats(self, request):
+        """Queue depth and per-class wait and latency percentiles for this worker process (staff only)."""
+        return Response(parse_scheduler.stats())
+    
+    @extend_schema(
+        parameters=[OpenApiParameter('page', int, description='Page number (default 1)')],
+        responses={200: {'type': 'array', 'items': {'type': 'object', 'properties': {
+            'distance': {'type': 'integer'},
+            'result': {'type': 'object'}
+        }}}}
+    )
+    @action(detail=True, methods=['get'], url_path='similar')
+    def similar(self, request, pk=None):
+        """List existing results for pages that look like this document's page."""
+        document = self.get_object()
+        try:
+            page_number = int(request.query_params.get('page', 1))
+        except ValueError:
+            return Response({"error": "page must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        page_hash = document.page_hashes.filter(page_number=page_number).first()
+        if page_hash is not None:
+            hash_value = int(page_hash.dhash, 16)
+        else:
+            image, _ = get_document_bytes(document_path(document), page_number)
+            hash_value = record_page_hash(document, page_number, image)
+
+        matches = find_similar_results(document, page_number, hash_value, document.schema_type)
+        return Response([
+            {'distance': distance, 'result': ParsedResultSerializer(result, context={'load_archived': False}).data}
+            for distance, result in matches
+        ])
+    
     @extend_schema(
         responses={200: {'type': 'object', 'properties': {
             'page_count': {'type': 'integer'},
@@ -270,21 +409,18 @@ class DocumentViewSet(viewsets.ModelViewSet):
             page = int(page)
             
             # Get document file path
-            file_path = document.file.path
+            file_path = document_path(document)
             
             # Check file extension
             _, ext = os.path.splitext(file_path.lower())
             
             # For PDFs, use the utility to get specific page
             if ext == '.pdf':
-                from packages.vision_parser.utils import pdf_page_to_base64
+                from packages.vision_parser.utils import pdf_page_to_base64, pdf_page_count
                 preview_data = pdf_page_to_base64(file_path, page)
                 
-                # Also get page count
-                import fitz
-                pdf_document = fitz.open(file_path)
-                page_count = len(pdf_document)
-                pdf_document.close()
+                # Page count is precomputed after upload; fall back for older rows
+                page_count = document.page_count or pdf_page_count(file_path)
                 
             # For images, just return the image
             elif ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
@@ -314,26 +450,194 @@ class DocumentViewSet(viewsets.ModelViewSet):
             )
 
 
+@extend_schema(tags=["Uploads"])
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads for large documents.
+
+    1. POST /uploads/ with name, schema_type and total_size to open a session.
+    2. PUT /uploads/{id}/chunk/?offset=N with the raw bytes of each chunk.
+       After a dropped connection, GET /uploads/{id}/ returns the
+       received_bytes offset to resume from.
+    3. POST /uploads/{id}/finalize/ to create the document.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+        instance.delete()
+
+    @extend_schema(
+        parameters=[OpenApiParameter('offset', int, description='Byte offset of this chunk')],
+        request={'application/octet-stream': {'type': 'string', 'format': 'binary'}},
+        responses={200: UploadSessionSerializer}
+    )
+    @action(detail=True, methods=['put'], url_path='chunk', parser_classes=[])
+    def chunk(self, request, pk=None):
+        """Append a chunk of raw bytes to the upload."""
+        offset = request.query_params.get('offset', request.headers.get('Upload-Offset'))
+        try:
+            offset = int(offset)
+        except (TypeError, ValueError):
+            return Response({"error": "offset is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        stream = request.stream
+        if stream is None:
+            return Response({"error": "Empty chunk"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # Row lock serializes chunks for the same session across workers
+            session = self.get_queryset().select_for_update().get(pk=self.get_object().pk)
+            try:
+                append_chunk(session, offset, stream)
+            except ChunkError as e:
+                return Response(
+                    {"error": str(e), "received_bytes": session.received_bytes},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+        return Response(UploadSessionSerializer(session).data)
+
+    @extend_schema(
+        request={'application/json': {'type': 'object', 'properties': {
+            'sha256': {'type': 'string'}
+        }}},
+        responses={201: DocumentSerializer}
+    )
+    @action(detail=True, methods=['post'], url_path='finalize')
+    def finalize(self, request, pk=None):
+        """Create the document from a fully received upload."""
+        with transaction.atomic():
+            session = self.get_queryset().select_for_update().get(pk=self.get_object().pk)
+            try:
+                document = finalize_upload(session, request.data.get('sha256'))
+            except ChunkError as e:
+                return Response(
+                    {"error": str(e), "received_bytes": session.received_bytes},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+        logger.info(f"Finalized chunked upload {session.pk} as document {document.pk} ({session.total_size} bytes)")
+        _prepare_uploaded_document(document, session.schema_type, request.user.pk)
+        return Response(DocumentSerializer(document).data, status=status.HTTP_201_CREATED)
+
+
 @extend_schema(tags=["Parsed Results"])
-class ParsedResultViewSet(viewsets.ReadOnlyModelViewSet):
+class ParsedResultViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for viewing parsed results.
     """
     queryset = ParsedResult.objects.all()
     serializer_class = ParsedResultSerializer
     permission_classes = [IsAuthenticated]
+    default_query_budget = QueryBudget(queries=8)
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Lists would read every archived result back from archive storage
+        context['load_archived'] = self.action != 'list'
+        return context
+
     def get_queryset(self):
         """Filter results by document if specified."""
         queryset = super().get_queryset()
         document_id = self.request.query_params.get('document_id', None)
         if document_id is not None:
+            if not document_id.isdigit():
+                raise ValidationError({"document_id": "Must be an integer"})
             queryset = queryset.filter(document_id=document_id)
         return queryset
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='output', type=str, enum=list(EXPORT_FORMATS),
+                             description='Export format (default ndjson); csv and parquet require schema'),
+            OpenApiParameter(name='schema', type=str, description='Only export results of documents with this schema type'),
+            OpenApiParameter(name='since', type=str, description='Only results parsed on or after this date (YYYY-MM-DD)'),
+            OpenApiParameter(name='until', type=str, description='Only results parsed before this date (YYYY-MM-DD)'),
+            OpenApiParameter(name='document_id', type=int, description='Only results of this document'),
+        ],
+        responses={(200, 'application/octet-stream'): bytes}
+    )
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_results(self, request):
+        """
+        Stream results as NDJSON, schema-flattened CSV or Parquet.
+
+        Results are read in chunks and streamed as they are written, so
+        large exports use constant memory on the server.
+        """
+        params = request.query_params
+        export_format = params.get('output', 'ndjson')
+        try:
+            since = parse_date(params['since']) if params.get('since') else None
+            until = parse_date(params['until']) if params.get('until') else None
+            document_id = params.get('document_id')
+            if document_id and not document_id.isdigit():
+                raise ExportError(f"Invalid document_id '{document_id}', expected an integer")
+            chunks = export(
+                export_format,
+                schema=params.get('schema'),
+                since=since,
+                until=until,
+                document_id=int(document_id) if document_id else None
+            )
+        except ExportError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[export_format])
+        filename = f"parsed-results-{params.get('schema') or 'all'}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='cursor', type=int, description='Last result id already seen (default 0)'),
+            OpenApiParameter(name='limit', type=int, description='Maximum entries to return (default 100, max 1000)'),
+        ],
+        responses={200: {'type': 'object', 'properties': {
+            'results': {'type': 'array', 'items': {'type': 'object'}},
+            'cursor': {'type': 'integer'},
+            'has_more': {'type': 'boolean'}
+        }}}
+    )
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        """
+        Feed of results created after a cursor, oldest first.
+
+        Entries carry ids only, not result_data; pass the returned cursor on
+        the next call to continue where this one stopped.
+        """
+        try:
+            cursor = int(request.query_params.get('cursor', 0))
+            limit = min(max(int(request.query_params.get('limit', 100)), 1), 1000)
+        except ValueError:
+            return Response({"error": "cursor and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset().filter(id__gt=cursor).order_by('id')
+        entries = list(queryset.values('id', 'document_id', 'page_number', 'parsed_at')[:limit + 1])
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        return Response({
+            'results': entries,
+            'cursor': entries[-1]['id'] if entries else cursor,
+            'has_more': has_more
+        })
+
 
 @extend_schema(tags=["Schemas"])
-class SchemaViewSet(viewsets.ModelViewSet):
+class SchemaViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing document schemas.
     
@@ -343,6 +647,7 @@ class SchemaViewSet(viewsets.ModelViewSet):
     queryset = Schema.objects.all()
     serializer_class = SchemaSerializer
     permission_classes = [IsAuthenticated]
+    default_query_budget = QueryBudget(queries=8)
     
     @extend_schema(
         responses={200: {'type': 'object', 'properties': {
@@ -371,6 +676,72 @@ class SchemaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
             
+    @extend_schema(responses={200: SchemaVersionSerializer(many=True)})
+    @action(detail=True, methods=['get'], url_path='versions')
+    def versions(self, request, pk=None):
+        """
+        List the immutable versions of a schema.
+        """
+        schema = self.get_object()
+        return Response(SchemaVersionSerializer(schema.versions.all(), many=True).data)
+
+    @extend_schema(
+        request={'application/json': {'type': 'object', 'properties': {
+            'limit': {'type': 'integer'}
+        }}},
+        responses={200: {'type': 'object', 'properties': {
+            'version': {'type': 'integer'},
+            'updated': {'type': 'array', 'items': {'type': 'object'}},
+            'remaining': {'type': 'integer'}
+        }}}
+    )
+    # Runs a bounded batch of re-extractions, each with its own queries
+    @query_budget()
+    @action(detail=True, methods=['post'], url_path='reextract')
+    def reextract(self, request, pk=None):
+        """
+        Bring results produced by older versions of this schema up to date.
+
+        Only fields added or changed since the producing version are sent
+        to the model; the rest of each result is kept. Processes up to
+        ``limit`` results per call (default 20).
+        """
+        schema = self.get_object()
+        try:
+            limit = int(request.data.get('limit', 20))
+        except (TypeError, ValueError):
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not get_google_api_key():
+            return Response(
+                {"error": "Valid Google API key not configured"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        updated = []
+        try:
+            for result in stale_results(schema)[:limit]:
+                fields = reextract_result(result, schema, tenant=request.user.pk)
+                updated.append({'id': result.pk, 'fields': fields})
+        except AdmissionError as e:
+            response = _too_many_requests(e)
+            response.data['updated'] = updated
+            return response
+        except Exception as e:
+            logger.error(f"Error re-extracting results for schema {schema.name}: {str(e)}")
+            logger.error(traceback.format_exc())
+            return Response(
+                {"error": str(e), "updated": updated},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response({
+            'version': schema.version,
+            'updated': updated,
+            'remaining': stale_results(schema).count()
+        })
+
+    @query_budget(queries=30)
     @action(detail=True, methods=['post'], url_path='test-parse')
     def test_schema(self, request, pk=None):
         """
@@ -416,15 +787,18 @@ class SchemaViewSet(viewsets.ModelViewSet):
             )
                 
             # Parse the document with the custom schema
-            result = parser_service.parse_document(
-                document_path=document.file.path,
-                page_number=int(page_number)
-            )
+            with model_slot('interactive', request.user.pk):
+                result = parser_service.parse_document(
+                    document_path=document_path(document),
+                    page_number=int(page_number)
+                )
                 
             return Response({
                 'result': result
             })
                 
+        except AdmissionError as e:
+            return _too_many_requests(e)
         except Exception as e:
             logger.error(f"Error testing schema: {str(e)}")
             logger.error(traceback.format_exc())
@@ -432,3 +806,64 @@ class SchemaViewSet(viewsets.ModelViewSet):
                 {"error": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+@extend_schema(tags=["Batch jobs"])
+class BatchJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for tracking provider batch jobs submitted with
+    ``manage.py parse_batch``. Staff only.
+    """
+    queryset = BatchJob.objects.all()
+    serializer_class = BatchJobSerializer
+    permission_classes = [IsAdminUser]
+
+
+@extend_schema(tags=["Webhooks"])
+class WebhookEndpointViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for managing webhook endpoints notified on parse
+    completion or failure. Each user only sees their own endpoints.
+    """
+    serializer_class = WebhookEndpointSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return WebhookEndpoint.objects.filter(user=self.request.user).order_by('id')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @extend_schema(responses={200: WebhookDeliverySerializer(many=True)})
+    @action(detail=True, methods=['get'])
+    def deliveries(self, request, pk=None):
+        """
+        Recent deliveries to this endpoint, newest first.
+        """
+        endpoint = self.get_object()
+        return Response(WebhookDeliverySerializer(endpoint.deliveries.all()[:50], many=True).data)
+
+
+@extend_schema(tags=["Profiling"])
+class RequestProfileViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for request profiles captured by ProfilingMiddleware.
+    Staff only.
+    """
+    queryset = RequestProfile.objects.all()
+    serializer_class = RequestProfileSerializer
+    permission_classes = [IsAdminUser]
+
+    @action(detail=True, methods=['get'])
+    def artifact(self, request, pk=None):
+        """
+        Download the CPU profile (pyinstrument HTML or cProfile text).
+        """
+        profile = self.get_object()
+        if not profile.artifact:
+            return Response({"error": "Profile has no artifact"}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            profile.artifact.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(profile.artifact.name)
+        )
@@ -0,0 +1,46 @@
+"""
+Warm-up hook for preforked servers.
+
+With ``gunicorn --preload`` the application is imported once in the master
+process. Calling warmup() there loads the heavy parser and render
+dependencies, reads the schemas and creates the model clients before the
+workers fork, so every worker starts with that state already in memory.
+"""
+import logging
+import time
+
+from django.db import connections
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Modules deferred at import time that warm-up loads ahead of the fork
+HEAVY_MODULES = ('fitz', 'PIL.Image', 'langchain_openai', 'langchain_core.messages')
+
+
+def warmup():
+    """Preload heavy modules, schemas and parser services."""
+    import importlib
+
+    from .models import Schema
+    from .parsing import build_parser_service, get_google_api_key
+
+    started = time.monotonic()
+    for module in HEAVY_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            logger.warning(f"Warm-up could not import {module}: {e}")
+
+    if get_google_api_key():
+        schema_types = ['resume', *Schema.objects.values_list('name', flat=True)]
+        for schema_type in schema_types:
+            try:
+                parser_service = build_parser_service(schema_type)
+                parser_service._get_parser(schema_type if schema_type in parser_service.schemas else 'resume')
+            except Exception as e:
+                logger.warning(f"Warm-up could not prepare parser for {schema_type}: {e}")
+
+    # Connections must not be shared with forked workers
+    connections.close_all()
+    logger.info(f"Warm-up finished in {time.monotonic() - started:.2f}s")
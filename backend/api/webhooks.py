@@ -0,0 +1,247 @@
+"""
+Signed webhook callbacks for parse events.
+
+Each event is stored as one WebhookDelivery per subscribed endpoint and
+sent in the background. Failed deliveries are retried with exponential
+backoff, in-process while the server runs and by ``manage.py
+deliver_webhooks`` for retries left over from a restart.
+
+Requests carry an ``X-Webhook-Signature: t=<unix time>,v1=<hex>`` header,
+where the hex digest is the HMAC-SHA256 of ``"<t>.<body>"`` keyed by the
+endpoint secret. Receivers should reject stale timestamps.
+
+Events go only to the endpoints of the user whose request caused them.
+Endpoint URLs must be https and resolve to public addresses. The host is
+resolved and checked again before every attempt, and the request is sent
+to the address that passed the check rather than resolving the host a
+second time, so DNS rebinding cannot point a webhook at internal
+services. Redirects are not followed.
+"""
+import hashlib
+import hmac
+import http.client
+import ipaddress
+import json
+import logging
+import random
+import socket
+import ssl
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import WebhookDelivery, WebhookEndpoint
+from .tasks import submit as submit_task, submit_later
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+EVENTS = ('parse.completed', 'parse.failed')
+
+# Longest backoff between two attempts in seconds
+MAX_BACKOFF = 3600
+
+
+class UnsafeURLError(ValueError):
+    """A webhook URL is not https or resolves to a non-public address."""
+
+
+class _NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Report redirects as HTTP errors instead of following them."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(_NoRedirectHandler)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    """
+    HTTPS connection to a fixed address.
+
+    The URL's host is still used for SNI, certificate verification and the
+    Host header.
+    """
+
+    def __init__(self, host, address, **kwargs):
+        super().__init__(host, **kwargs)
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def check_url(url):
+    """
+    Raise UnsafeURLError unless the URL is https and every address its host
+    resolves to is public. WEBHOOK_ALLOW_PRIVATE_URLS skips the check for
+    local testing.
+
+    Returns:
+        An address the host resolved to, to connect to, or None when the
+        check is skipped
+    """
+    if settings.WEBHOOK_ALLOW_PRIVATE_URLS:
+        return None
+    try:
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port or 443
+    except ValueError as e:
+        raise UnsafeURLError(f"Invalid webhook URL: {e}")
+    if parts.scheme != 'https' or not parts.hostname:
+        raise UnsafeURLError("Webhook URLs must use https")
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise UnsafeURLError(f"Cannot resolve {parts.hostname}: {e}")
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split('%')[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise UnsafeURLError(f"{parts.hostname} resolves to non-public address {address}")
+    return addresses[0][4][0]
+
+
+def _post(url, body, headers):
+    """
+    POST a body to a webhook URL, returning the response status.
+
+    The connection goes to the address check_url accepted, so the host is
+    not resolved again between the check and the request.
+    """
+    address = check_url(url)
+    if address is None:
+        request = urllib.request.Request(url, data=body, method='POST', headers=headers)
+        try:
+            with _opener.open(request, timeout=settings.WEBHOOK_TIMEOUT) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    connection = _PinnedHTTPSConnection(
+        parts.hostname,
+        address,
+        port=parts.port,
+        timeout=settings.WEBHOOK_TIMEOUT,
+        context=ssl.create_default_context()
+    )
+    try:
+        connection.request('POST', path, body=body, headers=headers)
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def sign(secret, timestamp, body):
+    """Signature header value for a request body sent at ``timestamp``."""
+    message = f"{timestamp}.".encode('utf-8') + body
+    digest = hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def backoff(attempts):
+    """Seconds to wait after the given number of failed attempts, with jitter."""
+    delay = min(settings.WEBHOOK_RETRY_BASE_DELAY * 2 ** (attempts - 1), MAX_BACKOFF)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def emit(event, payload, user_id):
+    """
+    Queue an event for the given user's active endpoints subscribed to it.
+
+    Events with no user behind them (user_id None) are not sent anywhere.
+    """
+    if user_id is None:
+        return
+    for endpoint in WebhookEndpoint.objects.filter(user_id=user_id, active=True):
+        if not endpoint.wants(event):
+            continue
+        delivery = WebhookDelivery.objects.create(endpoint=endpoint, event=event, payload=payload)
+        submit_task(deliver, delivery.pk)
+
+
+def _claim(delivery_id):
+    """
+    Take a due delivery for one attempt.
+
+    Pushing next_attempt_at past the request timeout keeps the retry sweep
+    and an in-process retry from sending the same attempt twice.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.WEBHOOK_TIMEOUT * 2)
+    return WebhookDelivery.objects.filter(
+        pk=delivery_id,
+        status='pending',
+        next_attempt_at__lte=now
+    ).update(next_attempt_at=lease) == 1
+
+
+def deliver(delivery_id):
+    """Make one delivery attempt and schedule a retry if it fails."""
+    if not _claim(delivery_id):
+        return
+    delivery = WebhookDelivery.objects.select_related('endpoint').get(pk=delivery_id)
+
+    body = json.dumps({
+        'id': delivery.pk,
+        'event': delivery.event,
+        'created_at': delivery.created_at,
+        'data': delivery.payload,
+    }, cls=DjangoJSONEncoder).encode('utf-8')
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'llm-parser-app-webhooks',
+        'X-Webhook-Event': delivery.event,
+        'X-Webhook-Signature': sign(delivery.endpoint.secret, int(time.time()), body),
+    }
+
+    response_status = None
+    error = ''
+    try:
+        # The host may resolve differently than when the endpoint was saved
+        response_status = _post(delivery.endpoint.url, body, headers)
+        if not 200 <= response_status < 300:
+            error = f"HTTP {response_status}"
+    except (OSError, http.client.HTTPException, UnsafeURLError) as e:
+        error = str(e)
+
+    delivery.attempts += 1
+    delivery.response_status = response_status
+    delivery.last_error = error
+    if not error:
+        delivery.status = 'delivered'
+        delivery.delivered_at = timezone.now()
+    elif delivery.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+        delivery.status = 'failed'
+        logger.warning(f"Giving up on webhook delivery {delivery.pk} after {delivery.attempts} attempts: {error}")
+    else:
+        delay = backoff(delivery.attempts)
+        delivery.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        submit_later(delay, deliver, delivery.pk)
+    delivery.save(update_fields=[
+        'attempts', 'response_status', 'last_error', 'status', 'delivered_at', 'next_attempt_at'
+    ])
+
+
+def deliver_due(limit=100):
+    """Attempt pending deliveries whose retry time has passed."""
+    due = list(WebhookDelivery.objects.filter(
+        status='pending',
+        next_attempt_at__lte=timezone.now()
+    ).order_by('next_attempt_at').values_list('pk', flat=True)[:limit])
+    for delivery_id in due:
+        deliver(delivery_id)
+    return len(due)
@@ -1,4 +1,5 @@
 import os
+import json
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -26,6 +27,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     # Third party apps
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'drf_spectacular',  # Add this line
     # Local apps
@@ -34,11 +36,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -72,6 +77,15 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        # Keep connections open between requests instead of reconnecting
+        # every time (0 closes after each request, None never does)
+        'CONN_MAX_AGE': None if os.environ.get('DB_CONN_MAX_AGE') == 'None' else int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        # Check a reused connection is still alive before the request uses it
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'OPTIONS': {
+            # Fail fast instead of hanging a worker when Postgres is unreachable
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+        },
     }
 }
 
@@ -105,6 +119,143 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Storage backend for uploaded documents and thumbnails:
+# 'api.storage.ShardedFileSystemStorage' (default) or 'api.storage.S3Storage'
+STORAGES = {
+    'default': {
+        'BACKEND': os.environ.get('STORAGE_BACKEND', 'api.storage.ShardedFileSystemStorage'),
+    },
+    # Archived originals and results; ARCHIVE_STORAGE_OPTIONS (JSON) is passed to the backend,
+    # e.g. {"bucket": "parser-archive"} for S3Storage
+    'archive': {
+        'BACKEND': os.environ.get('ARCHIVE_STORAGE_BACKEND', 'api.storage.ShardedFileSystemStorage'),
+        'OPTIONS': json.loads(os.environ.get('ARCHIVE_STORAGE_OPTIONS', '') or '{}'),
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# S3-compatible object storage (set S3_ENDPOINT_URL for MinIO or another stand-in)
+S3_BUCKET = os.environ.get('S3_BUCKET', '')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL', '')
+S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID', '')
+S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY', '')
+S3_REGION = os.environ.get('S3_REGION', '')
+
+# Local copies of remote documents used by the renderers
+RENDER_CACHE_DIR = os.environ.get('RENDER_CACHE_DIR', os.path.join(MEDIA_ROOT, 'render_cache'))
+# Partial files of in-progress chunked uploads
+UPLOAD_TEMP_DIR = os.environ.get('UPLOAD_TEMP_DIR', os.path.join(MEDIA_ROOT, 'uploads'))
+
+# Vision parser settings
+# Send minified schemas and short prompts to the model to cut input tokens
+# (off by default until its effect on extraction accuracy is measured)
+VISION_PARSER_COMPACT_SCHEMAS = os.environ.get('VISION_PARSER_COMPACT_SCHEMAS', 'False') == 'True'
+
+# Seconds verified Basic credentials are trusted before the password is hashed again
+AUTH_CREDENTIAL_CACHE_TTL = int(os.environ.get('AUTH_CREDENTIAL_CACHE_TTL', '300'))
+# Seconds a verified token and its user are trusted without a query; a revoked
+# token or deactivated user can stay valid on other worker processes for this long
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', '60'))
+
+# Tiered model routing as JSON, e.g. {"default": ["gemini-2.0-flash-lite", "gemini-2.0-flash"]}.
+# Per-schema entries override "default"; empty uses a single model for every parse.
+VISION_PARSER_ROUTING = json.loads(os.environ.get('VISION_PARSER_ROUTING', '') or '{}')
+# Minimum result score (0-1) before a parse escalates to the next model tier
+VISION_PARSER_ESCALATION_THRESHOLD = float(os.environ.get('VISION_PARSER_ESCALATION_THRESHOLD', '0.8'))
+# Optional result field with per-field confidence values used in scoring
+VISION_PARSER_CONFIDENCE_FIELD = os.environ.get('VISION_PARSER_CONFIDENCE_FIELD') or None
+
+# Progressive render resolutions for PDF pages, lowest first, e.g. "72,144,216".
+# Pages are re-rendered at the next DPI only when the output fails schema
+# validation; empty renders every page once at 72 DPI.
+VISION_PARSER_RENDER_DPIS = [int(dpi) for dpi in os.environ.get('VISION_PARSER_RENDER_DPIS', '').split(',') if dpi.strip()]
+# Share of required fields (0-1) a render must fill before its output is accepted
+VISION_PARSER_RENDER_MIN_COVERAGE = float(os.environ.get('VISION_PARSER_RENDER_MIN_COVERAGE', '1.0'))
+
+# Maximum Hamming distance (of 64 bits) between page hashes treated as the same page
+PHASH_MAX_DISTANCE = int(os.environ.get('PHASH_MAX_DISTANCE', '4'))
+# Reuse the result of a near-duplicate page instead of calling the model. Pages
+# of a shared template hash alike, so a match is also required to be the same
+# file and page or to have the same text layer; scans without text are never reused.
+PHASH_REUSE_RESULTS = os.environ.get('PHASH_REUSE_RESULTS', 'False') == 'True'
+
+# Threads running post-upload background work (metadata, thumbnails)
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', '2'))
+# Maximum width and height of document thumbnails in pixels
+THUMBNAIL_SIZE = int(os.environ.get('THUMBNAIL_SIZE', '256'))
+
+# Resumable uploads: largest accepted file and largest single chunk, in bytes
+UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', str(2 * 1024 ** 3)))
+UPLOAD_CHUNK_MAX_SIZE = int(os.environ.get('UPLOAD_CHUNK_MAX_SIZE', str(16 * 1024 ** 2)))
+
+# Response compression: minimum body size in bytes and codec levels
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+
+# Cold import budget for config.wsgi and config.urls in milliseconds (manage.py check_import_time)
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', '1500'))
+
+# Provider batch jobs (manage.py parse_batch): OpenAI-compatible API root, empty for
+# the Gemini endpoint; point it at a local stand-in server for testing
+VISION_PARSER_BATCH_BASE_URL = os.environ.get('VISION_PARSER_BATCH_BASE_URL', '')
+# Pages packed into one batch job
+VISION_PARSER_BATCH_MAX_REQUESTS = int(os.environ.get('VISION_PARSER_BATCH_MAX_REQUESTS', '500'))
+
+# Webhook callbacks: request timeout in seconds, attempts before giving up and the
+# first retry delay in seconds (doubled on every failure)
+WEBHOOK_TIMEOUT = float(os.environ.get('WEBHOOK_TIMEOUT', '10'))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', '8'))
+WEBHOOK_RETRY_BASE_DELAY = float(os.environ.get('WEBHOOK_RETRY_BASE_DELAY', '30'))
+# Accept http and private or loopback webhook hosts; for local testing only
+WEBHOOK_ALLOW_PRIVATE_URLS = os.environ.get('WEBHOOK_ALLOW_PRIVATE_URLS', 'False') == 'True'
+
+# Request profiling: honour X-Profile: 1 from staff users, profile this share (0-1)
+# of all requests, and the pyinstrument sampling interval in seconds
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'True') == 'True'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL', '0.001'))
+
+# Model-call scheduler per worker process: concurrent calls, and per priority class
+# (interactive, bulk, backfill) weights, queue limits and queue timeouts in seconds as JSON
+PARSE_SCHEDULER_CAPACITY = int(os.environ.get('PARSE_SCHEDULER_CAPACITY', '8'))
+PARSE_SCHEDULER_WEIGHTS = json.loads(os.environ.get('PARSE_SCHEDULER_WEIGHTS', '') or '{}')
+PARSE_SCHEDULER_QUEUE_LIMITS = json.loads(
+    os.environ.get('PARSE_SCHEDULER_QUEUE_LIMITS', '') or '{"interactive": 64, "bulk": 256, "backfill": 1024}'
+)
+PARSE_SCHEDULER_TIMEOUTS = json.loads(
+    os.environ.get('PARSE_SCHEDULER_TIMEOUTS', '') or '{"interactive": 30, "bulk": 300}'
+)
+# The scheduler above is per process, so bulk work in one process (e.g. parse_bulk)
+# never queues behind interactive calls in the web workers. These JSON limits cap
+# concurrent calls per class across all processes sharing the database (PostgreSQL
+# advisory locks); classes left out are not capped
+PARSE_SCHEDULER_SHARED_LIMITS = json.loads(
+    os.environ.get('PARSE_SCHEDULER_SHARED_LIMITS', '') or '{"bulk": 4, "backfill": 2}'
+)
+
+# Retention (manage.py enforce_retention) as JSON keyed by schema type or "default", e.g.
+# {"default": {"results_archive_days": 90}, "invoice": {"originals_days": 365, "originals_action": "archive"}}
+RETENTION_POLICIES = json.loads(os.environ.get('RETENTION_POLICIES', '') or '{}')
+# Maximum deletes or moves per second during a retention pass
+RETENTION_RATE = float(os.environ.get('RETENTION_RATE', '20'))
+# Unreferenced stored files younger than this are not collected
+ORPHAN_GRACE_HOURS = int(os.environ.get('ORPHAN_GRACE_HOURS', '24'))
+# Render cache: copies unused for this many days go, and the cache is kept under this many bytes
+RENDER_CACHE_MAX_AGE_DAYS = int(os.environ.get('RENDER_CACHE_MAX_AGE_DAYS', '7'))
+RENDER_CACHE_MAX_SIZE = int(os.environ.get('RENDER_CACHE_MAX_SIZE', str(10 * 1024 ** 3)))
+# Days before abandoned upload sessions, request profiles and finished webhook deliveries are deleted
+UPLOAD_SESSION_MAX_AGE_DAYS = int(os.environ.get('UPLOAD_SESSION_MAX_AGE_DAYS', '7'))
+RECORD_RETENTION_DAYS = int(os.environ.get('RECORD_RETENTION_DAYS', '30'))
+
+# Per-request query budgets (api.querybudget): 'log' warns, 'raise' fails the
+# request (for CI), 'off' skips counting
+QUERY_BUDGET_ACTION = os.environ.get('QUERY_BUDGET_ACTION', 'log')
+# Budget of views that declare none, e.g. {"queries": 50, "time_ms": 500}
+QUERY_BUDGET_DEFAULT = json.loads(os.environ.get('QUERY_BUDGET_DEFAULT', '') or '{}')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -113,9 +264,19 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+        'api.authentication.CachedBasicAuthentication',
     ],
     # Add this section for API schema generation
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
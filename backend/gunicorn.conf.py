@@ -0,0 +1,16 @@
+"""
+Gunicorn settings, read automatically from the working directory.
+
+Set GUNICORN_PRELOAD=True (or pass --preload) to import the application
+once in the master and run the warm-up hook before workers fork.
+"""
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'False') == 'True'
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before workers start
+    if server.cfg.preload_app:
+        from api.warmup import warmup
+        warmup()
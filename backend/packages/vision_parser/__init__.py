@@ -1,6 +1,26 @@
 """Vision Parser package for document extraction using Gemini model."""
 
-from .parser import DocumentParser
-from .service import ParserService
+import importlib
 
-__all__ = ['DocumentParser', 'ParserService']
+__all__ = ['DocumentParser', 'ModelRouter', 'ParserService', 'ResolutionLadder']
+
+# Public classes are resolved on first access so that importing the package
+# does not pull in the parser and render dependencies.
+_LAZY_ATTRIBUTES = {
+    'DocumentParser': '.parser',
+    'ModelRouter': '.routing',
+    'ParserService': '.service',
+    'ResolutionLadder': '.resolution',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,170 @@
+import json
+import tempfile
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from .parser import OPENAI_COMPAT_BASE_URL
+
+# Endpoint every batch line targets and the provider's completion window
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+
+# Batch statuses after which the provider does no more work
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def chat_request(
+    custom_id: str,
+    image_url: str,
+    prompt: str,
+    schema: Dict[str, Any],
+    model: str,
+    temperature: float = 0
+) -> Dict[str, Any]:
+    """Build one line of a batch input file.
+    
+    Args:
+        custom_id: Identifier echoed back with the result
+        image_url: Image as a data URL
+        prompt: Text prompt to guide the extraction
+        schema: JSON schema the response must follow
+        model: Model to use for parsing
+        temperature: Temperature for generation
+    
+    Returns:
+        Chat completion request in the OpenAI batch JSONL format
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "temperature": temperature,
+            "messages": [{
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": image_url}},
+                ],
+            }],
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": schema.get("title", "document").replace(" ", "_"),
+                    "schema": schema,
+                },
+            },
+        },
+    }
+
+
+def parse_output_line(line: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """Read one line of a batch output or error file.
+    
+    Args:
+        line: JSON line written by the provider
+    
+    Returns:
+        Tuple of (custom_id, result, error); exactly one of result and
+        error is None
+    """
+    record = json.loads(line)
+    custom_id = record.get("custom_id", "")
+    if record.get("error"):
+        return custom_id, None, json.dumps(record["error"])
+    
+    response = record.get("response") or {}
+    if response.get("status_code") != 200:
+        return custom_id, None, f"HTTP {response.get('status_code')}: {json.dumps(response.get('body'))}"
+    
+    try:
+        content = response["body"]["choices"][0]["message"]["content"]
+        # Some models fence JSON output even in structured mode
+        content = content.strip().removeprefix("```json").removesuffix("```")
+        return custom_id, json.loads(content), None
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return custom_id, None, f"Unreadable response: {e}"
+
+
+class BatchClient:
+    """Submit and track provider batch jobs through the OpenAI-compatible API."""
+    
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        """Initialize the batch client.
+        
+        Args:
+            api_key: Provider API key
+            base_url: OpenAI-compatible API root; point it at a local stand-in
+                server for testing (default uses the Gemini endpoint)
+        """
+        # Imported here so the package stays cheap to import
+        from openai import OpenAI
+        
+        self.client = OpenAI(api_key=api_key, base_url=base_url or OPENAI_COMPAT_BASE_URL)
+    
+    def submit(self, requests: Iterable[Dict[str, Any]], metadata: Optional[Dict[str, str]] = None) -> str:
+        """Upload batch lines as a JSONL file and start a batch job.
+        
+        Args:
+            requests: Lines built with ``chat_request``
+            metadata: Optional labels stored with the job
+        
+        Returns:
+            Provider batch ID
+        """
+        with tempfile.TemporaryFile() as input_file:
+            for request in requests:
+                input_file.write(json.dumps(request).encode("utf-8"))
+                input_file.write(b"\n")
+            input_file.seek(0)
+            uploaded = self.client.files.create(file=("batch.jsonl", input_file), purpose="batch")
+        
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=COMPLETION_WINDOW,
+            metadata=metadata
+        )
+        return batch.id
+    
+    def status(self, batch_id: str) -> Dict[str, Any]:
+        """Get the status and request counts of a batch job.
+        
+        Args:
+            batch_id: Provider batch ID
+        
+        Returns:
+            Dictionary with status, output_file_id, error_file_id, total,
+            completed and failed
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+            "total": counts.total if counts else 0,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0,
+        }
+    
+    def results(self, status: Dict[str, Any]) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+        """Stream the results of a finished batch job.
+        
+        Args:
+            status: Dictionary returned by ``status``
+        
+        Yields:
+            Tuples of (custom_id, result, error) as from ``parse_output_line``
+        """
+        for file_id in (status.get("output_file_id"), status.get("error_file_id")):
+            if not file_id:
+                continue
+            content = self.client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    yield parse_output_line(line)
+    
+    def cancel(self, batch_id: str) -> None:
+        """Ask the provider to stop a batch job."""
+        self.client.batches.cancel(batch_id)
@@ -0,0 +1,150 @@
+import re
+from typing import Dict, Any, Optional, List, NamedTuple
+
+from .config import DEFAULT_CONFIG, SCHEMA_KEYWORDS
+from .utils import extract_text, render_thumbnail, to_data_url
+
+# Words too common to tell schemas apart when derived from field names
+STOP_WORDS = {"and", "of", "the", "a", "an", "to", "for", "in", "on", "or", "by", "number", "name", "date", "type", "list", "details", "information"}
+
+
+class Classification(NamedTuple):
+    """Schema chosen for a document and how it was chosen."""
+    schema_type: str
+    confidence: float
+    method: str
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z]+", text.lower())
+
+
+def schema_keywords(name: str, schema: Dict[str, Any]) -> List[str]:
+    """Collect keywords for a schema from built-in lists and its field names.
+    
+    Args:
+        name: Schema name
+        schema: JSON schema
+        
+    Returns:
+        Lower-case keywords and phrases
+    """
+    keywords = set(SCHEMA_KEYWORDS.get(name, []))
+    keywords.update(w for w in _words(name.replace("_", " ")) if w not in STOP_WORDS)
+    keywords.update(w for w in _words(schema.get("title", "")) if w not in STOP_WORDS)
+    
+    def collect(node: Any) -> None:
+        if not isinstance(node, dict):
+            return
+        for field, subschema in node.get("properties", {}).items():
+            keywords.update(w for w in _words(field.replace("_", " ")) if len(w) > 2 and w not in STOP_WORDS)
+            collect(subschema)
+        collect(node.get("items"))
+        
+    collect(schema)
+    return sorted(keywords)
+
+
+class SchemaClassifier:
+    """Pick the schema for a document before full extraction.
+    
+    Keyword features from the page's text layer are scored locally. When the
+    page has no text layer or no schema clearly wins, a single model call on
+    a low-resolution thumbnail decides instead.
+    """
+    
+    def __init__(
+        self,
+        schemas: Dict[str, Dict[str, Any]],
+        api_key: Optional[str] = None,
+        model: str = DEFAULT_CONFIG["model"],
+        min_confidence: float = 0.5
+    ):
+        """Initialize the classifier.
+        
+        Args:
+            schemas: Candidate schemas by name
+            api_key: Google API key for the model fallback (disabled if None)
+            model: Model used for the fallback
+            min_confidence: Keyword confidence needed to skip the fallback
+        """
+        if not schemas:
+            raise ValueError("At least one schema is required for classification")
+        self.schemas = schemas
+        self.api_key = api_key
+        self.model = model
+        self.min_confidence = min_confidence
+        self.keywords = {name: schema_keywords(name, schema) for name, schema in schemas.items()}
+        
+    def classify_text(self, text: str) -> Optional[Classification]:
+        """Classify a document from its text layer.
+        
+        Confidence is the winning schema's share of all keyword hits.
+        """
+        text = " ".join(_words(text))
+        if not text:
+            return None
+            
+        padded = f" {text} "
+        scores = {
+            name: sum(padded.count(f" {keyword} ") for keyword in keywords)
+            for name, keywords in self.keywords.items()
+        }
+        total = sum(scores.values())
+        if not total:
+            return None
+            
+        best = max(scores, key=scores.get)
+        return Classification(best, scores[best] / total, "keywords")
+        
+    def classify_image(self, image: bytes, mime_type: str = "image/png") -> Optional[Classification]:
+        """Classify a page image with a single low-cost model call."""
+        if not self.api_key:
+            return None
+            
+        from langchain_openai import ChatOpenAI
+        from langchain_core.messages import HumanMessage
+        
+        names = sorted(self.schemas)
+        classifier = ChatOpenAI(
+            base_url=DEFAULT_CONFIG["api_base_url"],
+            api_key=self.api_key,
+            model=self.model,
+            temperature=0,
+        ).with_structured_output({
+            "title": "Document_Type",
+            "description": "Type of the document in the image",
+            "type": "object",
+            "properties": {"schema_type": {"type": "string", "enum": names}},
+            "required": ["schema_type"],
+        })
+        descriptions = "; ".join(
+            f"{name}: {self.schemas[name].get('title', name)}" for name in names
+        )
+        message = HumanMessage(
+            content=[
+                {"type": "text", "text": f"Which type is this document? Options: {descriptions}"},
+                {"type": "image_url", "image_url": {"url": to_data_url(image, mime_type)}},
+            ],
+        )
+        result = classifier.invoke([message])
+        schema_type = result.get("schema_type") if isinstance(result, dict) else None
+        if schema_type not in self.schemas:
+            return None
+        return Classification(schema_type, 1.0, "model")
+        
+    def classify_document(self, document_path: str) -> Optional[Classification]:
+        """Classify a document from its first page.
+        
+        Args:
+            document_path: Path to the document
+            
+        Returns:
+            The chosen schema, or None if neither stage could decide
+        """
+        keyword_result = self.classify_text(extract_text(document_path, 1))
+        if keyword_result and keyword_result.confidence >= self.min_confidence:
+            return keyword_result
+            
+        model_result = self.classify_image(render_thumbnail(document_path, 1))
+        return model_result or keyword_result
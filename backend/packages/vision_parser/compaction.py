@@ -0,0 +1,156 @@
+import json
+import re
+from typing import Dict, Any, Optional, List
+
+# Keywords that only document a schema for humans; the model does not need
+# them to produce conforming output.
+ANNOTATION_KEYWORDS = ("description", "examples", "$comment", "title")
+
+# Descriptions carrying a format hint or example values shape the output
+# (date formats, currency codes, allowed words), so they are always kept
+FORMAT_HINT_RE = re.compile(r"e\.g\.|i\.e\.|for example|such as|format|\betc\b|'[^']+'", re.IGNORECASE)
+
+# Rough number of characters per token for JSON and English prompt text
+CHARS_PER_TOKEN = 4
+
+
+def _minify_node(node: Any, keep_descriptions: bool) -> Any:
+    """Recursively copy a schema node without annotation keywords."""
+    if isinstance(node, list):
+        return [_minify_node(item, keep_descriptions) for item in node]
+    if not isinstance(node, dict):
+        return node
+        
+    minified = {}
+    for key, value in node.items():
+        if key in ANNOTATION_KEYWORDS and not (key == "description" and _keep_description(value, keep_descriptions)):
+            continue
+        if key == "enum" and isinstance(value, list):
+            minified[key] = _dedupe_enum(value)
+        elif key in ("properties", "$defs", "definitions") and isinstance(value, dict):
+            # Keys here are field and definition names, not keywords
+            minified[key] = {
+                name: _minify_node(subschema, keep_descriptions)
+                for name, subschema in value.items()
+            }
+        else:
+            minified[key] = _minify_node(value, keep_descriptions)
+    return minified
+
+
+def _keep_description(value: Any, keep_descriptions: bool) -> bool:
+    """Whether a nested description survives minification."""
+    return keep_descriptions or (isinstance(value, str) and bool(FORMAT_HINT_RE.search(value)))
+
+
+def _dedupe_enum(values: List[Any]) -> List[Any]:
+    """Drop duplicate enum values; the values themselves are left as they are."""
+    deduped = []
+    for value in values:
+        if value not in deduped:
+            deduped.append(value)
+    return deduped
+
+
+def _dedupe_defs(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Collapse structurally identical definitions and rewrite their refs."""
+    for defs_key in ("$defs", "definitions"):
+        definitions = schema.get(defs_key)
+        if not isinstance(definitions, dict):
+            continue
+            
+        canonical = {}
+        replacements = {}
+        for name, definition in definitions.items():
+            fingerprint = json.dumps(definition, sort_keys=True)
+            if fingerprint in canonical:
+                replacements[f"#/{defs_key}/{name}"] = f"#/{defs_key}/{canonical[fingerprint]}"
+            else:
+                canonical[fingerprint] = name
+                
+        if not replacements:
+            continue
+            
+        schema[defs_key] = {
+            name: definition for name, definition in definitions.items()
+            if f"#/{defs_key}/{name}" not in replacements
+        }
+        schema = _rewrite_refs(schema, replacements)
+    return schema
+
+
+def _rewrite_refs(node: Any, replacements: Dict[str, str]) -> Any:
+    """Point $ref entries at their canonical definition."""
+    if isinstance(node, list):
+        return [_rewrite_refs(item, replacements) for item in node]
+    if not isinstance(node, dict):
+        return node
+    return {
+        key: replacements.get(value, value) if key == "$ref" else _rewrite_refs(value, replacements)
+        for key, value in node.items()
+    }
+
+
+def minify_schema(schema: Dict[str, Any], keep_descriptions: bool = False) -> Dict[str, Any]:
+    """Reduce a JSON schema to what the model needs to produce conforming output.
+    
+    Nested titles, examples, comments and plain descriptions are stripped,
+    duplicate enum values are dropped, and identical ``$defs`` entries are
+    merged. Descriptions with format hints or examples (``e.g. '2023-05-15'``)
+    are kept, since they shape the values the model writes. The root title and description are kept because they name and
+    describe the extraction tool.
+    
+    Args:
+        schema: JSON schema to minify
+        keep_descriptions: Keep nested field descriptions
+        
+    Returns:
+        A minified copy of the schema
+    """
+    minified = _minify_node(schema, keep_descriptions)
+    for key in ("title", "description"):
+        if key in schema:
+            minified[key] = schema[key]
+    return _dedupe_defs(minified)
+
+
+def estimate_tokens(value: Any) -> int:
+    """Estimate the number of input tokens for a prompt or schema.
+    
+    Args:
+        value: Prompt text or a JSON-serializable schema
+        
+    Returns:
+        Approximate token count
+    """
+    if not isinstance(value, str):
+        value = json.dumps(value, separators=(",", ":"))
+    return -(-len(value) // CHARS_PER_TOKEN)
+
+
+def compaction_stats(
+    schema: Dict[str, Any],
+    prompt: Optional[str] = None,
+    compact_prompt: Optional[str] = None,
+    keep_descriptions: bool = False
+) -> Dict[str, Any]:
+    """Measure the input tokens saved by compacting a schema and prompt.
+    
+    Args:
+        schema: Original JSON schema
+        prompt: Original prompt (optional)
+        compact_prompt: Prompt used with the compacted schema (optional)
+        keep_descriptions: Keep nested field descriptions when minifying
+        
+    Returns:
+        Token estimates before and after compaction and the relative saving
+    """
+    before = estimate_tokens(schema) + (estimate_tokens(prompt) if prompt else 0)
+    after = estimate_tokens(minify_schema(schema, keep_descriptions))
+    after += estimate_tokens(compact_prompt or prompt) if (compact_prompt or prompt) else 0
+    return {
+        "tokens_before": before,
+        "tokens_after": after,
+        "tokens_saved": before - after,
+        "saved_ratio": (before - after) / before if before else 0.0,
+    }
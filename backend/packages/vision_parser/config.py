@@ -7,6 +7,9 @@ DEFAULT_CONFIG = {
     "temperature": 0,
     "default_schema": "resume",
     "api_base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
+    # Cheapest model first; later tiers are only used when output scores low
+    "model_tiers": ["gemini-2.0-flash-lite", "gemini-2.0-flash"],
+    "escalation_threshold": 0.8,
 }
 
 # Default prompts for different document types
@@ -17,6 +20,23 @@ DEFAULT_PROMPTS = {
     "id_card": "You are an AI document extraction specialist. Extract all information from this ID card including name, ID number, date of birth, and other visible fields.",
 }
 
+# Short prompts used with compacted schemas; the schema itself names the fields
+COMPACT_PROMPTS = {
+    "default": "Extract the {title} fields from this image.",
+    "resume": "Extract the resume fields from this image.",
+    "invoice": "Extract the invoice fields, line items and totals from this image.",
+    "receipt": "Extract the receipt fields, items and total from this image.",
+    "id_card": "Extract the ID card fields from this image.",
+}
+
+# Keywords that identify the built-in document types in a page's text layer
+SCHEMA_KEYWORDS = {
+    "resume": ["resume", "curriculum vitae", "cv", "experience", "education", "skills", "employment", "languages", "certifications"],
+    "invoice": ["invoice", "bill to", "due date", "invoice number", "subtotal", "vat", "tax", "amount due", "payment terms"],
+    "receipt": ["receipt", "cashier", "change", "thank you", "store", "total", "paid", "card", "qty"],
+    "id_card": ["identity", "id card", "date of birth", "nationality", "expiry", "sex", "document no", "place of birth"],
+}
+
 def get_api_key() -> str:
     """Get the API key from environment variables."""
     api_key = os.environ.get("GOOGLE_API_KEY")
@@ -2,10 +2,14 @@ import json
 import os
 from typing import Dict, Any, Optional, Union
 
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+from .stages import stage
+from .utils import get_document_bytes, to_data_url
 
-from .utils import get_document_as_base64
+# Prompt used when neither the caller nor the service supplies one
+DEFAULT_PROMPT = "You are an AI document extraction specialist. You have been asked to extract structured information from this image"
+
+# Gemini's OpenAI-compatible endpoint, used for both interactive and batch calls
+OPENAI_COMPAT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
 
 
 class DocumentParser:
@@ -44,9 +48,12 @@ class DocumentParser:
         self.model = model
         self.temperature = temperature
         
-        # Initialize parser model
+        # Initialize parser model; langchain is imported here rather than at
+        # module load so importing the package stays cheap
+        from langchain_openai import ChatOpenAI
+        
         self.parsing_model = ChatOpenAI(
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+            base_url=OPENAI_COMPAT_BASE_URL,
             api_key=self.api_key,
             model=self.model,
             temperature=self.temperature,
@@ -56,7 +63,7 @@ class DocumentParser:
         self, 
         document_path: str, 
         page_number: int = 1,
-        prompt: str = "You are an AI document extraction specialist. You have been asked to extract structured information from this image"
+        prompt: str = DEFAULT_PROMPT
     ) -> Dict[str, Any]:
         """Parse a document into structured data.
         
@@ -68,24 +75,31 @@ class DocumentParser:
         Returns:
             Structured data based on the schema
         """
-        base64_image = get_document_as_base64(document_path, page_number)
+        image, mime_type = get_document_bytes(document_path, page_number)
+        return self.parse_bytes(image, mime_type, prompt)
         
-        message = HumanMessage(
-            content=[
-                {"type": "text", "text": prompt},
-                {
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
-                },
-            ],
-        )
+    def parse_bytes(
+        self,
+        image: Union[bytes, memoryview],
+        mime_type: str = "image/png",
+        prompt: str = DEFAULT_PROMPT
+    ) -> Dict[str, Any]:
+        """Parse raw image bytes into structured data.
         
-        return self.parsing_model.invoke([message])
+        Args:
+            image: Raw image bytes
+            mime_type: MIME type of the image
+            prompt: Text prompt to guide the extraction
+            
+        Returns:
+            Structured data based on the schema
+        """
+        return self._invoke(to_data_url(image, mime_type), prompt)
         
     def parse_base64(
         self, 
         base64_image: str,
-        prompt: str = "You are an AI document extraction specialist. You have been asked to extract structured information from this image"
+        prompt: str = DEFAULT_PROMPT
     ) -> Dict[str, Any]:
         """Parse a base64-encoded image into structured data.
         
@@ -96,14 +110,53 @@ class DocumentParser:
         Returns:
             Structured data based on the schema
         """
+        return self._invoke(f"data:image/jpeg;base64,{base64_image}", prompt)
+        
+    def batch_request(
+        self,
+        custom_id: str,
+        image: Union[bytes, memoryview],
+        mime_type: str = "image/png",
+        prompt: str = DEFAULT_PROMPT
+    ) -> Dict[str, Any]:
+        """Build the batch-file line for parsing raw image bytes.
+        
+        The request carries the same prompt, image, model and schema that
+        ``parse_bytes`` sends, in the OpenAI batch JSONL format.
+        
+        Args:
+            custom_id: Identifier echoed back with the result
+            image: Raw image bytes
+            mime_type: MIME type of the image
+            prompt: Text prompt to guide the extraction
+            
+        Returns:
+            One batch input line as a dictionary
+        """
+        from .batch import chat_request
+        
+        return chat_request(
+            custom_id,
+            to_data_url(image, mime_type),
+            prompt,
+            self.json_schema,
+            self.model,
+            self.temperature
+        )
+        
+    def _invoke(self, image_url: str, prompt: str) -> Dict[str, Any]:
+        """Send the prompt and image URL to the model."""
+        from langchain_core.messages import HumanMessage
+        
         message = HumanMessage(
             content=[
                 {"type": "text", "text": prompt},
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
+                    "image_url": {"url": image_url},
                 },
             ],
         )
         
-        return self.parsing_model.invoke([message])
+        with stage("model"):
+            return self.parsing_model.invoke([message])
@@ -0,0 +1,107 @@
+import io
+import threading
+from typing import Any, Optional, List, Tuple, Iterable
+
+# Size of the grayscale grid compared by the difference hash
+HASH_SIZE = 8
+
+
+def dhash(image: bytes, hash_size: int = HASH_SIZE) -> int:
+    """Compute the difference hash of an image.
+    
+    The image is normalized to a small grayscale grid, and each bit records
+    whether a pixel is brighter than its right-hand neighbour. Rescans and
+    photos of the same page land within a few bits of each other.
+    
+    Args:
+        image: Encoded image bytes (PNG, JPEG, ...)
+        hash_size: Grid size; the hash has ``hash_size ** 2`` bits
+        
+    Returns:
+        The hash as an unsigned integer
+    """
+    from PIL import Image
+    
+    img = Image.open(io.BytesIO(image)).convert("L")
+    img = img.resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(img.getdata())
+    
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """BK-tree over perceptual hashes for sublinear near-neighbour lookup.
+    
+    Each child edge is labelled with its Hamming distance to the parent, so
+    a query only descends into edges within ``max_distance`` of its own
+    distance to the node (triangle inequality).
+    """
+    
+    def __init__(self, items: Iterable[Tuple[int, Any]] = ()):
+        """Initialize the tree.
+        
+        Args:
+            items: Initial (hash, value) pairs
+        """
+        self._root: Optional[List[Any]] = None  # [hash, values, {distance: child}]
+        self._lock = threading.Lock()
+        self._size = 0
+        for hash_value, value in items:
+            self.add(hash_value, value)
+            
+    def __len__(self) -> int:
+        return self._size
+        
+    def add(self, hash_value: int, value: Any) -> None:
+        """Insert a value under its hash."""
+        with self._lock:
+            self._size += 1
+            if self._root is None:
+                self._root = [hash_value, [value], {}]
+                return
+                
+            node = self._root
+            while True:
+                distance = hamming_distance(hash_value, node[0])
+                if distance == 0:
+                    node[1].append(value)
+                    return
+                child = node[2].get(distance)
+                if child is None:
+                    node[2][distance] = [hash_value, [value], {}]
+                    return
+                node = child
+                
+    def search(self, hash_value: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """Find values whose hash is within ``max_distance`` bits.
+        
+        Returns:
+            (distance, value) pairs sorted by increasing distance
+        """
+        with self._lock:
+            if self._root is None:
+                return []
+                
+            matches = []
+            stack = [self._root]
+            while stack:
+                node = stack.pop()
+                distance = hamming_distance(hash_value, node[0])
+                if distance <= max_distance:
+                    matches.extend((distance, value) for value in node[1])
+                for edge, child in node[2].items():
+                    if distance - max_distance <= edge <= distance + max_distance:
+                        stack.append(child)
+                        
+        matches.sort(key=lambda match: match[0])
+        return matches
@@ -0,0 +1,124 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .routing import score_result
+
+logger = logging.getLogger(__name__)
+
+# Render resolutions tried when none are given, lowest first
+DEFAULT_DPIS = [72, 144, 216]
+
+Render = Callable[[int], Tuple[Union[bytes, memoryview], str]]
+Call = Callable[[Union[bytes, memoryview], str], Dict[str, Any]]
+
+
+class ResolutionLadder:
+    """Low-resolution-first rendering with escalation on failed output.
+    
+    A page is rendered at the lowest DPI and parsed. The output is checked
+    against the schema, and the page is only re-rendered at the next DPI
+    when the output has validation errors or leaves required fields empty.
+    Simple pages stay small and cheap to send, while dense pages still get
+    the resolution they need. Per-DPI acceptance counts and payload sizes
+    are kept in process for tuning.
+    """
+    
+    def __init__(self, dpis: Optional[List[int]] = None, min_coverage: float = 1.0):
+        """Initialize the ladder.
+        
+        Args:
+            dpis: Render resolutions to try, lowest first
+            min_coverage: Share of required fields that must be filled for
+                an output to be accepted
+        """
+        self.dpis = sorted(dpis or DEFAULT_DPIS)
+        if self.dpis[0] <= 0:
+            raise ValueError("Render resolutions must be positive")
+        self.min_coverage = min_coverage
+        self._stats: Dict[Tuple[str, int], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+    
+    def accepts(self, scored: Dict[str, Any]) -> bool:
+        """Whether a scored output is good enough to stop escalating."""
+        return not scored["errors"] and scored["coverage"] >= self.min_coverage
+    
+    def run(
+        self,
+        schema_type: str,
+        schema: Dict[str, Any],
+        render: Render,
+        call: Call,
+        first: Optional[Tuple[Union[bytes, memoryview], str]] = None,
+        final_call: Optional[Call] = None
+    ) -> Tuple[Dict[str, Any], int]:
+        """Parse a page at increasing resolution until the output is accepted.
+        
+        A call that raises below the highest resolution counts as a rejected
+        output and the page is re-rendered; only a failure at the highest
+        resolution is raised.
+        
+        Args:
+            schema_type: Schema type, used for statistics
+            schema: JSON schema the output is checked against
+            render: Function taking a DPI and returning image bytes and MIME type
+            call: Function parsing image bytes and a MIME type into a result
+            first: Image bytes and MIME type already rendered at the lowest DPI
+            final_call: Function used instead of ``call`` at the highest DPI,
+                e.g. a more expensive one that is only worth it there
+        
+        Returns:
+            Tuple of the first accepted result (or the best-scoring one if no
+            resolution is accepted) and the DPI it was rendered at
+        """
+        best = None
+        for index, dpi in enumerate(self.dpis):
+            last = index == len(self.dpis) - 1
+            if index == 0 and first is not None:
+                image, mime_type = first
+            else:
+                image, mime_type = render(dpi)
+            try:
+                result = (final_call or call)(image, mime_type) if last else call(image, mime_type)
+            except Exception as e:
+                if last:
+                    raise
+                self._record(schema_type, dpi, len(image), False)
+                logger.warning(f"Re-rendering {schema_type} page above {dpi} DPI after a failed parse: {e}")
+                continue
+            scored = score_result(result, schema)
+            accepted = self.accepts(scored)
+            self._record(schema_type, dpi, len(image), accepted)
+            
+            # Ties go to the higher resolution
+            if best is None or scored["score"] >= best[2]:
+                best = (result, dpi, scored["score"])
+            if accepted:
+                return result, dpi
+            if not last:
+                logger.info(
+                    f"Re-rendering {schema_type} page above {dpi} DPI "
+                    f"(coverage {scored['coverage']:.2f}, {len(scored['errors'])} errors)"
+                )
+        return best[0], best[1]
+    
+    def _record(self, schema_type: str, dpi: int, size: int, accepted: bool) -> None:
+        with self._lock:
+            stats = self._stats.setdefault((schema_type, dpi), {"attempts": 0, "accepted": 0, "bytes": 0})
+            stats["attempts"] += 1
+            stats["bytes"] += size
+            if accepted:
+                stats["accepted"] += 1
+    
+    def stats(self) -> Dict[str, Dict[int, Dict[str, Any]]]:
+        """Get attempts, acceptances, hit rate and mean payload per schema and DPI."""
+        with self._lock:
+            report: Dict[str, Dict[int, Dict[str, Any]]] = {}
+            for (schema_type, dpi), stats in self._stats.items():
+                report.setdefault(schema_type, {})[dpi] = {
+                    "attempts": stats["attempts"],
+                    "accepted": stats["accepted"],
+                    "hit_rate": stats["accepted"] / stats["attempts"],
+                    "mean_bytes": stats["bytes"] / stats["attempts"],
+                }
+            return report
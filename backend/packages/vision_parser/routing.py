@@ -0,0 +1,238 @@
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# JSON schema type names mapped to the Python types that satisfy them
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def validate_result(result: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """Check a model result against the subset of JSON schema our schemas use.
+    
+    Covers ``type``, ``properties``, ``required``, ``items`` and ``enum``.
+    
+    Args:
+        result: Parsed output to check
+        schema: JSON schema the output should follow
+        path: Location of ``result`` in the document, used in messages
+        
+    Returns:
+        Validation error messages (empty when the result is valid)
+    """
+    errors = []
+    expected = schema.get("type")
+    if expected is None and "properties" in schema:
+        expected = "object"
+        
+    if expected:
+        expected_types = expected if isinstance(expected, list) else [expected]
+        python_types = []
+        for name in expected_types:
+            python_type = JSON_TYPES.get(name, object)
+            python_types.extend(python_type if isinstance(python_type, tuple) else (python_type,))
+        python_types = tuple(python_types)
+        if isinstance(result, bool) and bool not in python_types:
+            errors.append(f"{path}: expected {expected}, got boolean")
+            return errors
+        if not isinstance(result, python_types):
+            errors.append(f"{path}: expected {expected}, got {type(result).__name__}")
+            return errors
+            
+    if "enum" in schema and result not in schema["enum"]:
+        errors.append(f"{path}: {result!r} is not one of {schema['enum']}")
+        
+    if isinstance(result, dict):
+        for name in schema.get("required", []):
+            if name not in result:
+                errors.append(f"{path}.{name}: required field missing")
+        for name, subschema in schema.get("properties", {}).items():
+            if name in result and result[name] is not None:
+                errors.extend(validate_result(result[name], subschema, f"{path}.{name}"))
+    elif isinstance(result, list) and isinstance(schema.get("items"), dict):
+        for index, item in enumerate(result):
+            errors.extend(validate_result(item, schema["items"], f"{path}[{index}]"))
+            
+    return errors
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def required_coverage(result: Any, schema: Dict[str, Any]) -> Tuple[int, int]:
+    """Count required fields that are filled in, recursively.
+    
+    Returns:
+        Tuple of (filled required fields, total required fields)
+    """
+    filled = total = 0
+    if isinstance(result, dict):
+        for name in schema.get("required", []):
+            total += 1
+            if not _is_empty(result.get(name)):
+                filled += 1
+        for name, subschema in schema.get("properties", {}).items():
+            sub_filled, sub_total = required_coverage(result.get(name), subschema)
+            filled += sub_filled
+            total += sub_total
+    elif isinstance(result, list) and isinstance(schema.get("items"), dict):
+        for item in result:
+            sub_filled, sub_total = required_coverage(item, schema["items"])
+            filled += sub_filled
+            total += sub_total
+    return filled, total
+
+
+def score_result(
+    result: Any,
+    schema: Dict[str, Any],
+    confidence_field: Optional[str] = None
+) -> Dict[str, Any]:
+    """Score a model result on validity, required coverage and confidence.
+    
+    Args:
+        result: Parsed output to score
+        schema: JSON schema the output should follow
+        confidence_field: Optional top-level field holding per-field
+            confidence values between 0 and 1
+            
+    Returns:
+        Dictionary with ``errors``, ``coverage``, ``confidence`` and the
+        combined ``score`` between 0 and 1
+    """
+    errors = validate_result(result, schema)
+    filled, total = required_coverage(result, schema)
+    coverage = filled / total if total else 1.0
+    
+    confidence = None
+    if confidence_field and isinstance(result, dict):
+        values = result.get(confidence_field)
+        if isinstance(values, dict):
+            values = [v for v in values.values() if isinstance(v, (int, float))]
+            confidence = sum(values) / len(values) if values else None
+        elif isinstance(values, (int, float)):
+            confidence = float(values)
+            
+    score = coverage * (confidence if confidence is not None else 1.0)
+    if errors:
+        score *= 0.5
+    return {
+        "errors": errors,
+        "coverage": coverage,
+        "confidence": confidence,
+        "score": score,
+    }
+
+
+class ModelRouter:
+    """Cheap-model-first routing with score-based escalation.
+    
+    Each schema has an ordered list of model tiers. The first tier is tried
+    and its output scored; the next tier is only called when the score falls
+    below the threshold. Tier hit rates are kept in process for tuning.
+    """
+    
+    def __init__(
+        self,
+        tiers: Dict[str, List[str]],
+        threshold: float = 0.8,
+        confidence_field: Optional[str] = None
+    ):
+        """Initialize the router.
+        
+        Args:
+            tiers: Ordered model names per schema type; the ``default`` entry
+                applies to schemas without their own policy
+            threshold: Minimum score for a tier's output to be accepted
+            confidence_field: Optional result field holding per-field confidence
+        """
+        if "default" not in tiers:
+            raise ValueError("Routing tiers must include a 'default' policy")
+        empty = [schema_type for schema_type, models in tiers.items() if not models]
+        if empty:
+            raise ValueError(f"Routing tiers must list at least one model: {', '.join(empty)}")
+        self.tiers = tiers
+        self.threshold = threshold
+        self.confidence_field = confidence_field
+        self._stats: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        
+    def get_tiers(self, schema_type: str) -> List[str]:
+        """Get the ordered model tiers for a schema type."""
+        return self.tiers.get(schema_type, self.tiers["default"])
+        
+    def route(
+        self,
+        schema_type: str,
+        schema: Dict[str, Any],
+        call: Callable[[str], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Run ``call`` on each tier until one produces an acceptable result.
+        
+        Args:
+            schema_type: Schema type, used to pick the tier policy
+            schema: JSON schema used to score results
+            call: Function taking a model name and returning its result
+            
+        Returns:
+            The first accepted result, or the best-scoring one if no tier
+            reaches the threshold
+            
+        Raises:
+            The last tier's exception if every tier failed with an error
+        """
+        tiers = self.get_tiers(schema_type)
+        best = None
+        error = None
+        for index, model in enumerate(tiers):
+            try:
+                result = call(model)
+            except Exception as e:
+                # Rate limits and malformed output escalate like a low score
+                self._record(schema_type, model, False)
+                logger.warning(f"{model} failed on {schema_type} parse: {e}")
+                error = e
+                continue
+            scored = score_result(result, schema, self.confidence_field)
+            self._record(schema_type, model, scored["score"] >= self.threshold)
+            
+            if best is None or scored["score"] > best[1]:
+                best = (result, scored["score"])
+            if scored["score"] >= self.threshold:
+                return result
+            if index < len(tiers) - 1:
+                logger.info(
+                    f"Escalating {schema_type} parse from {model} "
+                    f"(score {scored['score']:.2f}, {len(scored['errors'])} errors)"
+                )
+        if best is None:
+            raise error
+        return best[0]
+        
+    def _record(self, schema_type: str, model: str, accepted: bool) -> None:
+        with self._lock:
+            stats = self._stats.setdefault((schema_type, model), {"attempts": 0, "accepted": 0})
+            stats["attempts"] += 1
+            if accepted:
+                stats["accepted"] += 1
+                
+    def stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Get attempts, acceptances and hit rate per schema and model tier."""
+        with self._lock:
+            report: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (schema_type, model), stats in self._stats.items():
+                report.setdefault(schema_type, {})[model] = {
+                    **stats,
+                    "hit_rate": stats["accepted"] / stats["attempts"],
+                }
+            return report
@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Hashable, Iterator, Optional
+
+# Priority classes from most to least latency-sensitive, with their default
+# share of model capacity when all of them have work queued
+DEFAULT_WEIGHTS = {"interactive": 8, "bulk": 2, "backfill": 1}
+
+# Latency samples kept per class for percentiles
+LATENCY_WINDOW = 1000
+
+
+class AdmissionError(Exception):
+    """A parse was refused because its class queue is full or it waited too long."""
+    
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ("priority", "tenant", "enqueued_at", "granted")
+    
+    def __init__(self, priority: str, tenant: Hashable):
+        self.priority = priority
+        self.tenant = tenant
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+def _percentile(samples: Deque[float], fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class FairScheduler:
+    """Admission and ordering of model calls across priority classes and tenants.
+    
+    At most ``capacity`` calls run at once. When a slot frees up, classes
+    with queued work share it by weighted fair queuing (a class gets slots
+    in proportion to its weight, so bulk work still progresses under
+    interactive load), and tenants within a class take turns, so one
+    tenant's backlog cannot starve another's.
+    """
+    
+    def __init__(
+        self,
+        capacity: int,
+        weights: Optional[Dict[str, float]] = None,
+        queue_limits: Optional[Dict[str, int]] = None,
+        timeouts: Optional[Dict[str, float]] = None
+    ):
+        """Initialize the scheduler.
+        
+        Args:
+            capacity: Maximum concurrent model calls
+            weights: Relative share of capacity per priority class
+            queue_limits: Maximum queued calls per class; further calls are
+                refused with AdmissionError
+            timeouts: Longest queue wait per class in seconds before a call
+                is refused
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.queue_limits = queue_limits or {}
+        self.timeouts = timeouts or {}
+        
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        # Per class: tenant -> queued tickets, in round-robin order
+        self._queues = {name: OrderedDict() for name in self.weights}
+        self._queued = {name: 0 for name in self.weights}
+        # Slots granted per class divided by its weight (weighted fair queuing)
+        self._virtual = {name: 0.0 for name in self.weights}
+        self._waits = {name: deque(maxlen=LATENCY_WINDOW) for name in self.weights}
+        self._latencies = {name: deque(maxlen=LATENCY_WINDOW) for name in self.weights}
+        self._counts = {name: {"admitted": 0, "rejected": 0, "timed_out": 0} for name in self.weights}
+    
+    @contextmanager
+    def slot(self, priority: str, tenant: Hashable = None) -> Iterator[None]:
+        """Wait for a model-call slot and hold it for the block.
+        
+        Args:
+            priority: Priority class name
+            tenant: Key that fair sharing within the class is based on
+                (usually the user id)
+        
+        Raises:
+            AdmissionError: The class queue is full or the wait timed out
+        """
+        if priority not in self.weights:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        
+        ticket = self._enqueue(priority, tenant)
+        self._wait(ticket)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._latencies[priority].append(time.monotonic() - ticket.enqueued_at)
+                self._dispatch()
+    
+    def _enqueue(self, priority: str, tenant: Hashable) -> _Ticket:
+        ticket = _Ticket(priority, tenant)
+        with self._condition:
+            limit = self.queue_limits.get(priority)
+            if limit is not None and self._queued[priority] >= limit:
+                self._counts[priority]["rejected"] += 1
+                raise AdmissionError(
+                    f"Too many queued {priority} parses",
+                    retry_after=self._retry_after(priority)
+                )
+            
+            if not self._queued[priority]:
+                # A class that was idle must not bank credit for that time
+                active = [self._virtual[name] for name in self.weights if self._queued[name]]
+                if active:
+                    self._virtual[priority] = max(self._virtual[priority], min(active))
+            
+            self._queues[priority].setdefault(tenant, deque()).append(ticket)
+            self._queued[priority] += 1
+            self._dispatch()
+        return ticket
+    
+    def _wait(self, ticket: _Ticket) -> None:
+        timeout = self.timeouts.get(ticket.priority)
+        deadline = ticket.enqueued_at + timeout if timeout else None
+        with self._condition:
+            while not ticket.granted:
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    self._remove(ticket)
+                    self._counts[ticket.priority]["timed_out"] += 1
+                    raise AdmissionError(
+                        f"Timed out waiting for a {ticket.priority} parse slot",
+                        retry_after=self._retry_after(ticket.priority)
+                    )
+                self._condition.wait(remaining)
+            self._waits[ticket.priority].append(time.monotonic() - ticket.enqueued_at)
+            self._counts[ticket.priority]["admitted"] += 1
+    
+    def _remove(self, ticket: _Ticket) -> None:
+        tickets = self._queues[ticket.priority].get(ticket.tenant)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            self._queued[ticket.priority] -= 1
+            if not tickets:
+                del self._queues[ticket.priority][ticket.tenant]
+    
+    def _dispatch(self) -> None:
+        """Grant free slots to queued tickets. Caller holds the condition."""
+        granted = False
+        while self._in_flight < self.capacity:
+            waiting = [name for name in self.weights if self._queued[name]]
+            if not waiting:
+                break
+            priority = min(waiting, key=lambda name: self._virtual[name])
+            
+            # Round-robin between tenants: serve the first, then move it last
+            tenants = self._queues[priority]
+            tenant, tickets = next(iter(tenants.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                tenants.move_to_end(tenant)
+            else:
+                del tenants[tenant]
+            self._queued[priority] -= 1
+            
+            ticket.granted = True
+            self._in_flight += 1
+            self._virtual[priority] += 1 / self.weights[priority]
+            granted = True
+        if granted:
+            self._condition.notify_all()
+    
+    def _retry_after(self, priority: str) -> int:
+        """Rough seconds until a queued call of this class would run."""
+        latency = _percentile(self._latencies[priority], 0.5) or 1.0
+        return max(1, int(latency * self._queued[priority] / self.capacity))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, counts and wait/latency percentiles per class.
+        
+        Returns:
+            Dictionary with capacity, in_flight and per-class statistics
+        """
+        with self._condition:
+            classes = {}
+            for name in self.weights:
+                classes[name] = {
+                    "weight": self.weights[name],
+                    "queued": self._queued[name],
+                    **self._counts[name],
+                    "wait_p50": _percentile(self._waits[name], 0.5),
+                    "wait_p95": _percentile(self._waits[name], 0.95),
+                    "latency_p50": _percentile(self._latencies[name], 0.5),
+                    "latency_p95": _percentile(self._latencies[name], 0.95),
+                }
+            return {
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "classes": classes,
+            }
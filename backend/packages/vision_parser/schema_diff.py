@@ -0,0 +1,80 @@
+import json
+from typing import Dict, Any, List, Optional
+
+
+def changed_fields(old_schema: Optional[Dict[str, Any]], new_schema: Dict[str, Any]) -> List[str]:
+    """List top-level fields that were added or changed between two schemas.
+    
+    Args:
+        old_schema: Schema that produced the existing result (None if unknown)
+        new_schema: Current schema
+        
+    Returns:
+        Names of fields to re-extract; every field when the old schema is unknown
+    """
+    new_properties = new_schema.get("properties", {})
+    if old_schema is None:
+        return list(new_properties)
+        
+    old_properties = old_schema.get("properties", {})
+    old_required = set(old_schema.get("required", []))
+    new_required = set(new_schema.get("required", []))
+    return [
+        name for name, subschema in new_properties.items()
+        if name not in old_properties
+        or json.dumps(subschema, sort_keys=True) != json.dumps(old_properties[name], sort_keys=True)
+        or (name in new_required) != (name in old_required)
+    ]
+
+
+def removed_fields(old_schema: Optional[Dict[str, Any]], new_schema: Dict[str, Any]) -> List[str]:
+    """List top-level fields present in the old schema but not the new one."""
+    if old_schema is None:
+        return []
+    new_properties = new_schema.get("properties", {})
+    return [name for name in old_schema.get("properties", {}) if name not in new_properties]
+
+
+def subset_schema(schema: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Build a schema that only asks for the given top-level fields.
+    
+    Args:
+        schema: Full schema
+        fields: Top-level property names to keep
+        
+    Returns:
+        Copy of the schema restricted to ``fields``
+    """
+    properties = schema.get("properties", {})
+    subset = {key: value for key, value in schema.items() if key not in ("properties", "required")}
+    subset["properties"] = {name: properties[name] for name in fields if name in properties}
+    required = [name for name in schema.get("required", []) if name in subset["properties"]]
+    if required:
+        subset["required"] = required
+    return subset
+
+
+def merge_fields(
+    result: Dict[str, Any],
+    partial: Dict[str, Any],
+    fields: List[str],
+    dropped: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Merge re-extracted fields into an existing result.
+    
+    Args:
+        result: Existing result
+        partial: Result of extracting only ``fields``
+        fields: Fields that were re-extracted
+        dropped: Fields no longer in the schema, removed from the result
+        
+    Returns:
+        The merged result (a new dictionary)
+    """
+    merged = {key: value for key, value in result.items() if key not in (dropped or [])}
+    for name in fields:
+        if name in partial:
+            merged[name] = partial[name]
+        else:
+            merged.pop(name, None)
+    return merged
@@ -1,9 +1,14 @@
 import os
 import json
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
 
+from .compaction import minify_schema
+from .config import COMPACT_PROMPTS
 from .parser import DocumentParser
-from .utils import get_document_as_base64
+from .resolution import ResolutionLadder
+from .routing import ModelRouter
+from .schema_diff import subset_schema
+from .utils import DEFAULT_DPI, get_document_bytes, is_pdf
 
 
 class ParserService:
@@ -15,7 +20,11 @@ class ParserService:
         schema_dir: Optional[str] = None,
         schemas: Optional[Dict[str, Dict[str, Any]]] = None,
         default_schema: str = "resume",
-        model: str = "gemini-2.0-flash"
+        model: str = "gemini-2.0-flash",
+        compact: bool = False,
+        prompts: Optional[Dict[str, str]] = None,
+        router: Optional[ModelRouter] = None,
+        resolution: Optional[ResolutionLadder] = None
     ):
         """Initialize the parser service.
         
@@ -25,6 +34,14 @@ class ParserService:
             schemas: Direct schema dictionaries (alternative to schema_dir)
             default_schema: Default schema type to use
             model: Model to use for parsing
+            compact: Send minified schemas and short prompts to cut input tokens
+            prompts: Per-schema prompt templates; ``{title}`` is replaced with
+                the schema title
+            router: Tiered model routing policy; when set, ``model`` is
+                ignored for document and byte parsing
+            resolution: Progressive render resolutions for PDF pages; when
+                set, ``parse_page`` starts at the lowest DPI and re-renders
+                only pages whose output fails validation
         """
         self.api_key = api_key or os.environ.get("GOOGLE_API_KEY")
         
@@ -46,21 +63,44 @@ class ParserService:
             raise ValueError(f"Default schema '{default_schema}' not found in available schemas")
             
         self.model = model
+        self.compact = compact
+        self.prompts = prompts or {}
+        self.router = router
+        self.resolution = resolution
         self.parsers = {}
         
-    def _get_parser(self, schema_type: str) -> DocumentParser:
-        """Get or create a parser for the given schema type."""
+    def _get_parser(self, schema_type: str, model: Optional[str] = None) -> DocumentParser:
+        """Get or create a parser for the given schema type and model."""
         if schema_type not in self.schemas:
             raise ValueError(f"Schema '{schema_type}' not found in available schemas")
             
-        if schema_type not in self.parsers:
-            self.parsers[schema_type] = DocumentParser(
+        model = model or self.model
+        key = (schema_type, model)
+        if key not in self.parsers:
+            schema = self.schemas[schema_type]
+            if self.compact:
+                schema = minify_schema(schema)
+            self.parsers[key] = DocumentParser(
                 api_key=self.api_key,
-                schema=self.schemas[schema_type],
-                model=self.model
+                schema=schema,
+                model=model
             )
             
-        return self.parsers[schema_type]
+        return self.parsers[key]
+        
+    def get_prompt(self, schema_type: str) -> Optional[str]:
+        """Get the prompt template for a schema type, if one applies.
+        
+        Explicit per-schema templates take precedence; compact mode falls back
+        to the short built-in prompts. Returns None to use the parser default.
+        """
+        template = self.prompts.get(schema_type)
+        if template is None and self.compact:
+            template = COMPACT_PROMPTS.get(schema_type, COMPACT_PROMPTS["default"])
+        if template is None:
+            return None
+        title = self.schemas.get(schema_type, {}).get("title", schema_type)
+        return template.format(title=title)
         
     def parse_document(
         self, 
@@ -81,13 +121,111 @@ class ParserService:
             Structured data based on the schema
         """
         schema_type = schema_type or self.default_schema
+        if self.router is not None:
+            # Render once and reuse the page for every tier
+            image, mime_type = get_document_bytes(document_path, page_number)
+            return self.parse_bytes(image, mime_type, schema_type, prompt)
+            
         parser = self._get_parser(schema_type)
+        prompt = prompt or self.get_prompt(schema_type)
         
         if prompt:
             return parser.parse_document(document_path, page_number, prompt)
         else:
             return parser.parse_document(document_path, page_number)
             
+    def parse_page(
+        self,
+        document_path: str,
+        schema_type: Optional[str] = None,
+        page_number: int = 1,
+        prompt: Optional[str] = None,
+        first: Optional[Tuple[Union[bytes, memoryview], str]] = None
+    ) -> Tuple[Dict[str, Any], Optional[int]]:
+        """Parse a document page, re-rendering at higher DPI only on failure.
+        
+        Without a resolution ladder the page is parsed once at the default
+        resolution. Image files are always sent as stored. With a model
+        router as well, the lower resolutions are parsed by the cheapest tier
+        alone and only the highest resolution escalates through the tiers.
+        
+        Args:
+            document_path: Path to the document
+            schema_type: Schema type to use (default uses the default_schema)
+            page_number: Page number for PDFs
+            prompt: Custom prompt (optional)
+            first: Image bytes and MIME type already rendered at the first
+                (or, without a ladder, the default) resolution
+            
+        Returns:
+            Tuple of the structured data and the DPI of the render it came
+            from (None for image files)
+        """
+        schema_type = schema_type or self.default_schema
+        if schema_type not in self.schemas:
+            raise ValueError(f"Schema '{schema_type}' not found in available schemas")
+            
+        def render(dpi: int) -> Tuple[bytes, str]:
+            return get_document_bytes(document_path, page_number, dpi)
+            
+        def call(image: Union[bytes, memoryview], mime_type: str) -> Dict[str, Any]:
+            return self.parse_bytes(image, mime_type, schema_type, prompt)
+            
+        if self.resolution is None or not is_pdf(document_path):
+            image, mime_type = first or render(DEFAULT_DPI)
+            return call(image, mime_type), DEFAULT_DPI if is_pdf(document_path) else None
+        if self.router is None:
+            return self.resolution.run(schema_type, self.schemas[schema_type], render, call, first)
+            
+        # Raise the resolution on the cheapest tier first and only run the
+        # full tier chain at the highest resolution, rather than every tier
+        # at every resolution
+        cheapest = self.router.get_tiers(schema_type)[0]
+        cheapest_prompt = prompt or self.get_prompt(schema_type)
+        
+        def call_cheapest(image: Union[bytes, memoryview], mime_type: str) -> Dict[str, Any]:
+            parser = self._get_parser(schema_type, cheapest)
+            if cheapest_prompt:
+                return parser.parse_bytes(image, mime_type, cheapest_prompt)
+            else:
+                return parser.parse_bytes(image, mime_type)
+                
+        return self.resolution.run(
+            schema_type, self.schemas[schema_type], render, call_cheapest, first, final_call=call
+        )
+        
+    def parse_bytes(
+        self,
+        image: Union[bytes, memoryview],
+        mime_type: str = "image/png",
+        schema_type: Optional[str] = None,
+        prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Parse raw image bytes using the specified schema.
+        
+        Args:
+            image: Raw image bytes
+            mime_type: MIME type of the image
+            schema_type: Schema type to use (default uses the default_schema)
+            prompt: Custom prompt (optional)
+            
+        Returns:
+            Structured data based on the schema
+        """
+        schema_type = schema_type or self.default_schema
+        prompt = prompt or self.get_prompt(schema_type)
+        
+        def parse_with(model: str) -> Dict[str, Any]:
+            parser = self._get_parser(schema_type, model)
+            if prompt:
+                return parser.parse_bytes(image, mime_type, prompt)
+            else:
+                return parser.parse_bytes(image, mime_type)
+                
+        if self.router is not None:
+            return self.router.route(schema_type, self.schemas[schema_type], parse_with)
+        return parse_with(self.model)
+            
     def parse_base64(
         self, 
         base64_image: str,
@@ -106,12 +244,91 @@ class ParserService:
         """
         schema_type = schema_type or self.default_schema
         parser = self._get_parser(schema_type)
+        prompt = prompt or self.get_prompt(schema_type)
         
         if prompt:
             return parser.parse_base64(base64_image, prompt)
         else:
             return parser.parse_base64(base64_image)
             
+    def batch_request(
+        self,
+        document_path: str,
+        custom_id: str,
+        schema_type: Optional[str] = None,
+        page_number: int = 1,
+        prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build a batch-file line for one document page.
+        
+        Batch jobs run asynchronously, so there is no tier escalation: the
+        request always targets the service's ``model``.
+        
+        Args:
+            document_path: Path to the document
+            custom_id: Identifier echoed back with the result
+            schema_type: Schema type to use (default uses the default_schema)
+            page_number: Page number for PDFs
+            prompt: Custom prompt (optional)
+            
+        Returns:
+            One batch input line as a dictionary
+        """
+        schema_type = schema_type or self.default_schema
+        parser = self._get_parser(schema_type)
+        prompt = prompt or self.get_prompt(schema_type)
+        image, mime_type = get_document_bytes(document_path, page_number)
+        
+        if prompt:
+            return parser.batch_request(custom_id, image, mime_type, prompt)
+        else:
+            return parser.batch_request(custom_id, image, mime_type)
+            
+    def extract_fields(
+        self,
+        document_path: str,
+        fields: List[str],
+        schema_type: Optional[str] = None,
+        page_number: int = 1,
+        prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Extract only some top-level fields of a schema from a document.
+        
+        Used for incremental re-extraction after a schema change: the model
+        is asked for the added or changed fields only. Field subsets vary
+        from call to call, so their parsers are built per call rather than
+        cached on the service.
+        
+        Args:
+            document_path: Path to the document
+            fields: Top-level field names to extract
+            schema_type: Schema type to use (default uses the default_schema)
+            page_number: Page number for PDFs
+            prompt: Custom prompt (optional)
+            
+        Returns:
+            Structured data containing only the requested fields
+        """
+        schema_type = schema_type or self.default_schema
+        if schema_type not in self.schemas:
+            raise ValueError(f"Schema '{schema_type}' not found in available schemas")
+            
+        schema = subset_schema(self.schemas[schema_type], fields)
+        request_schema = minify_schema(schema) if self.compact else schema
+        prompt = prompt or self.get_prompt(schema_type)
+        image, mime_type = get_document_bytes(document_path, page_number)
+        
+        def parse_with(model: str) -> Dict[str, Any]:
+            parser = DocumentParser(api_key=self.api_key, schema=request_schema, model=model)
+            if prompt:
+                return parser.parse_bytes(image, mime_type, prompt)
+            else:
+                return parser.parse_bytes(image, mime_type)
+                
+        if self.router is not None:
+            return self.router.route(schema_type, schema, parse_with)
+        return parse_with(self.model)
+        
     def add_schema(self, name: str, schema: Dict[str, Any]) -> None:
         """Add a new schema to the available schemas.
         
@@ -120,6 +337,6 @@ class ParserService:
             schema: Schema definition as a dictionary
         """
         self.schemas[name] = schema
-        # Remove any existing parser for this schema to force recreation
-        if name in self.parsers:
-            del self.parsers[name]
+        # Remove any existing parsers for this schema to force recreation
+        for key in [key for key in self.parsers if key[0] == name]:
+            del self.parsers[key]
@@ -0,0 +1,44 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# Per-context stage timings; None (the default) makes ``stage`` a no-op
+_timings: ContextVar[Optional[Dict[str, Dict[str, float]]]] = ContextVar(
+    "vision_parser_stage_timings", default=None
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage (render, encode, model, ...) if recording is on.
+    
+    Args:
+        name: Stage name; repeated stages accumulate calls and seconds
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+        
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = timings.setdefault(name, {"calls": 0, "seconds": 0.0})
+        entry["calls"] += 1
+        entry["seconds"] += time.perf_counter() - start
+
+
+@contextmanager
+def record_stages() -> Iterator[Dict[str, Dict[str, float]]]:
+    """Record stage timings for the code run inside the block.
+    
+    Returns:
+        Dictionary filled with ``{stage: {"calls": n, "seconds": s}}``
+    """
+    token = _timings.set({})
+    try:
+        yield _timings.get()
+    finally:
+        _timings.reset(token)
@@ -1,37 +1,334 @@
+import atexit
 import base64
+import hashlib
 import io
+import logging
 import os
-from typing import Union, Optional
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Any, Dict, Union, Optional, Iterator, List, Tuple
 
-try:
+from .stages import stage
+
+if TYPE_CHECKING:
     import fitz
-except ImportError:
-    raise ImportError(
-        "PyMuPDF package is not installed. "
-        "Please install it using: pip install PyMuPDF"
-    )
-from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+# PyMuPDF and Pillow are imported on first use rather than at module load,
+# so importing this module (and everything that imports it) stays cheap.
+def _import_fitz():
+    """Import PyMuPDF on first use."""
+    try:
+        import fitz
+    except ImportError:
+        raise ImportError(
+            "PyMuPDF package is not installed. "
+            "Please install it using: pip install PyMuPDF"
+        )
+    return fitz
+
+
+def _import_image():
+    """Import Pillow's Image module on first use."""
+    from PIL import Image
+    return Image
+
+
+# Number of rasterization worker processes. Unset or 0 keeps rendering inline
+# in the calling process; "auto" sizes the pool to the number of cores. Each
+# server worker process gets its own pool, so size it with that in mind.
+RENDER_WORKERS_ENV = "VISION_PARSER_RENDER_WORKERS"
+
+# Documents each process keeps open between renders
+WARM_DOCUMENTS = 8
+
+# PDF pages are rendered at PyMuPDF's native resolution unless a DPI is given
+DEFAULT_DPI = 72
+
+
+def _render_pdf_page_png(pdf_document, page_number: int, dpi: int = DEFAULT_DPI) -> bytes:
+    """Render one page of an open PDF document to PNG bytes."""
+    page = pdf_document.load_page(page_number - 1)  # input is one-indexed
+    pix = page.get_pixmap(dpi=dpi)
+    img = _import_image().frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class DocumentPool:
+    """Bounded LRU pool of open PyMuPDF documents.
+    
+    Documents are keyed by absolute path and modification time, so a file
+    replaced on disk is reopened rather than served stale. Evicted documents
+    are closed explicitly instead of waiting for garbage collection. PyMuPDF
+    documents are not thread-safe, so access is serialized by the pool lock.
+    """
+    
+    def __init__(self, max_documents: int = 8):
+        """Initialize the document pool.
+        
+        Args:
+            max_documents: Maximum number of documents kept open
+        """
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[Tuple[str, float], fitz.Document]" = OrderedDict()
+        self._lock = threading.RLock()
+        
+    @contextmanager
+    def open(self, pdf_path: str) -> Iterator["fitz.Document"]:
+        """Borrow an open document for the duration of the ``with`` block.
+        
+        Args:
+            pdf_path: Path to the PDF file
+        """
+        pdf_path = os.path.abspath(pdf_path)
+        key = (pdf_path, os.path.getmtime(pdf_path))
+        
+        with self._lock:
+            pdf_document = self._documents.get(key)
+            if pdf_document is None:
+                # Drop handles to older versions of the same file
+                for stale_key in [k for k in self._documents if k[0] == pdf_path]:
+                    self._documents.pop(stale_key).close()
+                pdf_document = _import_fitz().open(pdf_path)
+                self._documents[key] = pdf_document
+                while len(self._documents) > self.max_documents:
+                    _, evicted = self._documents.popitem(last=False)
+                    evicted.close()
+            else:
+                self._documents.move_to_end(key)
+                
+            yield pdf_document
+            
+    def close_all(self) -> None:
+        """Close every pooled document."""
+        with self._lock:
+            while self._documents:
+                _, pdf_document = self._documents.popitem()
+                pdf_document.close()
+                
+    def _reset_after_fork(self) -> None:
+        """Forget documents inherited from the parent process."""
+        self._documents = OrderedDict()
+        self._lock = threading.RLock()
+
+
+# Per-process pool of open documents shared by inline rendering and workers
+_document_pool = DocumentPool(max_documents=WARM_DOCUMENTS)
+atexit.register(_document_pool.close_all)
+os.register_at_fork(after_in_child=_document_pool._reset_after_fork)
+
+
+def get_document_pool() -> DocumentPool:
+    """Get the process-wide pool of open PDF documents."""
+    return _document_pool
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    """Get the number of pages in a PDF file.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        
+    Returns:
+        Number of pages
+    """
+    with _document_pool.open(pdf_path) as pdf_document:
+        return len(pdf_document)
+
+
+def _render_to_shared_memory(pdf_path: str, page_number: int, dpi: int = DEFAULT_DPI) -> Tuple[str, int]:
+    """Worker entry point: render a page into a new shared-memory block.
+    
+    Returns:
+        Name and size of the shared-memory block holding the PNG bytes
+    """
+    with _document_pool.open(pdf_path) as pdf_document:
+        png = _render_pdf_page_png(pdf_document, page_number, dpi)
+    block = shared_memory.SharedMemory(create=True, size=max(len(png), 1))
+    block.buf[:len(png)] = png
+    block.close()
+    return block.name, len(png)
+
+
+def _collect_shared_memory(name: str, size: int) -> bytes:
+    """Copy a worker's result out of shared memory and release the block."""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(block.buf[:size])
+    finally:
+        block.close()
+        block.unlink()
+
+
+class RenderPool:
+    """Process pool that rasterizes PDF pages outside the calling process.
+    
+    Rendering and PNG encoding hold the GIL and allocate large buffers, so
+    they run in dedicated worker processes. Each worker keeps its recently
+    opened documents warm and hands results back through shared memory.
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None):
+        """Initialize the render pool.
+        
+        Args:
+            max_workers: Number of worker processes (defaults to core count)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        
+    def render_page(self, pdf_path: str, page_number: int = 1, dpi: int = DEFAULT_DPI) -> bytes:
+        """Render a single PDF page to PNG bytes in a worker process."""
+        return self.render_pages(pdf_path, [page_number], dpi)[0]
+        
+    def render_pages(self, pdf_path: str, page_numbers: List[int], dpi: int = DEFAULT_DPI) -> List[bytes]:
+        """Render several PDF pages to PNG bytes across the worker pool.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            page_numbers: Page numbers to render (1-indexed)
+            dpi: Render resolution
+            
+        Returns:
+            PNG bytes for each requested page, in the same order
+        """
+        pdf_path = os.path.abspath(pdf_path)
+        futures = [
+            self._executor.submit(_render_to_shared_memory, pdf_path, page_number, dpi)
+            for page_number in page_numbers
+        ]
+        results = []
+        try:
+            for future in futures:
+                name, size = future.result()
+                results.append(_collect_shared_memory(name, size))
+        except BaseException:
+            # Release the blocks of later pages that did render before
+            # re-raising; the failed page left no block behind
+            for future in futures[len(results) + 1:]:
+                if future.cancel():
+                    continue
+                try:
+                    name, size = future.result()
+                except BaseException:
+                    continue
+                _collect_shared_memory(name, size)
+            raise
+        return results
+        
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_render_pool: Optional[RenderPool] = None
+_render_pool_lock = threading.Lock()
+
+
+def _render_workers() -> int:
+    """Pool size from VISION_PARSER_RENDER_WORKERS; 0 renders inline."""
+    workers = os.environ.get(RENDER_WORKERS_ENV, "").strip().lower()
+    if not workers:
+        return 0
+    if workers == "auto":
+        return os.cpu_count() or 1
+    try:
+        return max(int(workers), 0)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {RENDER_WORKERS_ENV}={workers!r}; rendering inline")
+        return 0
+
+
+def get_render_pool() -> Optional[RenderPool]:
+    """Get the shared render pool, or None when rendering runs inline.
+    
+    The pool size is read from the VISION_PARSER_RENDER_WORKERS environment
+    variable; unset or 0 disables the pool.
+    """
+    global _render_pool
+    
+    workers = _render_workers()
+    if not workers:
+        return None
+        
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = RenderPool(max_workers=workers)
+            atexit.register(_render_pool.shutdown)
+        return _render_pool
+
+
+def render_pdf_page(pdf_path: str, page_number: int = 1, dpi: int = DEFAULT_DPI) -> bytes:
+    """Render a PDF page to PNG bytes, using the render pool when enabled.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        page_number: Page number to render (1-indexed)
+        dpi: Render resolution
+        
+    Returns:
+        PNG bytes of the rendered page
+    """
+    with stage("render"):
+        pool = get_render_pool()
+        if pool is not None:
+            return pool.render_page(pdf_path, page_number, dpi)
+            
+        with _document_pool.open(pdf_path) as pdf_document:
+            return _render_pdf_page_png(pdf_document, page_number, dpi)
+
+
+def render_pdf_pages(pdf_path: str, page_numbers: List[int], dpi: int = DEFAULT_DPI) -> List[bytes]:
+    """Render several PDF pages to PNG bytes, fanning out across the pool.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        page_numbers: Page numbers to render (1-indexed)
+        dpi: Render resolution
+        
+    Returns:
+        PNG bytes for each requested page, in the same order
+    """
+    pool = get_render_pool()
+    if pool is not None:
+        with stage("render"):
+            return pool.render_pages(pdf_path, page_numbers, dpi)
+        
+    return [render_pdf_page(pdf_path, page_number, dpi) for page_number in page_numbers]
 
 
-def pdf_page_to_base64(pdf_path: str, page_number: int = 1) -> str:
+def pdf_page_to_base64(pdf_path: str, page_number: int = 1, dpi: int = DEFAULT_DPI) -> str:
     """Convert a PDF page to a base64-encoded string.
     
     Args:
         pdf_path: Path to the PDF file
         page_number: Page number to convert (1-indexed)
+        dpi: Render resolution
         
     Returns:
         Base64-encoded string of the PDF page as PNG
     """
-    pdf_document = fitz.open(pdf_path)
-    page = pdf_document.load_page(page_number - 1)  # input is one-indexed
-    pix = page.get_pixmap()
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    png = render_pdf_page(pdf_path, page_number, dpi)
+    with stage("encode"):
+        return base64.b64encode(png).decode("utf-8")
 
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
 
-    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+# MIME types for the image formats accepted as documents
+IMAGE_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+}
 
 
 def image_to_base64(image_path: str) -> str:
@@ -44,7 +341,42 @@ def image_to_base64(image_path: str) -> str:
         Base64-encoded string of the image
     """
     with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+        data = image_file.read()
+    with stage("encode"):
+        return base64.b64encode(data).decode("utf-8")
+
+
+def is_pdf(document_path: str) -> bool:
+    """Whether a document is a PDF, which can be rendered at any resolution."""
+    return os.path.splitext(document_path.lower())[1] == '.pdf'
+
+
+def get_document_bytes(
+    document_path: str,
+    page_number: Optional[int] = 1,
+    dpi: int = DEFAULT_DPI
+) -> Tuple[bytes, str]:
+    """Get the raw image bytes of a document page.
+    
+    PDF pages are rendered to PNG; image files are returned as stored.
+    
+    Args:
+        document_path: Path to the document
+        page_number: Page number for PDFs (ignored for images)
+        dpi: Render resolution for PDFs (ignored for images)
+        
+    Returns:
+        Tuple of image bytes and their MIME type
+    """
+    _, ext = os.path.splitext(document_path.lower())
+    
+    if ext == '.pdf':
+        return render_pdf_page(document_path, page_number, dpi), 'image/png'
+    elif ext in IMAGE_MIME_TYPES:
+        with open(document_path, "rb") as image_file:
+            return image_file.read(), IMAGE_MIME_TYPES[ext]
+    else:
+        raise ValueError(f"Unsupported file format: {ext}")
 
 
 def get_document_as_base64(document_path: str, page_number: Optional[int] = 1) -> str:
@@ -57,11 +389,115 @@ def get_document_as_base64(document_path: str, page_number: Optional[int] = 1) -
     Returns:
         Base64-encoded string of the document
     """
+    data, _ = get_document_bytes(document_path, page_number)
+    return base64.b64encode(data).decode("utf-8")
+
+
+def to_data_url(data: Union[bytes, memoryview], mime_type: str = "image/png") -> str:
+    """Encode image bytes as a data URL for the model request.
+    
+    This is the single point where image data is base64-encoded on its way
+    to the HTTP client; everything upstream passes raw bytes.
+    
+    Args:
+        data: Raw image bytes
+        mime_type: MIME type of the image
+        
+    Returns:
+        ``data:`` URL embedding the base64-encoded image
+    """
+    with stage("encode"):
+        return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 hex digest of a file without loading it whole.
+    
+    Args:
+        path: Path to the file
+        chunk_size: Bytes read per iteration
+        
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_text(document_path: str, page_number: int = 1) -> str:
+    """Extract the text layer of a document page.
+    
+    Args:
+        document_path: Path to the document
+        page_number: Page number for PDFs (1-indexed)
+        
+    Returns:
+        Page text, or an empty string for images and scanned pages
+    """
+    _, ext = os.path.splitext(document_path.lower())
+    if ext != '.pdf':
+        return ""
+        
+    with _document_pool.open(document_path) as pdf_document:
+        if page_number > len(pdf_document):
+            return ""
+        return pdf_document.load_page(page_number - 1).get_text()
+
+
+def render_thumbnail(document_path: str, page_number: int = 1, max_size: int = 512) -> bytes:
+    """Render a small PNG thumbnail of a document page.
+    
+    Args:
+        document_path: Path to the document
+        page_number: Page number for PDFs (ignored for images)
+        max_size: Maximum width and height in pixels
+        
+    Returns:
+        PNG bytes of the thumbnail
+    """
+    data, _ = get_document_bytes(document_path, page_number)
+    img = _import_image().open(io.BytesIO(data))
+    img.thumbnail((max_size, max_size))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+        
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def document_metadata(document_path: str) -> Dict[str, Any]:
+    """Collect page count, first-page size and text-layer presence.
+    
+    Args:
+        document_path: Path to the document
+        
+    Returns:
+        Dictionary with ``page_count``, ``page_width`` and ``page_height``
+        (PDF points or image pixels) and ``has_text_layer``
+    """
     _, ext = os.path.splitext(document_path.lower())
     
     if ext == '.pdf':
-        return pdf_page_to_base64(document_path, page_number)
-    elif ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
-        return image_to_base64(document_path)
+        with _document_pool.open(document_path) as pdf_document:
+            first_page = pdf_document.load_page(0) if len(pdf_document) else None
+            return {
+                "page_count": len(pdf_document),
+                "page_width": first_page.rect.width if first_page else None,
+                "page_height": first_page.rect.height if first_page else None,
+                "has_text_layer": any(page.get_text().strip() for page in pdf_document),
+            }
+    elif ext in IMAGE_MIME_TYPES:
+        with _import_image().open(document_path) as img:
+            width, height = img.size
+        return {
+            "page_count": 1,
+            "page_width": width,
+            "page_height": height,
+            "has_text_layer": False,
+        }
     else:
         raise ValueError(f"Unsupported file format: {ext}")
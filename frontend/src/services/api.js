@@ -23,7 +23,7 @@ apiClient.interceptors.request.use(
   config => {
     const token = localStorage.getItem('token')
     if (token) {
-      config.headers.Authorization = `Basic ${token}`
+      config.headers.Authorization = `Token ${token}`
     }
     
     // Get CSRF token from cookies if it exists
@@ -84,7 +84,7 @@ apiClientMultipart.interceptors.request.use(
     const token = localStorage.getItem('token')
     if (token) {
       // Ensure Authorization header is set correctly for uploads
-      config.headers.Authorization = `Basic ${token}`
+      config.headers.Authorization = `Token ${token}`
       console.log('Setting Authorization header for upload request')
     } else {
       console.warn('No authentication token found for upload request')
@@ -127,6 +127,12 @@ export default {
   logout() {
     return apiClient.post('/api-auth/logout/')
   },
+  revokeToken(token) {
+    // Pass the token explicitly: local storage is cleared before the request runs
+    return apiClient.delete('/auth/token/', {
+      headers: { Authorization: `Token ${token}` }
+    })
+  },
 
   // Items endpoints
   getItems() {
@@ -158,7 +164,7 @@ export default {
     };
     
     if (token) {
-      config.headers.Authorization = `Basic ${token}`;
+      config.headers.Authorization = `Token ${token}`;
     }
     
     console.log('Uploading document with authorization header');
@@ -171,6 +177,41 @@ export default {
       throw error;
     }
   },
+  // Resumable chunked upload for large files: open a session, PUT each
+  // chunk at its offset (resuming from the server's offset after a
+  // failure), then finalize to create the document
+  async uploadDocumentChunked(file, name, schemaType, onProgress = null) {
+    const chunkSize = 8 * 1024 * 1024
+    const maxRetries = 5
+    const session = (await apiClient.post('/uploads/', {
+      name,
+      schema_type: schemaType,
+      total_size: file.size
+    })).data
+
+    let offset = session.received_bytes
+    let retries = 0
+    while (offset < file.size) {
+      const chunk = file.slice(offset, offset + chunkSize)
+      try {
+        const response = await apiClient.put(`/uploads/${session.id}/chunk/`, chunk, {
+          params: { offset },
+          headers: { 'Content-Type': 'application/octet-stream' },
+          timeout: 120000
+        })
+        offset = response.data.received_bytes
+        retries = 0
+        if (onProgress) onProgress(offset / file.size)
+      } catch (error) {
+        if (++retries > maxRetries) throw error
+        // Ask the server how much it has and resume from there
+        const status = await apiClient.get(`/uploads/${session.id}/`)
+        offset = status.data.received_bytes
+      }
+    }
+
+    return apiClient.post(`/uploads/${session.id}/finalize/`, {})
+  },
   getDocuments() {
     return apiClient.get('/documents/')
   },
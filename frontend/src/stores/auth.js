@@ -26,40 +26,37 @@ export const useAuthStore = defineStore('auth', () => {
         console.warn('Failed to fetch CSRF token, but proceeding with login:', csrfError)
       }
       
-      // Create base64 token for Basic Auth
-      const credentials = btoa(`${username}:${password}`)
-      
-      // Test credentials before storing them
+      // Exchange the credentials for an API token once, instead of
+      // sending Basic credentials (and paying the password hash) on every call
+      let apiToken
       try {
-        // Make a direct fetch call to the API root with these credentials
         const apiUrl = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
-        console.log('Testing authentication with API URL:', apiUrl);
+        console.log('Requesting API token from:', apiUrl);
         
-        const testResponse = await fetch(`${apiUrl}/`, {
-          method: 'GET',
+        const tokenResponse = await fetch(`${apiUrl}/auth/token/`, {
+          method: 'POST',
           headers: {
-            'Authorization': `Basic ${credentials}`
+            'Content-Type': 'application/json'
           },
-          credentials: 'include'
+          body: JSON.stringify({ username, password })
         });
         
-        if (!testResponse.ok) {
-          console.error('Authentication test failed with status:', testResponse.status);
+        if (!tokenResponse.ok) {
+          console.error('Token request failed with status:', tokenResponse.status);
           throw new Error('Invalid credentials');
         }
         
-        // Verify we got a valid JSON response
-        const responseData = await testResponse.json();
-        console.log('Authentication test succeeded:', responseData);
+        const responseData = await tokenResponse.json();
+        apiToken = responseData.token
       } catch (testError) {
-        console.error('Authentication test failed:', testError);
+        console.error('Authentication failed:', testError);
         error.value = 'Invalid username or password. Please try again.';
         return false;
       }
       
-      // If test passed, store the credentials
-      localStorage.setItem('token', credentials)
-      token.value = credentials
+      // Store the API token
+      localStorage.setItem('token', apiToken)
+      token.value = apiToken
       
       // Get user information
       user.value = { username }
@@ -82,6 +79,10 @@ export const useAuthStore = defineStore('auth', () => {
   }
 
   function logout() {
+    if (token.value) {
+      // Revoke the API token; clear local state regardless of the outcome
+      api.revokeToken(token.value).catch(err => console.warn('Failed to revoke token:', err))
+    }
     user.value = null
     token.value = null
     localStorage.removeItem('token')
@@ -3,6 +3,9 @@ import { ref, computed } from 'vue'
 import api from '../services/api'
 import { useAuthStore } from './auth'
 
+// Files larger than this are uploaded in resumable chunks
+const CHUNKED_UPLOAD_THRESHOLD = 20 * 1024 * 1024
+
 export const useDocumentsStore = defineStore('documents', () => {
   // State
   const documents = ref([])
@@ -78,7 +81,11 @@ export const useDocumentsStore = defineStore('documents', () => {
         throw new Error('No authentication token available');
       }
       
-      const response = await api.uploadDocument(formData)
+      // Large files go through the resumable chunked upload
+      const file = formData.get('file')
+      const response = file && file.size > CHUNKED_UPLOAD_THRESHOLD
+        ? await api.uploadDocumentChunked(file, formData.get('name') || file.name, formData.get('schema_type') || 'auto')
+        : await api.uploadDocument(formData)
       console.log('Document upload successful:', response.data);
       documents.value.push(response.data)
       return response.data